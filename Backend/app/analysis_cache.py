@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from Backend.app.analytics import ANALYTICS_VERSION, AnalyticsProcessor, analytics_processor
+from Backend.app.approximate_analytics import TaskSketches
+from Backend.app.responses import dumps_json, loads_json
+
+# Bloqueo de archivos entre procesos (POSIX); sin fcntl solo se bloquea dentro del proceso
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+class AnalysisCache:
+    """
+    Caché de resultados de analytics (LRU en memoria + archivo sidecar en disco).
+
+    La clave es la huella del archivo de eventos (ruta, tamaño, mtime) más la
+    versión de analytics, así que cualquier cambio en el CSV o en el motor
+    invalida la entrada automáticamente. En memoria se guarda el JSON serializado
+    (dumps_json) y cada lectura retorna una copia nueva: el resultado es el mismo
+    venga de memoria, del sidecar o recién calculado (claves str, sin tipos
+    NumPy), y quien lo modifique no altera la caché.
+
+    El sidecar ({archivo de eventos}.cache.json) es también el artefacto de
+    analytics que el pipeline precalcula al terminar cada tarea (precompute):
+    los endpoints lo sirven sin recalcular mientras no cambien el archivo ni
+    ANALYTICS_VERSION. La lectura-modificación-escritura del sidecar se
+    serializa con un candado por ruta y un bloqueo de archivo (fcntl), porque
+    también lo escriben los procesos del pool de análisis.
+    """
+
+    SIDECAR_SUFFIX = ".cache.json"
+
+    # Variantes por parámetros (bucket, max_points) guardadas en el sidecar por
+    # tipo de resultado, además de las por defecto que escribe precompute
+    MAX_SIDECAR_VARIANTS = 8
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sidecar_locks: Dict[str, threading.Lock] = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def fingerprint(path: str) -> Dict:
+        """Huella del archivo: ruta absoluta, tamaño, mtime y versión de analytics"""
+        stat = os.stat(path)
+        return {
+            "path": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "analytics_version": ANALYTICS_VERSION
+        }
+
+    def etag(self, keys: Dict[str, List[str]], scope: str = "") -> str:
+        """
+        ETag (débil) de una respuesta a partir de sus claves de caché
+        {ruta: [kinds]}: cambia si cambia algún archivo, la versión o los
+        parámetros. `scope` (responses.request_scope: endpoint y query) separa
+        las respuestas de endpoints distintos con las mismas claves.
+        """
+        parts = [scope, [[self.fingerprint(path), sorted(kinds)] for path, kinds in sorted(keys.items())]]
+        digest = hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()[:24]
+        return f'W/"{digest}"'
+
+    def sidecar_path(self, path: str) -> str:
+        return path + self.SIDECAR_SUFFIX
+
+    def get_or_compute(self, path: str, kind: str, compute: Callable[[], Dict]) -> Dict:
+        """
+        Retorna el resultado `kind` ('visualization', ...) para el archivo,
+        calculándolo con `compute()` solo si no está en caché. Los resultados con
+        "error" no se guardan.
+        """
+        fingerprint = self.fingerprint(path)
+        found = self._lookup(path, [kind], fingerprint)
+        if kind in found:
+            return found[kind]
+
+        with self._lock:
+            self.stats["misses"] += 1
+
+        result = compute()
+        if "error" in result:
+            return result
+        blob = dumps_json(result)
+        self._store((kind, *fingerprint.values()), blob)
+        self._write_sidecar(path, fingerprint, {kind: loads_json(blob)})
+        return loads_json(blob)
+
+    def find(self, path: str, kind: str) -> Optional[Dict]:
+        """Resultado `kind` ya guardado (memoria o sidecar) sin calcularlo; None si falta"""
+        return self._lookup(path, [kind], self.fingerprint(path)).get(kind)
+
+    def get_or_compute_sections(self, path: str, sections: List[str],
+                                compute: Callable[[List[str]], Dict],
+                                key_for: Optional[Callable[[str], str]] = None) -> Dict:
+        """
+        Secciones de análisis memoizadas una a una (clave "section:<nombre>", o
+        la que retorne `key_for(sección)` si el resultado depende de parámetros).
+        Solo las que faltan se calculan, todas juntas con `compute(faltantes)`,
+        que debe retornar {sección: resultado} o {"error": ...}.
+        """
+        key_for = key_for or (lambda section: f"section:{section}")
+        keys = {section: key_for(section) for section in sections}
+        fingerprint = self.fingerprint(path)
+        found = self._lookup(path, list(keys.values()), fingerprint)
+        missing = [section for section in sections if keys[section] not in found]
+
+        if missing:
+            with self._lock:
+                self.stats["misses"] += len(missing)
+
+            computed = compute(missing)
+            if "error" in computed:
+                return computed
+
+            blobs = {keys[section]: dumps_json(computed[section]) for section in missing}
+            for kind, blob in blobs.items():
+                self._store((kind, *fingerprint.values()), blob)
+            self._write_sidecar(path, fingerprint, {kind: loads_json(blob) for kind, blob in blobs.items()})
+            found.update({kind: loads_json(blob) for kind, blob in blobs.items()})
+
+        return {section: found[keys[section]] for section in sections}
+
+    @staticmethod
+    def visualization_kind(bucket_seconds: Optional[float] = None, max_points: Optional[int] = None) -> str:
+        """Clave de caché de los datos de visualización para esos parámetros"""
+        bucket = "auto" if bucket_seconds is None else f"{float(bucket_seconds):g}s"
+        max_points = AnalyticsProcessor.DEFAULT_MAX_CHART_POINTS if max_points is None else max_points
+        return f"visualization@{bucket}:{max_points}"
+
+    def get_analysis(self, path: str, sections: Optional[List[str]] = None,
+                     bucket_seconds: Optional[float] = None) -> Dict:
+        """
+        Secciones de análisis de un archivo de eventos (todas por defecto),
+        cada una calculada solo la primera vez (las series temporales, por bucket)
+        """
+        return self.get_or_compute_sections(
+            path,
+            sections or list(AnalyticsProcessor.SECTIONS),
+            lambda missing: analytics_processor.process_events_file(
+                path, sections=missing, bucket_seconds=bucket_seconds
+            ),
+            key_for=lambda section: AnalyticsProcessor.section_cache_key(section, bucket_seconds)
+        )
+
+    def get_visualization(self, path: str, bucket_seconds: Optional[float] = None,
+                          max_points: Optional[int] = None) -> Dict:
+        """
+        Datos de visualización del dashboard (reutiliza las secciones memoizadas)
+        """
+        def compute():
+            analysis = self.get_analysis(path, AnalyticsProcessor.VISUALIZATION_SECTIONS, bucket_seconds)
+            if "error" in analysis:
+                return analysis
+            return analytics_processor.generate_visualization_data(analysis, max_points=max_points)
+
+        return self.get_or_compute(path, self.visualization_kind(bucket_seconds, max_points), compute)
+
+    def get_sketches(self, path: str, task_id: str) -> Dict:
+        """
+        Sketches fusionables de la tarea (TaskSketches.to_dict), base del modo
+        aproximado y de los rollups entre tareas
+        """
+        def compute():
+            sketches = TaskSketches.from_events_file(path, task_id, analytics_processor)
+            if sketches.rows == 0 and not sketches.line_crossings:
+                return {"error": "CSV file is empty"}
+            return sketches.to_dict()
+
+        return self.get_or_compute(path, "sketches", compute)
+
+    def precompute(self, path: str, task_id: Optional[str] = None) -> Dict:
+        """
+        Calcula y persiste el análisis completo, la visualización por defecto y,
+        si se indica la tarea, sus sketches (etapa final del pipeline), para que
+        el primer visitante no espere
+        """
+        start = time.perf_counter()
+        analysis = self.get_analysis(path)
+        if "error" in analysis:
+            return analysis
+        visualization = self.get_visualization(path)
+        if "error" in visualization:
+            return visualization
+        if task_id is not None:
+            sketches = self.get_sketches(path, task_id)
+            if "error" in sketches:
+                return sketches
+        return {"seconds": round(time.perf_counter() - start, 3), "artifact": self.sidecar_path(path)}
+
+    def _lookup(self, path: str, kinds: List[str], fingerprint: Dict) -> Dict:
+        """
+        Busca cada `kind` en memoria y, solo si falta alguno, en el sidecar (una
+        lectura). Retorna copias: nada de lo retornado se comparte con la caché.
+        """
+        blobs = {}
+        with self._lock:
+            for kind in kinds:
+                key = (kind, *fingerprint.values())
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    blobs[kind] = self._entries[key]
+        found = {kind: loads_json(blob) for kind, blob in blobs.items()}
+
+        if len(found) < len(kinds):
+            sidecar_entries = self._read_sidecar(path, fingerprint)
+            for kind in kinds:
+                if kind not in found and kind in sidecar_entries:
+                    found[kind] = sidecar_entries[kind]
+                    self._store((kind, *fingerprint.values()), dumps_json(found[kind]))
+                    with self._lock:
+                        self.stats["disk_hits"] += 1
+        return found
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key: tuple, blob: bytes):
+        with self._lock:
+            self._entries[key] = blob
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _read_sidecar(self, path: str, fingerprint: Dict) -> Dict:
+        """Entradas del sidecar si corresponde a la huella actual ({} si no)"""
+        sidecar = self.sidecar_path(path)
+        if not os.path.exists(sidecar):
+            return {}
+        try:
+            with open(sidecar, "rb") as f:
+                data = loads_json(f.read())
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Sidecar de caché ilegible ({sidecar}): {e}")
+            return {}
+        if data.get("fingerprint") != fingerprint:
+            return {}
+        return data.get("entries", {})
+
+    @staticmethod
+    def _default_kinds() -> set:
+        """Claves que escribe precompute (secciones y visualización con parámetros por defecto)"""
+        return ({AnalyticsProcessor.section_cache_key(section) for section in AnalyticsProcessor.SECTIONS}
+                | {AnalysisCache.visualization_kind(), "sketches"})
+
+    def _prune_variants(self, entries: Dict):
+        """
+        Deja como máximo MAX_SIDECAR_VARIANTS variantes no por defecto por tipo
+        ("section:zone_analysis", "visualization", ...), descartando las más
+        antiguas: cada bucket o max_points distinto agrega una entrada
+        """
+        defaults = self._default_kinds()
+        variants: Dict[str, List[str]] = {}
+        for kind in entries:
+            if kind not in defaults:
+                variants.setdefault(kind.split("@", 1)[0], []).append(kind)
+        for kinds in variants.values():
+            for kind in kinds[:-self.MAX_SIDECAR_VARIANTS]:
+                del entries[kind]
+
+    @contextmanager
+    def _sidecar_lock(self, sidecar: str):
+        """
+        Exclusión mutua sobre un sidecar: candado por ruta entre los hilos del
+        proceso y flock sobre {sidecar}.lock entre procesos (pool de análisis)
+        """
+        with self._lock:
+            lock = self._sidecar_locks.setdefault(sidecar, threading.Lock())
+        with lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            with open(sidecar + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_sidecar(self, path: str, fingerprint: Dict, new_entries: Dict):
+        sidecar = self.sidecar_path(path)
+        try:
+            # Sin el bloqueo, dos escritores que leen el mismo sidecar pierden las
+            # entradas del que reemplaza primero
+            with self._sidecar_lock(sidecar):
+                entries = self._read_sidecar(path, fingerprint)
+                # Reinsertar al final: el orden del sidecar es el de la última escritura
+                for kind in new_entries:
+                    entries.pop(kind, None)
+                entries.update(new_entries)
+                self._prune_variants(entries)
+
+                # Escritura atómica para no dejar sidecars truncados a los lectores
+                # (que no toman el bloqueo)
+                tmp_path = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(dumps_json({"fingerprint": fingerprint, "entries": entries}))
+                os.replace(tmp_path, sidecar)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️  No se pudo escribir el sidecar de caché ({sidecar}): {e}")
+
+
+# Instancia global de la caché
+analysis_cache = AnalysisCache()
@@ -0,0 +1,115 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+# Procesos de análisis (ANALYSIS_WORKERS) y tiempo máximo por tarea (ANALYSIS_TASK_TIMEOUT)
+DEFAULT_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", min(4, os.cpu_count() or 1)))
+DEFAULT_TASK_TIMEOUT = float(os.environ.get("ANALYSIS_TASK_TIMEOUT", 120))
+
+
+def cached_summary(events_path: str) -> Dict:
+    """
+    Sección summary de un archivo de eventos (en un proceso del pool). Pasa
+    por la caché de analytics: el sidecar queda escrito y el proceso
+    principal lo lee como acierto en disco.
+    """
+    from Backend.app.analysis_cache import analysis_cache
+
+    analysis = analysis_cache.get_analysis(events_path, ["summary"])
+    return analysis if "error" in analysis else analysis["summary"]
+
+
+def cached_sketches(events_path: str, task_id: str) -> Dict:
+    """
+    Sketches de un archivo de eventos (en un proceso del pool), guardados en
+    su sidecar como los de cached_summary
+    """
+    from Backend.app.analysis_cache import analysis_cache
+
+    return analysis_cache.get_sketches(events_path, task_id)
+
+
+class AnalysisPool:
+    """
+    Pool de procesos para análisis de varias tareas fuera del event loop.
+
+    run_many() lanza una llamada por tarea con como mucho `max_concurrency`
+    en curso y un tiempo máximo por tarea, y fusiona los resultados a medida
+    que terminan. Una tarea que excede el tiempo se reporta como error; su
+    proceso termina el trabajo en segundo plano (no se puede interrumpir),
+    por eso el número de procesos acota el uso de CPU.
+
+    Los procesos se crean con 'spawn' para no heredar hilos (ni modelos) del
+    servidor.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        """Descarta un pool roto (p. ej. un proceso murió) para recrearlo en el próximo uso"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def run_many(self, func: Callable, calls: Dict[str, Tuple],
+                       max_concurrency: Optional[int] = None,
+                       timeout: float = DEFAULT_TASK_TIMEOUT) -> Tuple[Dict, Dict[str, str]]:
+        """
+        Ejecuta func(*args) para cada {clave: args} en el pool. Retorna
+        ({clave: resultado}, {clave: error}) con los resultados en orden de llegada.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_workers)
+        results, errors = {}, {}
+
+        async def run_one(key: str, args: Tuple):
+            async with semaphore:
+                try:
+                    future = loop.run_in_executor(self._get_executor(), func, *args)
+                    return key, await asyncio.wait_for(future, timeout=timeout), None
+                except asyncio.TimeoutError:
+                    return key, None, f"timeout after {timeout:g}s"
+                except BrokenProcessPool as e:
+                    self._reset_executor()
+                    return key, None, f"worker crashed: {e}"
+                except Exception as e:
+                    return key, None, str(e)
+
+        start = time.perf_counter()
+        for finished in asyncio.as_completed([run_one(key, args) for key, args in calls.items()]):
+            key, result, error = await finished
+            if error is not None:
+                errors[key] = error
+            else:
+                results[key] = result
+        if calls:
+            print(f"⚙️  {len(results)}/{len(calls)} análisis en paralelo en {time.perf_counter() - start:.2f}s")
+        return results, errors
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Instancia global del pool de análisis
+analysis_pool = AnalysisPool()
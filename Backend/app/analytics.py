@@ -4,45 +4,188 @@ from typing import Dict, List, Optional
 from datetime import datetime
 import json
 import os
+from Backend.app.events_io import estimate_rows, read_events, split_events
+
+# Versión del motor de analytics: incrementar cuando cambie el formato o el
+# cálculo de los resultados para invalidar las cachés persistidas
+ANALYTICS_VERSION = "5"
+
+
+def convert_numpy_types(obj):
+    """
+    Convierte recursivamente escalares NumPy a tipos nativos de Python para JSON
+    """
+    if hasattr(obj, 'item'):  # numpy scalar
+        return obj.item()
+    elif isinstance(obj, dict):
+        return {k: convert_numpy_types(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [convert_numpy_types(v) for v in obj]
+    else:
+        return obj
+
 
 class AnalyticsProcessor:
     """
     Clase para procesar y analizar datos de seguimiento de personas
     """
     
-    def __init__(self):
+    # Secciones del análisis: método que la calcula y columnas que necesita
+    SECTIONS = {
+        "summary": ("_generate_summary",
+                    ['timestamp_seconds', 'frame', 'zone_id', 'person_tracker_id']),
+        "zone_analysis": ("_analyze_zones",
+                          ['timestamp_seconds', 'frame', 'zone_id', 'person_tracker_id']),
+        "temporal_analysis": ("_analyze_temporal_patterns",
+                              ['timestamp_seconds', 'zone_id', 'person_tracker_id']),
+        "flow_analysis": ("_analyze_flow_patterns",
+                          ['timestamp_seconds', 'zone_id', 'person_tracker_id']),
+        "dwell_time_analysis": ("_analyze_dwell_times",
+                                ['timestamp_seconds', 'zone_id', 'person_tracker_id', 'event']),
+        "demographic_analysis": ("_analyze_demographics",
+                                 ['zone_id', 'person_tracker_id', 'gender', 'gender_confidence',
+                                  'age', 'age_confidence']),
+        "line_analysis": ("_analyze_lines",
+                          ['timestamp_seconds', 'line_id', 'person_tracker_id', 'event']),
+    }
+    
+    # Secciones calculadas sobre los cruces de línea; las demás usan solo los eventos de zona
+    LINE_SECTIONS = ("line_analysis",)
+    
+    # Secciones que usa generate_visualization_data
+    VISUALIZATION_SECTIONS = ["summary", "zone_analysis", "temporal_analysis", "dwell_time_analysis"]
+    
+    # Secciones cuyas series temporales dependen del tamaño de intervalo (bucket)
+    BUCKETED_SECTIONS = ("zone_analysis", "temporal_analysis", "line_analysis")
+    
+    # Intervalos (segundos) candidatos para el bucket automático y máximo de
+    # intervalos por serie: el tamaño de la respuesta no crece con la duración
+    TIME_BUCKET_STEPS = (1, 5, 10, 30, 60, 300, 600, 1800, 3600)
+    MAX_TIMELINE_BUCKETS = 1000
+    
+    # Puntos máximos por serie de gráfico de líneas (downsampling LTTB)
+    DEFAULT_MAX_CHART_POINTS = 500
+    
+    # A partir de este número de filas se analiza por bloques (memoria acotada)
+    CHUNKED_MIN_ROWS = 5_000_000
+    DEFAULT_CHUNK_ROWS = 500_000
+    
+    # Límites (segundos) del histograma de tiempos de permanencia
+    DEFAULT_DWELL_TIME_BINS = (10, 30, 60)
+    
+    def __init__(self, dwell_time_bins: Optional[List[float]] = None):
         self.current_session_data = {}
+        self.dwell_time_bins = tuple(sorted(dwell_time_bins or self.DEFAULT_DWELL_TIME_BINS))
         
     def process_csv_data(self, csv_path: str) -> Dict:
         """
-        Procesa un archivo CSV y retorna estadísticas analizadas
+        Compatibilidad: equivale a process_events_file (acepta CSV o Parquet)
+        """
+        return self.process_events_file(csv_path)
+    
+    def process_events_file(self, path: str, sections: Optional[List[str]] = None,
+                            bucket_seconds: Optional[float] = None,
+                            chunk_rows: Optional[int] = None) -> Dict:
+        """
+        Procesa un archivo de eventos (Parquet o CSV) y retorna estadísticas analizadas.
+        
+        Args:
+            path: Ruta del archivo de eventos
+            sections: Secciones a calcular (claves de SECTIONS). Por defecto todas.
+                Solo se leen las columnas que esas secciones necesitan.
+            bucket_seconds: Tamaño de intervalo de las series temporales
+                (BUCKETED_SECTIONS). None = automático según la duración.
+            chunk_rows: Analizar en bloques de este tamaño con memoria acotada
+                (ver chunked_analytics). Por defecto se usa solo para archivos
+                de CHUNKED_MIN_ROWS filas o más.
         """
+        sections = list(self.SECTIONS) if sections is None else list(sections)
+        unknown = [section for section in sections if section not in self.SECTIONS]
+        if unknown:
+            return {"error": f"Unknown analytics sections: {', '.join(unknown)}"}
+        
         try:
-            # Leer CSV
-            df = pd.read_csv(csv_path)
+            if chunk_rows is None and estimate_rows(path) >= self.CHUNKED_MIN_ROWS:
+                chunk_rows = self.DEFAULT_CHUNK_ROWS
+            if chunk_rows:
+                from Backend.app.chunked_analytics import ChunkedAnalytics
+                return ChunkedAnalytics(self, chunk_rows).process_events_file(path, sections, bucket_seconds)
+            
+            # Leer eventos con tipos explícitos (solo columnas necesarias; 'event'
+            # siempre, para separar eventos de zona y cruces de línea)
+            columns = sorted({column for section in sections for column in self.SECTIONS[section][1]} | {'event'})
+            df = read_events(path, columns=columns)
             
             if df.empty:
                 return {"error": "CSV file is empty"}
             
-            # Análisis básico
-            analysis = {
-                "summary": self._generate_summary(df),
-                "zone_analysis": self._analyze_zones(df),
-                "temporal_analysis": self._analyze_temporal_patterns(df),
-                "flow_analysis": self._analyze_flow_patterns(df),
-                "dwell_time_analysis": self._analyze_dwell_times(df),
-                "demographic_analysis": self._analyze_demographics(df)  # Nuevo análisis demográfico
-            }
-            
-            return analysis
+            zone_df, line_df = split_events(df)
+            # Solo las series temporales leen timestamp_seconds
+            bucketed = any(section in self.BUCKETED_SECTIONS for section in sections)
+            bucket = self.resolve_bucket_seconds(df, bucket_seconds) if bucketed else None
+            results = {}
+            for section in sections:
+                section_df = line_df if section in self.LINE_SECTIONS else zone_df
+                if section_df.empty and section not in ("summary", *self.LINE_SECTIONS):
+                    # Configuración solo con líneas: sin eventos de zona que analizar
+                    results[section] = {}
+                elif section in self.BUCKETED_SECTIONS:
+                    results[section] = getattr(self, self.SECTIONS[section][0])(section_df, bucket_seconds=bucket)
+                else:
+                    results[section] = getattr(self, self.SECTIONS[section][0])(section_df)
+            return results
             
         except Exception as e:
             return {"error": f"Error processing CSV: {str(e)}"}
     
+    def resolve_bucket_seconds(self, df: pd.DataFrame, bucket_seconds: Optional[float] = None) -> float:
+        """
+        Tamaño de intervalo efectivo: el pedido, o el menor de TIME_BUCKET_STEPS
+        que deja como máximo MAX_TIMELINE_BUCKETS intervalos (también si el
+        pedido dejaría más: la respuesta no crece con la duración)
+        """
+        if df.empty:
+            return float(self.TIME_BUCKET_STEPS[0] if bucket_seconds is None else bucket_seconds)
+        return self.bucket_for_duration(float(df['timestamp_seconds'].max() - df['timestamp_seconds'].min()),
+                                        bucket_seconds)
+    
+    def bucket_for_duration(self, duration: float, bucket_seconds: Optional[float] = None) -> float:
+        """
+        Intervalo pedido si deja menos de MAX_TIMELINE_BUCKETS intervalos; si no
+        (o sin pedir), el menor de TIME_BUCKET_STEPS que los deja
+        """
+        if bucket_seconds is not None and duration / bucket_seconds < self.MAX_TIMELINE_BUCKETS:
+            return float(bucket_seconds)
+        for step in self.TIME_BUCKET_STEPS:
+            if duration / step < self.MAX_TIMELINE_BUCKETS:
+                return float(step)
+        return float(self.TIME_BUCKET_STEPS[-1])
+    
+    @classmethod
+    def section_cache_key(cls, section: str, bucket_seconds: Optional[float] = None) -> str:
+        """
+        Clave de caché de una sección (incluye el bucket en las secciones que dependen de él)
+        """
+        if section not in cls.BUCKETED_SECTIONS:
+            return f"section:{section}"
+        bucket = "auto" if bucket_seconds is None else f"{float(bucket_seconds):g}s"
+        return f"section:{section}@{bucket}"
+    
+    @staticmethod
+    def _time_buckets(timestamps: pd.Series, bucket_seconds: float) -> np.ndarray:
+        """
+        Inicio del intervalo de cada timestamp (redondeado para claves estables)
+        """
+        values = timestamps.to_numpy(dtype=np.float64)
+        return np.round(np.floor(values / bucket_seconds) * bucket_seconds, 6)
+    
     def _generate_summary(self, df: pd.DataFrame) -> Dict:
         """
         Genera resumen estadístico general
         """
+        if df.empty:
+            return {"total_detections": 0, "unique_persons": 0, "zones_count": 0, "duration_seconds": 0.0,
+                    "total_frames": 0, "detection_rate": 0.0, "zones_detected": []}
         return {
             "total_detections": len(df),
             "unique_persons": df['person_tracker_id'].nunique(),
@@ -53,15 +196,17 @@ class AnalyticsProcessor:
             "zones_detected": sorted(df['zone_id'].unique().tolist())
         }
     
-    def _analyze_zones(self, df: pd.DataFrame) -> Dict:
+    def _analyze_zones(self, df: pd.DataFrame, bucket_seconds: Optional[float] = None) -> Dict:
         """
-        Analiza actividad por zona
+        Analiza actividad por zona. entries_timeline cuenta detecciones por
+        intervalo de bucket_seconds (automático si es None).
         """
+        bucket_seconds = self.resolve_bucket_seconds(df, bucket_seconds)
+        df = df.assign(_bucket=self._time_buckets(df['timestamp_seconds'], bucket_seconds))
         zone_stats = {}
         
-        for zone_id in df['zone_id'].unique():
-            zone_data = df[df['zone_id'] == zone_id]
-            
+        # Zonas en orden de aparición
+        for zone_id, zone_data in df.groupby('zone_id', sort=False):
             zone_stats[f"zone_{zone_id}"] = {
                 "total_entries": len(zone_data),
                 "unique_persons": zone_data['person_tracker_id'].nunique(),
@@ -69,25 +214,39 @@ class AnalyticsProcessor:
                 "last_detection": zone_data['timestamp_seconds'].max(),
                 "activity_duration": zone_data['timestamp_seconds'].max() - zone_data['timestamp_seconds'].min(),
                 "peak_frame": zone_data.groupby('frame').size().idxmax() if not zone_data.empty else 0,
-                "entries_timeline": zone_data.groupby('timestamp_seconds').size().to_dict()
+                "entries_timeline": zone_data.groupby('_bucket').size().to_dict(),
+                "bucket_seconds": bucket_seconds
             }
         
         return zone_stats
     
-    def _analyze_temporal_patterns(self, df: pd.DataFrame) -> Dict:
+    def _analyze_temporal_patterns(self, df: pd.DataFrame, bucket_seconds: Optional[float] = None) -> Dict:
+        """
+        Analiza patrones temporales agrupando en intervalos de bucket_seconds
+        (automático si es None). Cada intervalo reporta sus detecciones, la tasa
+        por segundo y las zonas activas.
+        """
+        bucket_seconds = self.resolve_bucket_seconds(df, bucket_seconds)
+        bucket_counts = df.groupby(
+            [self._time_buckets(df['timestamp_seconds'], bucket_seconds), df['zone_id'].to_numpy()]
+        ).size()
+        return self._temporal_from_bucket_counts(bucket_counts, bucket_seconds)
+    
+    def _temporal_from_bucket_counts(self, bucket_counts: pd.Series, bucket_seconds: float) -> Dict:
         """
-        Analiza patrones temporales
+        Resultado de temporal_analysis a partir de las detecciones por (intervalo, zona)
+        (solo pares presentes). Compartido con el modo por bloques.
         """
-        # Agrupa por segundos
-        temporal_data = df.groupby('timestamp_seconds').agg({
-            'person_tracker_id': 'count',
-            'zone_id': lambda x: len(x.unique())
-        }).rename(columns={
-            'person_tracker_id': 'detections_per_second',
-            'zone_id': 'active_zones'
+        by_bucket = bucket_counts.groupby(level=0)
+        detections = by_bucket.sum()
+        temporal_data = pd.DataFrame({
+            'detections_per_second': detections / bucket_seconds,
+            'active_zones': by_bucket.size(),
+            'detections': detections
         })
         
         return {
+            "bucket_seconds": bucket_seconds,
             "timeline": temporal_data.to_dict('index'),
             "peak_activity": {
                 "timestamp": temporal_data['detections_per_second'].idxmax(),
@@ -99,28 +258,43 @@ class AnalyticsProcessor:
     
     def _analyze_flow_patterns(self, df: pd.DataFrame) -> Dict:
         """
-        Analiza patrones de flujo entre zonas
+        Analiza patrones de flujo entre zonas.
+        Vectorizado: un solo ordenamiento por (persona, tiempo) y comparación del
+        evento con el siguiente de la misma persona.
         """
-        flow_data = {}
-        
-        # Analizar movimiento de personas entre zonas
-        for person_id in df['person_tracker_id'].unique():
-            person_data = df[df['person_tracker_id'] == person_id].sort_values('timestamp_seconds')
-            zones_visited = person_data['zone_id'].tolist()
-            
-            # Contar transiciones entre zonas
-            for i in range(len(zones_visited) - 1):
-                from_zone = f"zone_{zones_visited[i]}"
-                to_zone = f"zone_{zones_visited[i + 1]}"
-                
-                if from_zone != to_zone:  # Solo contar transiciones reales
-                    transition_key = f"{from_zone}_to_{to_zone}"
-                    flow_data[transition_key] = flow_data.get(transition_key, 0) + 1
-        
+        # Ordenamiento estable para que los empates conserven el orden del CSV
+        ordered = df.sort_values(['person_tracker_id', 'timestamp_seconds'], kind='mergesort')
+        persons = ordered['person_tracker_id'].to_numpy()
+
+        # Zonas codificadas como índices densos 0..n-1
+        zone_ids = np.sort(df['zone_id'].unique())
+        zone_codes = np.searchsorted(zone_ids, ordered['zone_id'].to_numpy())
+        n_zones = len(zone_ids)
+
+        # Solo contar transiciones reales (misma persona, zona distinta)
+        from_codes = zone_codes[:-1]
+        to_codes = zone_codes[1:]
+        is_transition = (persons[1:] == persons[:-1]) & (from_codes != to_codes)
+
+        matrix = np.bincount(
+            from_codes[is_transition] * n_zones + to_codes[is_transition],
+            minlength=n_zones * n_zones
+        ).reshape(n_zones, n_zones)
+
+        zone_labels = [f"zone_{zone_id}" for zone_id in zone_ids]
+        flow_data = {
+            f"{zone_labels[i]}_to_{zone_labels[j]}": int(matrix[i, j])
+            for i, j in zip(*np.nonzero(matrix))
+        }
+
         return {
             "zone_transitions": flow_data,
+            "transition_matrix": {
+                "zones": zone_labels,
+                "matrix": matrix.tolist()
+            },
             "most_common_transition": max(flow_data.items(), key=lambda x: x[1]) if flow_data else None,
-            "total_transitions": sum(flow_data.values())
+            "total_transitions": int(matrix.sum())
         }
     
     def _analyze_dwell_times(self, df: pd.DataFrame) -> Dict:
@@ -134,92 +308,150 @@ class AnalyticsProcessor:
         }
         
         # Verificar si tenemos eventos de salida
-        has_exits = 'exit' in df['event'].values if 'event' in df.columns else False
+        has_exits = bool((df['event'] == 'exit').any()) if 'event' in df.columns else False
         
         if not has_exits:
             # Si no hay eventos de salida, usar método anterior
             return self._analyze_dwell_times_fallback(df)
         
-        # Procesar cada persona individualmente
-        for person_id in df['person_tracker_id'].unique():
-            person_data = df[df['person_tracker_id'] == person_id].sort_values('timestamp_seconds')
-            person_dwell_times = []
-            
-            # Agrupar por zona para esta persona
-            for zone_id in person_data['zone_id'].unique():
-                zone_events = person_data[person_data['zone_id'] == zone_id].sort_values('timestamp_seconds')
-                
-                # Buscar pares entry-exit
-                entry_times = zone_events[zone_events['event'] == 'entry']['timestamp_seconds'].tolist()
-                exit_times = zone_events[zone_events['event'] == 'exit']['timestamp_seconds'].tolist()
-                
-                # Calcular tiempos de permanencia para cada sesión en la zona
-                zone_dwell_times = []
-                for i, entry_time in enumerate(entry_times):
-                    # Buscar la salida correspondiente
-                    matching_exits = [exit_time for exit_time in exit_times if exit_time > entry_time]
-                    if matching_exits:
-                        exit_time = min(matching_exits)  # La salida más próxima
-                        dwell_time = exit_time - entry_time
-                        zone_dwell_times.append(dwell_time)
-                        person_dwell_times.append(dwell_time)
-                        
-                        # Remover esta salida para evitar reutilización
-                        exit_times.remove(exit_time)
-                
-                # Estadísticas por zona
-                if zone_dwell_times:
-                    zone_key = f"zone_{zone_id}"
-                    if zone_key not in dwell_data["by_zone"]:
-                        dwell_data["by_zone"][zone_key] = []
-                    dwell_data["by_zone"][zone_key].extend(zone_dwell_times)
-            
-            # Estadísticas por persona
-            if person_dwell_times:
-                dwell_data["by_person"][f"person_{person_id}"] = {
-                    "total_dwell_time": sum(person_dwell_times),
-                    "average_dwell_time": np.mean(person_dwell_times),
-                    "visits_count": len(person_dwell_times),
-                    "max_dwell_time": max(person_dwell_times),
-                    "min_dwell_time": min(person_dwell_times)
-                }
+        persons, zones, dwell_times = self._pair_entry_exit(df)
+        
+        if len(dwell_times) == 0:
+            return dwell_data
+        
+        # Estadísticas por zona (en orden de aparición)
+        zone_ids, zone_first = np.unique(zones, return_index=True)
+        for zone_id in zone_ids[np.argsort(zone_first)]:
+            times = dwell_times[zones == zone_id]
+            dwell_data["by_zone"][f"zone_{zone_id}"] = {
+                "raw_times": times.tolist(),
+                "average_dwell_time": np.mean(times),
+                "median_dwell_time": np.median(times),
+                "total_visits": len(times),
+                "max_dwell_time": times.max(),
+                "min_dwell_time": times.min(),
+                "std_dwell_time": np.std(times)
+            }
         
-        # Calcular estadísticas de resumen por zona
-        for zone_key, times in dwell_data["by_zone"].items():
-            if times:
-                dwell_data["by_zone"][zone_key] = {
-                    "raw_times": times,
-                    "average_dwell_time": np.mean(times),
-                    "median_dwell_time": np.median(times),
-                    "total_visits": len(times),
-                    "max_dwell_time": max(times),
-                    "min_dwell_time": min(times),
-                    "std_dwell_time": np.std(times)
-                }
+        # Estadísticas por persona: los pares ya vienen agrupados por persona
+        starts = np.flatnonzero(np.r_[True, persons[1:] != persons[:-1]])
+        counts = np.diff(np.r_[starts, len(persons)])
+        totals = np.add.reduceat(dwell_times, starts)
+        maxima = np.maximum.reduceat(dwell_times, starts)
+        minima = np.minimum.reduceat(dwell_times, starts)
+        
+        dwell_data["by_person"] = {
+            f"person_{persons[start]}": {
+                "total_dwell_time": total,
+                "average_dwell_time": total / count,
+                "visits_count": int(count),
+                "max_dwell_time": maximum,
+                "min_dwell_time": minimum
+            }
+            for start, count, total, maximum, minimum in zip(starts, counts, totals, maxima, minima)
+        }
         
         # Estadísticas generales
-        all_dwell_times = []
-        for zone_data in dwell_data["by_zone"].values():
-            if isinstance(zone_data, dict) and "raw_times" in zone_data:
-                all_dwell_times.extend(zone_data["raw_times"])
-        
-        if all_dwell_times:
-            dwell_data["summary"] = {
-                "overall_average": np.mean(all_dwell_times),
-                "overall_median": np.median(all_dwell_times),
-                "total_measured_visits": len(all_dwell_times),
-                "longest_stay": max(all_dwell_times),
-                "shortest_stay": min(all_dwell_times),
-                "distribution": {
-                    "under_10s": len([t for t in all_dwell_times if t < 10]),
-                    "10_30s": len([t for t in all_dwell_times if 10 <= t < 30]),
-                    "30_60s": len([t for t in all_dwell_times if 30 <= t < 60]),
-                    "over_60s": len([t for t in all_dwell_times if t >= 60])
-                }
-            }
+        all_dwell_times = np.concatenate([
+            zone_data["raw_times"] for zone_data in dwell_data["by_zone"].values()
+        ])
+        
+        dwell_data["summary"] = {
+            "overall_average": np.mean(all_dwell_times),
+            "overall_median": np.median(all_dwell_times),
+            "total_measured_visits": len(all_dwell_times),
+            "longest_stay": all_dwell_times.max(),
+            "shortest_stay": all_dwell_times.min(),
+            "distribution": self._dwell_distribution(all_dwell_times)
+        }
         
         return dwell_data
     
+    def _pair_entry_exit(self, df: pd.DataFrame, return_pending: bool = False):
+        """
+        Empareja cada entrada con la siguiente salida de la misma (persona, zona).
+        
+        Equivale a recorrer las entradas en orden y tomar la salida libre más
+        próxima estrictamente posterior: las salidas se asignan en orden FIFO a
+        las entradas pendientes. Retorna arrays (persona, zona, permanencia)
+        ordenados por persona (orden de aparición), zona (primera visita) y entrada.
+        Con return_pending agrega las entradas sin salida (DataFrame con
+        person_tracker_id, zone_id, timestamp_seconds, event) para continuar
+        el emparejamiento en el bloque siguiente.
+        """
+        # Orden de personas y de zonas por persona igual al recorrido original
+        person_order = pd.Series(pd.factorize(df['person_tracker_id'])[0], index=df.index)
+        is_event = df['event'].isin(['entry', 'exit'])
+        events = df.loc[is_event, ['person_tracker_id', 'zone_id', 'timestamp_seconds', 'event']].assign(
+            _person_order=person_order[is_event],
+            _is_entry=df.loc[is_event, 'event'] == 'entry'
+        )
+        events = events.sort_values(['_person_order', 'timestamp_seconds'], kind='mergesort')
+        events['_group'] = np.arange(len(events))
+        events['_group'] = events.groupby(['_person_order', 'zone_id'], sort=False)['_group'].transform('min')
+        
+        # Ante empates de tiempo la salida va primero: debe ser estrictamente posterior
+        events = events.sort_values(['_group', 'timestamp_seconds', '_is_entry'], kind='mergesort')
+        
+        group = events['_group'].to_numpy()
+        is_entry = events['_is_entry'].to_numpy()
+        times = events['timestamp_seconds'].to_numpy(dtype=np.float64)
+        
+        # Salidas sin entrada pendiente = caída del mínimo acumulado del balance entradas - salidas
+        grouped = pd.Series(np.where(is_entry, 1, -1), index=events.index).groupby(group)
+        balance = grouped.cumsum()
+        unmatched = (-balance.groupby(group).cummin()).clip(lower=0).to_numpy()
+        previous_unmatched = pd.Series(unmatched).groupby(group).shift(fill_value=0).to_numpy()
+        matched_exit = ~is_entry & (unmatched == previous_unmatched)
+        
+        # La k-ésima salida emparejada corresponde a la k-ésima entrada del grupo
+        group_starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        group_index = np.cumsum(np.r_[False, group[1:] != group[:-1]])
+        matched_per_group = np.add.reduceat(matched_exit.astype(np.int64), group_starts)
+        entry_rank = pd.Series(is_entry).groupby(group).cumsum().to_numpy() - 1
+        matched_entry = is_entry & (entry_rank < matched_per_group[group_index])
+        
+        dwell_times = times[matched_exit] - times[matched_entry]
+        pairs = (
+            events['person_tracker_id'].to_numpy()[matched_entry],
+            events['zone_id'].to_numpy()[matched_entry],
+            dwell_times
+        )
+        if return_pending:
+            pending = events.loc[is_entry & ~matched_entry, ['person_tracker_id', 'zone_id', 'timestamp_seconds', 'event']]
+            return (*pairs, pending)
+        return pairs
+    
+    def _dwell_distribution(self, dwell_times: np.ndarray) -> Dict:
+        """
+        Histograma de tiempos de permanencia según self.dwell_time_bins
+        """
+        edges = [-np.inf, *self.dwell_time_bins, np.inf]
+        counts, _ = np.histogram(dwell_times, bins=edges)
+        return {key: int(count) for key, count in zip(self._dwell_bin_keys(), counts)}
+    
+    def _dwell_bin_keys(self) -> List[str]:
+        """
+        Claves de los rangos del histograma (por defecto: under_10s, 10_30s, 30_60s, over_60s)
+        """
+        bins = [f"{b:g}" for b in self.dwell_time_bins]
+        return (
+            [f"under_{bins[0]}s"]
+            + [f"{low}_{high}s" for low, high in zip(bins[:-1], bins[1:])]
+            + [f"over_{bins[-1]}s"]
+        )
+    
+    def _dwell_bin_labels(self) -> List[str]:
+        """
+        Etiquetas para gráficos (por defecto: < 10s, 10-30s, 30-60s, > 60s)
+        """
+        bins = [f"{b:g}" for b in self.dwell_time_bins]
+        return (
+            [f"< {bins[0]}s"]
+            + [f"{low}-{high}s" for low, high in zip(bins[:-1], bins[1:])]
+            + [f"> {bins[-1]}s"]
+        )
+    
     def _analyze_dwell_times_fallback(self, df: pd.DataFrame) -> Dict:
         """
         Método de respaldo para calcular tiempo de permanencia sin eventos exit
@@ -231,20 +463,16 @@ class AnalyticsProcessor:
             "note": "Calculated using first-last detection method (less accurate)"
         }
         
-        # Usar el método anterior basado en primera-última detección
-        for person_id in df['person_tracker_id'].unique():
-            person_data = df[df['person_tracker_id'] == person_id]
-            
-            for zone_id in person_data['zone_id'].unique():
-                zone_person_data = person_data[person_data['zone_id'] == zone_id]
-                
-                if len(zone_person_data) > 1:
-                    dwell_time = zone_person_data['timestamp_seconds'].max() - zone_person_data['timestamp_seconds'].min()
-                    
-                    zone_key = f"zone_{zone_id}"
-                    if zone_key not in dwell_data["by_zone"]:
-                        dwell_data["by_zone"][zone_key] = []
-                    dwell_data["by_zone"][zone_key].append(dwell_time)
+        # Usar el método anterior basado en primera-última detección,
+        # agrupando por (persona, zona) en orden de aparición
+        person_order = pd.factorize(df['person_tracker_id'])[0]
+        ordered = df.assign(_person_order=person_order).sort_values('_person_order', kind='mergesort')
+        stats = ordered.groupby(['_person_order', 'zone_id'], sort=False)['timestamp_seconds'].agg(['size', 'min', 'max'])
+        stats = stats[stats['size'] > 1]
+        
+        for (_, zone_id), row in zip(stats.index, stats.itertuples()):
+            zone_key = f"zone_{zone_id}"
+            dwell_data["by_zone"].setdefault(zone_key, []).append(row.max - row.min)
         
         # Calcular estadísticas
         for zone_key, times in dwell_data["by_zone"].items():
@@ -260,10 +488,96 @@ class AnalyticsProcessor:
         
         return dwell_data
     
-    def generate_visualization_data(self, analysis: Dict) -> Dict:
+    def _analyze_lines(self, df: pd.DataFrame, bucket_seconds: Optional[float] = None) -> Dict:
+        """
+        Cruces por línea de conteo y sentido (line_in / line_out), con personas
+        únicas y serie de cruces por intervalo de bucket_seconds
+        """
+        bucket_seconds = self.resolve_bucket_seconds(df, bucket_seconds)
+        lines = df['line_id'].to_numpy() if 'line_id' in df.columns else np.empty(0, dtype=np.int64)
+        crossing_counts = df.groupby([
+            lines,
+            self._time_buckets(df['timestamp_seconds'], bucket_seconds),
+            (df['event'] == 'line_in').to_numpy()
+        ]).size()
+        timestamps = df.groupby(lines)['timestamp_seconds']
+        line_times = pd.DataFrame({'t_min': timestamps.min(), 't_max': timestamps.max()})
+        persons = df.groupby(lines)['person_tracker_id'].nunique().to_dict()
+        return self._lines_from_counts(crossing_counts, line_times, persons, bucket_seconds)
+    
+    def _lines_from_counts(self, crossing_counts: pd.Series, line_times: pd.DataFrame,
+                           persons_per_line: Dict, bucket_seconds: float) -> Dict:
+        """
+        Resultado de line_analysis a partir de los cruces por (línea, intervalo,
+        es entrada), el primer/último cruce y las personas únicas por línea.
+        Compartido con el modo por bloques.
+        """
+        lines = {}
+        for line_id, counts in crossing_counts.groupby(level=0):
+            by_direction = counts.groupby(level=2).sum()
+            line_in, line_out = int(by_direction.get(True, 0)), int(by_direction.get(False, 0))
+            timeline = counts.droplevel(0).unstack(fill_value=0)
+            lines[f"line_{line_id}"] = {
+                "in": line_in,
+                "out": line_out,
+                "net": line_in - line_out,
+                "unique_persons": int(persons_per_line.get(line_id, 0)),
+                "first_crossing": line_times.at[line_id, 't_min'],
+                "last_crossing": line_times.at[line_id, 't_max'],
+                "crossings_timeline": {
+                    bucket: {"in": int(row.get(True, 0)), "out": int(row.get(False, 0))}
+                    for bucket, row in timeline.iterrows()
+                },
+                "bucket_seconds": bucket_seconds
+            }
+        
+        total_in = sum(line["in"] for line in lines.values())
+        total_out = sum(line["out"] for line in lines.values())
+        return {
+            "lines": lines,
+            "total_in": total_in,
+            "total_out": total_out,
+            "net": total_in - total_out,
+            "bucket_seconds": bucket_seconds
+        }
+    
+    @staticmethod
+    def _downsample_lttb(x: np.ndarray, y: np.ndarray, max_points: int):
+        """
+        Largest-Triangle-Three-Buckets: reduce una serie a max_points puntos
+        conservando su forma (picos y valles). Mantiene el primer y último punto.
+        """
+        n = len(x)
+        if max_points >= n or max_points < 3:
+            return x, y
+        
+        # max_points - 2 grupos para los puntos interiores
+        edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+        selected = np.empty(max_points, dtype=np.int64)
+        selected[0], selected[-1] = 0, n - 1
+        previous = 0
+        for i in range(max_points - 2):
+            start, end = edges[i], edges[i + 1]
+            next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+            
+            # Punto del grupo que forma el triángulo de mayor área con el anterior y el promedio siguiente
+            area = np.abs(
+                (x[previous] - avg_x) * (y[start:end] - y[previous])
+                - (x[previous] - x[start:end]) * (avg_y - y[previous])
+            )
+            previous = start + int(np.argmax(area))
+            selected[i + 1] = previous
+        
+        return x[selected], y[selected]
+    
+    def generate_visualization_data(self, analysis: Dict, max_points: Optional[int] = None) -> Dict:
         """
-        Prepara datos optimizados para visualización
+        Prepara datos optimizados para visualización. Las series de líneas se
+        reducen a max_points puntos (DEFAULT_MAX_CHART_POINTS por defecto).
         """
+        max_points = self.DEFAULT_MAX_CHART_POINTS if max_points is None else max_points
         viz_data = {
             "charts": {
                 "zone_distribution": {
@@ -290,7 +604,7 @@ class AnalyticsProcessor:
                 "dwell_time_distribution": {
                     "type": "bar",
                     "data": {
-                        "labels": ["< 10s", "10-30s", "30-60s", "> 60s"],
+                        "labels": self._dwell_bin_labels(),
                         "values": []
                     }
                 },
@@ -319,10 +633,18 @@ class AnalyticsProcessor:
             viz_data["charts"]["zone_comparison"]["data"]["values"].append(data["unique_persons"])
         
         # Preparar datos temporales
-        timeline = analysis["temporal_analysis"]["timeline"]
-        for timestamp, data in timeline.items():
-            viz_data["charts"]["temporal_activity"]["data"]["x"].append(timestamp)
-            viz_data["charts"]["temporal_activity"]["data"]["y"].append(data["detections_per_second"])
+        timeline = analysis["temporal_analysis"].get("timeline", {})
+        # float(): las claves llegan como texto si el análisis viene de JSON
+        x = np.array([float(timestamp) for timestamp in timeline], dtype=np.float64)
+        y = np.array([data["detections_per_second"] for data in timeline.values()], dtype=np.float64)
+        order = np.argsort(x, kind='mergesort')
+        x, y = self._downsample_lttb(x[order], y[order], max_points)
+        
+        temporal_chart = viz_data["charts"]["temporal_activity"]
+        temporal_chart["data"]["x"] = x.tolist()
+        temporal_chart["data"]["y"] = y.tolist()
+        temporal_chart["bucket_seconds"] = analysis["temporal_analysis"].get("bucket_seconds")
+        temporal_chart["original_points"] = len(timeline)
         
         # Preparar datos de tiempo de permanencia
         if "dwell_time_analysis" in analysis and "summary" in analysis["dwell_time_analysis"]:
@@ -332,10 +654,7 @@ class AnalyticsProcessor:
             if "distribution" in dwell_summary:
                 dist = dwell_summary["distribution"]
                 viz_data["charts"]["dwell_time_distribution"]["data"]["values"] = [
-                    dist.get("under_10s", 0),
-                    dist.get("10_30s", 0),
-                    dist.get("30_60s", 0),
-                    dist.get("over_60s", 0)
+                    dist.get(key, 0) for key in self._dwell_bin_keys()
                 ]
             
             # Tiempo promedio por zona
@@ -354,6 +673,14 @@ class AnalyticsProcessor:
         
         return viz_data
     
+    @staticmethod
+    def _count_values(series: pd.Series) -> Dict:
+        """
+        value_counts como dict, sin las categorías que no aparecen (columnas categóricas)
+        """
+        counts = series.value_counts()
+        return counts[counts > 0].to_dict()
+    
     def _analyze_demographics(self, df: pd.DataFrame) -> Dict:
         """
         Analiza atributos demográficos (género y edad) de las personas detectadas
@@ -387,7 +714,7 @@ class AnalyticsProcessor:
         # 1. Distribución por género (usando solo una entrada por persona)
         df_unique_persons = df_valid.drop_duplicates(subset=['person_tracker_id'])
         
-        gender_counts = df_unique_persons['gender'].value_counts().to_dict()
+        gender_counts = self._count_values(df_unique_persons['gender'])
         total_persons = len(df_unique_persons)
         
         demographic_data["gender_distribution"] = {
@@ -400,7 +727,7 @@ class AnalyticsProcessor:
         }
         
         # 2. Distribución por edad
-        age_counts = df_unique_persons['age'].value_counts().to_dict()
+        age_counts = self._count_values(df_unique_persons['age'])
         
         demographic_data["age_distribution"] = {
             "counts": age_counts,
@@ -419,7 +746,7 @@ class AnalyticsProcessor:
             zone_key = f"zone_{zone_id}"
             
             # Género por zona
-            zone_gender = zone_unique['gender'].value_counts().to_dict()
+            zone_gender = self._count_values(zone_unique['gender'])
             zone_total = len(zone_unique)
             
             demographic_data["gender_by_zone"][zone_key] = {
@@ -432,7 +759,7 @@ class AnalyticsProcessor:
             }
             
             # Edad por zona
-            zone_age = zone_unique['age'].value_counts().to_dict()
+            zone_age = self._count_values(zone_unique['age'])
             
             demographic_data["age_by_zone"][zone_key] = {
                 "counts": zone_age,
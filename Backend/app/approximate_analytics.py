@@ -0,0 +1,245 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.chunked_analytics import FlowPartial
+from Backend.app.events_io import iter_events, split_events
+from Backend.app.sketches import HyperLogLog, QuantileSketch, stable_salt
+
+# Precisión de los sketches guardados por tarea (deben coincidir para fusionarse)
+HLL_PRECISION = 14
+DWELL_RELATIVE_ACCURACY = 0.01
+DWELL_QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+class TaskSketches:
+    """
+    Resumen aproximado y fusionable de una o varias tareas:
+
+    - personas únicas (global y por zona) con HyperLogLog
+    - cuantiles de permanencia (global y por zona) con QuantileSketch
+    - detecciones, visitas, transiciones entre zonas y cruces de línea
+      exactos (son conteos aditivos; la matriz de transiciones tiene a lo
+      sumo zonas² celdas)
+
+    Se calcula una vez por tarea en una pasada por bloques y se guarda en el
+    sidecar de caché; los rollups entre tareas fusionan los sketches sin leer
+    ningún archivo de eventos.
+    """
+
+    def __init__(self):
+        self.task_ids: List[str] = []
+        self.rows = 0
+        self.duration_seconds = 0.0
+        self.total_frames = 0
+        self.persons = HyperLogLog(HLL_PRECISION)
+        self.zone_persons: Dict[int, HyperLogLog] = {}
+        self.zone_rows: Dict[int, int] = {}
+        self.dwell = QuantileSketch(DWELL_RELATIVE_ACCURACY)
+        self.zone_dwell: Dict[int, QuantileSketch] = {}
+        self.transitions: Dict[tuple, int] = {}
+        # Cruces por (línea, sentido)
+        self.line_crossings: Dict[tuple, int] = {}
+
+    @classmethod
+    def from_events_file(cls, path: str, task_id: str, processor: AnalyticsProcessor,
+                         chunk_rows: int = 500_000) -> "TaskSketches":
+        """
+        Sketches de un archivo de eventos. `task_id` separa los IDs de tracking
+        de esta tarea de los de otras al contar personas únicas en un rollup.
+        """
+        sketches = cls()
+        sketches.task_ids = [task_id]
+        salt = stable_salt(task_id)
+        columns = ['frame', 'timestamp_seconds', 'zone_id', 'line_id', 'person_tracker_id', 'event']
+        t_min, t_max = None, None
+        pending = None
+        flow = None
+
+        for chunk in iter_events(path, columns=columns, chunk_rows=chunk_rows):
+            chunk, line_chunk = split_events(chunk)
+            if len(line_chunk):
+                crossings = line_chunk.groupby([line_chunk['line_id'].to_numpy(),
+                                                line_chunk['event'].astype(str).to_numpy()]).size()
+                for (line_id, event), count in crossings.items():
+                    key = (int(line_id), event)
+                    sketches.line_crossings[key] = sketches.line_crossings.get(key, 0) + int(count)
+            if chunk.empty:
+                continue
+            sketches.rows += len(chunk)
+            t_min = chunk['timestamp_seconds'].min() if t_min is None else min(t_min, chunk['timestamp_seconds'].min())
+            t_max = chunk['timestamp_seconds'].max() if t_max is None else max(t_max, chunk['timestamp_seconds'].max())
+            sketches.total_frames = max(sketches.total_frames, int(chunk['frame'].max()))
+
+            persons = chunk['person_tracker_id'].to_numpy()
+            zones = chunk['zone_id'].to_numpy().astype(np.int64)
+            sketches.persons.add(persons, salt)
+            for zone_id in pd.unique(zones):
+                in_zone = zones == zone_id
+                sketches.zone_persons.setdefault(int(zone_id), HyperLogLog(HLL_PRECISION)).add(persons[in_zone], salt)
+                sketches.zone_rows[int(zone_id)] = sketches.zone_rows.get(int(zone_id), 0) + int(in_zone.sum())
+
+            partial = FlowPartial.from_chunk(chunk)
+            flow = partial if flow is None else flow.merge(partial)
+
+            # Emparejamiento FIFO entrada/salida; las entradas abiertas pasan al bloque siguiente
+            if 'event' in chunk.columns:
+                events = chunk[['person_tracker_id', 'zone_id', 'timestamp_seconds', 'event']]
+                if pending is not None and len(pending):
+                    events = pd.concat([pending, events], ignore_index=True)
+                _, dwell_zones, dwell_times, pending = processor._pair_entry_exit(events, return_pending=True)
+                sketches._add_dwell(dwell_zones, dwell_times)
+
+        if t_min is not None:
+            sketches.duration_seconds = float(t_max - t_min)
+        if flow is not None:
+            sketches.transitions = {
+                (int(source), int(target)): int(count)
+                for (source, target), count in flow.transitions.items()
+            }
+        return sketches
+
+    def _add_dwell(self, zones: np.ndarray, dwell_times: np.ndarray):
+        if len(dwell_times) == 0:
+            return
+        self.dwell.add(dwell_times)
+        zones = np.asarray(zones).astype(np.int64)
+        for zone_id in pd.unique(zones):
+            self.zone_dwell.setdefault(int(zone_id), QuantileSketch(DWELL_RELATIVE_ACCURACY)).add(
+                dwell_times[zones == zone_id]
+            )
+
+    def merge(self, other: "TaskSketches") -> "TaskSketches":
+        self.task_ids = self.task_ids + other.task_ids
+        self.rows += other.rows
+        self.duration_seconds += other.duration_seconds
+        self.total_frames += other.total_frames
+        self.persons.merge(other.persons)
+        self.dwell.merge(other.dwell)
+        for zone_id, sketch in other.zone_persons.items():
+            self.zone_persons.setdefault(zone_id, HyperLogLog(HLL_PRECISION)).merge(sketch)
+        for zone_id, sketch in other.zone_dwell.items():
+            self.zone_dwell.setdefault(zone_id, QuantileSketch(DWELL_RELATIVE_ACCURACY)).merge(sketch)
+        for zone_id, count in other.zone_rows.items():
+            self.zone_rows[zone_id] = self.zone_rows.get(zone_id, 0) + count
+        for pair, count in other.transitions.items():
+            self.transitions[pair] = self.transitions.get(pair, 0) + count
+        for key, count in other.line_crossings.items():
+            self.line_crossings[key] = self.line_crossings.get(key, 0) + count
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            "task_ids": self.task_ids,
+            "rows": self.rows,
+            "duration_seconds": self.duration_seconds,
+            "total_frames": self.total_frames,
+            "persons": self.persons.to_dict(),
+            "zone_persons": {str(zone_id): sketch.to_dict() for zone_id, sketch in self.zone_persons.items()},
+            "zone_rows": {str(zone_id): count for zone_id, count in self.zone_rows.items()},
+            "dwell": self.dwell.to_dict(),
+            "zone_dwell": {str(zone_id): sketch.to_dict() for zone_id, sketch in self.zone_dwell.items()},
+            "transitions": [[source, target, count] for (source, target), count in self.transitions.items()],
+            "line_crossings": [[line_id, event, count] for (line_id, event), count in self.line_crossings.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TaskSketches":
+        sketches = cls()
+        sketches.task_ids = list(data["task_ids"])
+        sketches.rows = data["rows"]
+        sketches.duration_seconds = data["duration_seconds"]
+        sketches.total_frames = data["total_frames"]
+        sketches.persons = HyperLogLog.from_dict(data["persons"])
+        sketches.zone_persons = {int(k): HyperLogLog.from_dict(v) for k, v in data["zone_persons"].items()}
+        sketches.zone_rows = {int(k): v for k, v in data["zone_rows"].items()}
+        sketches.dwell = QuantileSketch.from_dict(data["dwell"])
+        sketches.zone_dwell = {int(k): QuantileSketch.from_dict(v) for k, v in data["zone_dwell"].items()}
+        sketches.transitions = {(source, target): count for source, target, count in data["transitions"]}
+        sketches.line_crossings = {(line_id, event): count for line_id, event, count in data.get("line_crossings", [])}
+        return sketches
+
+    @staticmethod
+    def _dwell_stats(sketch: QuantileSketch) -> Dict:
+        stats = {
+            "total_visits": sketch.count,
+            "average_dwell_time": sketch.mean,
+            "max_dwell_time": sketch.max if sketch.count else None,
+            "min_dwell_time": sketch.min if sketch.count else None
+        }
+        stats.update({
+            f"{name}_dwell_time": sketch.quantile(q) for name, q in DWELL_QUANTILES.items()
+        })
+        return stats
+
+    def result(self) -> Dict:
+        """Analytics aproximados con las cotas de error de cada métrica"""
+        zone_ids = sorted(self.zone_rows)
+        zone_labels = {zone_id: f"zone_{zone_id}" for zone_id in zone_ids}
+        flow_data = {
+            f"{zone_labels.get(source, f'zone_{source}')}_to_{zone_labels.get(target, f'zone_{target}')}": count
+            for (source, target), count in sorted(self.transitions.items())
+        }
+        return {
+            "approximate": True,
+            "task_ids": self.task_ids,
+            "error_bounds": {
+                "unique_persons": {
+                    "method": "HyperLogLog",
+                    "relative_standard_error": round(self.persons.relative_error, 5)
+                },
+                "dwell_quantiles": {
+                    "method": "DDSketch",
+                    "max_relative_error": DWELL_RELATIVE_ACCURACY
+                },
+                "exact": ["total_detections", "total_entries", "total_visits", "average_dwell_time",
+                          "max_dwell_time", "min_dwell_time", "zone_transitions", "line_analysis"]
+            },
+            "summary": {
+                "total_detections": self.rows,
+                "unique_persons": self.persons.estimate(),
+                "zones_count": len(zone_ids),
+                "duration_seconds": self.duration_seconds,
+                "total_frames": self.total_frames,
+                "zones_detected": zone_ids
+            },
+            "zone_analysis": {
+                zone_labels[zone_id]: {
+                    "total_entries": self.zone_rows[zone_id],
+                    "unique_persons": self.zone_persons[zone_id].estimate()
+                }
+                for zone_id in zone_ids
+            },
+            "dwell_time_analysis": {
+                "by_zone": {
+                    f"zone_{zone_id}": self._dwell_stats(sketch)
+                    for zone_id, sketch in sorted(self.zone_dwell.items())
+                },
+                "summary": self._dwell_stats(self.dwell)
+            },
+            "flow_analysis": {
+                "zone_transitions": flow_data,
+                "most_common_transition": max(flow_data.items(), key=lambda x: x[1]) if flow_data else None,
+                "total_transitions": sum(flow_data.values())
+            },
+            "line_analysis": {
+                f"line_{line_id}": {
+                    "in": self.line_crossings.get((line_id, 'line_in'), 0),
+                    "out": self.line_crossings.get((line_id, 'line_out'), 0),
+                    "net": self.line_crossings.get((line_id, 'line_in'), 0)
+                           - self.line_crossings.get((line_id, 'line_out'), 0)
+                }
+                for line_id in sorted({line_id for line_id, _ in self.line_crossings})
+            }
+        }
+
+
+def rollup(sketch_dicts: List[Dict]) -> Optional[Dict]:
+    """Fusiona sketches guardados (to_dict) de varias tareas; None si no hay ninguno"""
+    merged = None
+    for data in sketch_dicts:
+        sketches = TaskSketches.from_dict(data)
+        merged = sketches if merged is None else merged.merge(sketches)
+    return merged.result() if merged is not None else None
@@ -0,0 +1,707 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Backend.app.events_io import iter_events, split_events
+from Backend.app.sketches import QuantileSketch
+
+# Error relativo de las medianas de permanencia aproximadas (ver QuantileSketch)
+DWELL_RELATIVE_ACCURACY = 0.0025
+
+
+def _union(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.union1d(a, b)
+
+
+def _pair_keys(zones: np.ndarray, persons: np.ndarray) -> np.ndarray:
+    """Clave única int64 por (zona, persona)"""
+    return (zones.astype(np.int64) << 32) | (persons.astype(np.int64) & 0xFFFFFFFF)
+
+
+def _pair_counts(first: np.ndarray, second: np.ndarray) -> pd.Series:
+    """Conteos por par (first, second) como Series con MultiIndex (vacía si no hay pares)"""
+    counts = pd.Series(np.ones(len(first), dtype=np.int64), index=pd.MultiIndex.from_arrays(
+        [np.asarray(first, dtype=np.int64), np.asarray(second, dtype=np.int64)]
+    ))
+    return counts.groupby(level=[0, 1]).sum() if len(counts) else counts
+
+
+def _first_in_order(order: List, values) -> List:
+    """Agrega a `order` los valores nuevos en orden de aparición"""
+    seen = set(order)
+    for value in values:
+        if value not in seen:
+            order.append(value)
+            seen.add(value)
+    return order
+
+
+class SummaryPartial:
+    """Estado parcial de summary: fusionable con merge()"""
+
+    def __init__(self):
+        self.rows = 0
+        self.persons = np.empty(0, dtype=np.int64)
+        self.zones = np.empty(0, dtype=np.int64)
+        self.t_min = None
+        self.t_max = None
+        self.frame_max = 0
+
+    @classmethod
+    def from_chunk(cls, chunk: pd.DataFrame) -> "SummaryPartial":
+        partial = cls()
+        partial.rows = len(chunk)
+        partial.persons = np.unique(chunk['person_tracker_id'].to_numpy())
+        partial.zones = np.unique(chunk['zone_id'].to_numpy())
+        partial.t_min = chunk['timestamp_seconds'].min()
+        partial.t_max = chunk['timestamp_seconds'].max()
+        partial.frame_max = chunk['frame'].max()
+        return partial
+
+    def merge(self, other: "SummaryPartial") -> "SummaryPartial":
+        self.rows += other.rows
+        self.persons = _union(self.persons, other.persons)
+        self.zones = _union(self.zones, other.zones)
+        self.t_min = other.t_min if self.t_min is None else min(self.t_min, other.t_min)
+        self.t_max = other.t_max if self.t_max is None else max(self.t_max, other.t_max)
+        self.frame_max = max(self.frame_max, other.frame_max)
+        return self
+
+    def result(self) -> Dict:
+        return {
+            "total_detections": self.rows,
+            "unique_persons": len(self.persons),
+            "zones_count": len(self.zones),
+            "duration_seconds": self.t_max - self.t_min,
+            "total_frames": self.frame_max,
+            "detection_rate": self.rows / (self.frame_max or 1),
+            "zones_detected": self.zones.tolist()
+        }
+
+
+class ZoneTimelinePartial:
+    """
+    Estado parcial de zone_analysis y temporal_analysis: detecciones por
+    (intervalo, zona) más estadísticas por zona. Con bucket automático la
+    serie empieza en el menor intervalo y se agrupa en el siguiente de
+    TIME_BUCKET_STEPS cuando supera MAX_TIMELINE_BUCKETS.
+    """
+
+    def __init__(self, processor, bucket_seconds: Optional[float]):
+        self.processor = processor
+        self.auto_bucket = bucket_seconds is None
+        self.bucket_seconds = float(processor.TIME_BUCKET_STEPS[0] if bucket_seconds is None else bucket_seconds)
+        self.bucket_counts = pd.Series(dtype=np.int64)
+        self.zone_order: List = []
+        self.zone_stats = pd.DataFrame(columns=['rows', 't_min', 't_max', 'peak_frame', 'peak_count'])
+        self.pair_keys = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_chunk(cls, chunk: pd.DataFrame, processor, bucket_seconds: Optional[float]) -> "ZoneTimelinePartial":
+        partial = cls(processor, bucket_seconds)
+        zones = chunk['zone_id'].to_numpy()
+        partial.bucket_counts = chunk.groupby(
+            [processor._time_buckets(chunk['timestamp_seconds'], partial.bucket_seconds), zones]
+        ).size()
+        partial.zone_order = list(pd.unique(zones))
+
+        # Los bloques no parten frames: el conteo por frame de cada bloque es completo
+        frame_counts = chunk.groupby(['zone_id', 'frame'], observed=True).size()
+        peaks = frame_counts.groupby(level=0).idxmax()
+        timestamps = chunk.groupby('zone_id', observed=True)['timestamp_seconds']
+        partial.zone_stats = pd.DataFrame({
+            'rows': chunk.groupby('zone_id', observed=True).size(),
+            't_min': timestamps.min(),
+            't_max': timestamps.max(),
+            'peak_frame': [frame for _, frame in peaks],
+            'peak_count': frame_counts.loc[list(peaks)].to_numpy()
+        }, index=peaks.index)
+        partial.pair_keys = np.unique(_pair_keys(zones, chunk['person_tracker_id'].to_numpy()))
+        return partial
+
+    def merge(self, other: "ZoneTimelinePartial") -> "ZoneTimelinePartial":
+        """Fusiona un estado posterior en el orden del archivo"""
+        while other.bucket_seconds > self.bucket_seconds:
+            self._coarsen()
+        while self.bucket_seconds > other.bucket_seconds:
+            other._coarsen()
+
+        self.bucket_counts = pd.concat([self.bucket_counts, other.bucket_counts]).groupby(level=[0, 1]).sum()
+        self.zone_order = _first_in_order(self.zone_order, other.zone_order)
+        self.pair_keys = _union(self.pair_keys, other.pair_keys)
+
+        stats = pd.concat([self.zone_stats, other.zone_stats])
+        grouped = stats.groupby(level=0)
+        # Pico: el primero con el conteo máximo (los frames del estado previo son anteriores)
+        best = (stats.rename_axis('zone_id').reset_index()
+                .sort_values('peak_count', ascending=False, kind='mergesort')
+                .groupby('zone_id').first())
+        self.zone_stats = pd.DataFrame({
+            'rows': grouped['rows'].sum(),
+            't_min': grouped['t_min'].min(),
+            't_max': grouped['t_max'].max(),
+            'peak_frame': best['peak_frame'],
+            'peak_count': best['peak_count']
+        })
+
+        if self.auto_bucket:
+            while (self.bucket_counts.index.get_level_values(0).nunique() > self.processor.MAX_TIMELINE_BUCKETS + 1
+                   and self._coarsen()):
+                pass
+        return self
+
+    def _coarsen(self, target: Optional[float] = None) -> bool:
+        """Reagrupa la serie en el siguiente intervalo (o en `target`); False si no hay mayor"""
+        larger = [step for step in self.processor.TIME_BUCKET_STEPS if step > self.bucket_seconds]
+        if target is None and not larger:
+            return False
+        self.bucket_seconds = float(target if target is not None else larger[0])
+        buckets = self.bucket_counts.index.get_level_values(0).to_numpy(dtype=np.float64)
+        coarse = np.round(np.floor(np.round(buckets / self.bucket_seconds, 6)) * self.bucket_seconds, 6)
+        self.bucket_counts = self.bucket_counts.groupby(
+            [coarse, self.bucket_counts.index.get_level_values(1)]
+        ).sum()
+        return True
+
+    def _final_bucket_counts(self, t_min: float, t_max: float) -> pd.Series:
+        if self.auto_bucket:
+            target = self.processor.bucket_for_duration(float(t_max - t_min))
+            if target > self.bucket_seconds:
+                self._coarsen(target)
+        return self.bucket_counts
+
+    def temporal_result(self, t_min: float, t_max: float) -> Dict:
+        bucket_counts = self._final_bucket_counts(t_min, t_max)
+        return self.processor._temporal_from_bucket_counts(bucket_counts, self.bucket_seconds)
+
+    def zones_result(self, t_min: float, t_max: float) -> Dict:
+        bucket_counts = self._final_bucket_counts(t_min, t_max)
+        pair_zones = (self.pair_keys >> 32)
+        zone_ids, persons_per_zone = np.unique(pair_zones, return_counts=True)
+        persons_per_zone = dict(zip(zone_ids.tolist(), persons_per_zone.tolist()))
+        timelines = {
+            zone_id: counts.droplevel(1).to_dict()
+            for zone_id, counts in bucket_counts.groupby(level=1)
+        }
+
+        zone_stats = {}
+        for zone_id in self.zone_order:
+            stats = self.zone_stats.loc[zone_id]
+            zone_stats[f"zone_{zone_id}"] = {
+                "total_entries": int(stats['rows']),
+                "unique_persons": persons_per_zone.get(int(zone_id), 0),
+                "first_detection": stats['t_min'],
+                "last_detection": stats['t_max'],
+                "activity_duration": stats['t_max'] - stats['t_min'],
+                "peak_frame": int(stats['peak_frame']),
+                "entries_timeline": timelines.get(zone_id, {}),
+                "bucket_seconds": self.bucket_seconds
+            }
+        return zone_stats
+
+
+class FlowPartial:
+    """
+    Estado parcial de flow_analysis: matriz de transiciones más la primera y
+    la última zona de cada persona, para contar la transición en el límite
+    entre dos estados consecutivos al fusionarlos
+    """
+
+    def __init__(self):
+        self.transitions = _pair_counts(np.empty(0), np.empty(0))
+        self.first_zone = pd.Series(dtype=np.int64)
+        self.last_zone = pd.Series(dtype=np.int64)
+
+    @classmethod
+    def from_chunk(cls, chunk: pd.DataFrame) -> "FlowPartial":
+        partial = cls()
+        ordered = chunk.sort_values(['person_tracker_id', 'timestamp_seconds'], kind='mergesort')
+        persons = ordered['person_tracker_id'].to_numpy()
+        zones = ordered['zone_id'].to_numpy().astype(np.int64)
+
+        is_transition = (persons[1:] == persons[:-1]) & (zones[1:] != zones[:-1])
+        partial.transitions = _pair_counts(zones[:-1][is_transition], zones[1:][is_transition])
+
+        starts = np.r_[True, persons[1:] != persons[:-1]]
+        ends = np.r_[persons[1:] != persons[:-1], True]
+        partial.first_zone = pd.Series(zones[starts], index=persons[starts])
+        partial.last_zone = pd.Series(zones[ends], index=persons[ends])
+        return partial
+
+    def merge(self, other: "FlowPartial") -> "FlowPartial":
+        """Fusiona un estado posterior en el orden del archivo"""
+        previous = self.last_zone.reindex(other.first_zone.index)
+        boundary = previous.notna() & (previous != other.first_zone)
+        boundary_transitions = _pair_counts(previous[boundary].to_numpy(), other.first_zone[boundary].to_numpy())
+        transitions = pd.concat([self.transitions, other.transitions, boundary_transitions])
+        self.transitions = transitions.groupby(level=[0, 1]).sum() if len(transitions) else transitions
+        self.first_zone = self.first_zone.combine_first(other.first_zone)
+        self.last_zone = other.last_zone.combine_first(self.last_zone)
+        return self
+
+    def result(self, zone_ids: np.ndarray) -> Dict:
+        zone_ids = np.sort(zone_ids)
+        n_zones = len(zone_ids)
+        matrix = np.zeros((n_zones, n_zones), dtype=np.int64)
+        if len(self.transitions):
+            rows = np.searchsorted(zone_ids, self.transitions.index.get_level_values(0).to_numpy())
+            cols = np.searchsorted(zone_ids, self.transitions.index.get_level_values(1).to_numpy())
+            np.add.at(matrix, (rows, cols), self.transitions.to_numpy())
+
+        zone_labels = [f"zone_{zone_id}" for zone_id in zone_ids]
+        flow_data = {
+            f"{zone_labels[i]}_to_{zone_labels[j]}": int(matrix[i, j])
+            for i, j in zip(*np.nonzero(matrix))
+        }
+        return {
+            "zone_transitions": flow_data,
+            "transition_matrix": {"zones": zone_labels, "matrix": matrix.tolist()},
+            "most_common_transition": max(flow_data.items(), key=lambda x: x[1]) if flow_data else None,
+            "total_transitions": int(matrix.sum())
+        }
+
+
+class DwellAccumulator:
+    """
+    Tiempos de permanencia por bloques, en orden del archivo: las entradas sin
+    salida pasan al bloque siguiente para conservar el emparejamiento FIFO.
+    Por zona se acumulan conteo, media y M2 (Welford/Chan), extremos e
+    un QuantileSketch, así la memoria no depende del número de visitas. La
+    mediana tiene error relativo <= DWELL_RELATIVE_ACCURACY.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.has_exits = False
+        self.pending = None
+        self.zone_order: List = []
+        self.by_zone: Dict = {}
+        self.by_person = pd.DataFrame(columns=['total', 'count', 'max', 'min'])
+        self.distribution = np.zeros(len(processor.dwell_time_bins) + 1, dtype=np.int64)
+        self.quantiles = QuantileSketch(DWELL_RELATIVE_ACCURACY)
+        # Respaldo sin eventos exit: primera y última detección por (persona, zona)
+        self.first_last = pd.DataFrame(columns=['size', 'min', 'max'])
+
+    def update(self, chunk: pd.DataFrame):
+        if 'event' in chunk.columns:
+            self.has_exits = self.has_exits or bool((chunk['event'] == 'exit').any())
+
+        # El respaldo solo se usa si no aparece ninguna salida en todo el archivo
+        if self.has_exits:
+            self.first_last = self.first_last.iloc[0:0]
+        else:
+            stats = chunk.groupby(['person_tracker_id', 'zone_id'], sort=False, observed=True)['timestamp_seconds'].agg(
+                ['size', 'min', 'max']
+            )
+            if len(self.first_last):
+                combined = pd.concat([self.first_last, stats]).groupby(level=[0, 1], sort=False)
+                stats = pd.DataFrame({
+                    'size': combined['size'].sum(), 'min': combined['min'].min(), 'max': combined['max'].max()
+                })
+            self.first_last = stats
+
+        if 'event' not in chunk.columns:
+            return
+
+        events = chunk[['person_tracker_id', 'zone_id', 'timestamp_seconds', 'event']]
+        if self.pending is not None and len(self.pending):
+            events = pd.concat([self.pending, events], ignore_index=True)
+        persons, zones, dwell_times, self.pending = self.processor._pair_entry_exit(events, return_pending=True)
+        if len(dwell_times):
+            self._add_pairs(persons, zones, dwell_times)
+
+    def _add_pairs(self, persons: np.ndarray, zones: np.ndarray, dwell_times: np.ndarray):
+        edges = [-np.inf, *self.processor.dwell_time_bins, np.inf]
+        self.distribution += np.histogram(dwell_times, bins=edges)[0]
+        self.quantiles.add(dwell_times)
+
+        self.zone_order = _first_in_order(self.zone_order, pd.unique(zones))
+        for zone_id in pd.unique(zones):
+            times = dwell_times[zones == zone_id]
+            sketch = QuantileSketch(DWELL_RELATIVE_ACCURACY)
+            sketch.add(times)
+            self._merge_zone(zone_id, len(times), times.mean(), ((times - times.mean()) ** 2).sum(),
+                             times.max(), times.min(), sketch)
+
+        chunk_people = pd.DataFrame({'person': persons, 'dwell': dwell_times}).groupby('person', sort=False)['dwell'].agg(
+            total='sum', count='size', max='max', min='min'
+        )
+        if len(self.by_person):
+            combined = pd.concat([self.by_person, chunk_people]).groupby(level=0, sort=False)
+            chunk_people = pd.DataFrame({
+                'total': combined['total'].sum(), 'count': combined['count'].sum(),
+                'max': combined['max'].max(), 'min': combined['min'].min()
+            })
+        self.by_person = chunk_people
+
+    def _merge_zone(self, zone_id, count, mean, m2, maximum, minimum, sketch):
+        state = self.by_zone.get(zone_id)
+        if state is None:
+            self.by_zone[zone_id] = {'count': count, 'mean': mean, 'm2': m2, 'max': maximum,
+                                     'min': minimum, 'sketch': sketch}
+            return
+        # Combinación de media y M2 de dos grupos (Chan et al.)
+        total = state['count'] + count
+        delta = mean - state['mean']
+        state['m2'] += m2 + delta ** 2 * state['count'] * count / total
+        state['mean'] += delta * count / total
+        state['count'] = total
+        state['max'] = max(state['max'], maximum)
+        state['min'] = min(state['min'], minimum)
+        state['sketch'].merge(sketch)
+
+    def result(self) -> Dict:
+        note = "Chunked mode: medians approximated with a quantile sketch (<0.25% relative error), raw_times omitted"
+        if not self.has_exits:
+            return self._fallback_result(note)
+
+        dwell_data = {"by_zone": {}, "by_person": {}, "summary": {}, "note": note}
+        if not self.by_zone:
+            return dwell_data
+
+        for zone_id in self.zone_order:
+            state = self.by_zone[zone_id]
+            dwell_data["by_zone"][f"zone_{zone_id}"] = {
+                "average_dwell_time": state['mean'],
+                "median_dwell_time": state['sketch'].quantile(0.5),
+                "total_visits": state['count'],
+                "max_dwell_time": state['max'],
+                "min_dwell_time": state['min'],
+                "std_dwell_time": np.sqrt(state['m2'] / state['count'])
+            }
+
+        dwell_data["by_person"] = {
+            f"person_{person}": {
+                "total_dwell_time": row.total,
+                "average_dwell_time": row.total / row.count,
+                "visits_count": int(row.count),
+                "max_dwell_time": row.max,
+                "min_dwell_time": row.min
+            }
+            for person, row in zip(self.by_person.index, self.by_person.itertuples())
+        }
+
+        states = list(self.by_zone.values())
+        total_visits = sum(state['count'] for state in states)
+        longest = max(state['max'] for state in states)
+        shortest = min(state['min'] for state in states)
+        dwell_data["summary"] = {
+            "overall_average": sum(state['mean'] * state['count'] for state in states) / total_visits,
+            "overall_median": self.quantiles.quantile(0.5),
+            "total_measured_visits": total_visits,
+            "longest_stay": longest,
+            "shortest_stay": shortest,
+            "distribution": {
+                key: int(count) for key, count in zip(self.processor._dwell_bin_keys(), self.distribution)
+            }
+        }
+        return dwell_data
+
+    def _fallback_result(self, note: str) -> Dict:
+        """Como _analyze_dwell_times_fallback, desde (tamaño, mín, máx) por (persona, zona)"""
+        dwell_data = {
+            "by_zone": {},
+            "by_person": {},
+            "summary": {},
+            "note": "Calculated using first-last detection method (less accurate). " + note
+        }
+        stats = self.first_last[self.first_last['size'] > 1]
+        durations = (stats['max'] - stats['min']).to_numpy()
+        zones = stats.index.get_level_values(1).to_numpy()
+        for zone_id in pd.unique(zones):
+            times = durations[zones == zone_id].tolist()
+            dwell_data["by_zone"][f"zone_{zone_id}"] = {
+                "average_dwell_time": np.mean(times),
+                "median_dwell_time": np.median(times),
+                "total_visits": len(times),
+                "max_dwell_time": max(times),
+                "min_dwell_time": min(times)
+            }
+        return dwell_data
+
+
+class DemographicsPartial:
+    """
+    Estado parcial de demographic_analysis: primera clasificación válida por
+    persona y por (zona, persona), conteos y sumas de confianza
+    """
+
+    def __init__(self):
+        self.has_columns = True
+        self.persons = np.empty(0, dtype=np.int64)
+        self.first_by_person = pd.DataFrame(columns=['person_tracker_id', 'gender', 'age'])
+        self.first_by_zone = pd.DataFrame(columns=['zone_id', 'person_tracker_id', 'gender', 'age'])
+        self.valid_rows = 0
+        self.confidence_sums = {'gender_confidence': [0.0, 0], 'age_confidence': [0.0, 0]}
+
+    @classmethod
+    def from_chunk(cls, chunk: pd.DataFrame) -> "DemographicsPartial":
+        partial = cls()
+        partial.persons = np.unique(chunk['person_tracker_id'].to_numpy())
+        if 'gender' not in chunk.columns or 'age' not in chunk.columns:
+            partial.has_columns = False
+            return partial
+
+        valid = chunk[(chunk['gender'] != 'Desconocido') & (chunk['age'] != 'Desconocido')]
+        partial.valid_rows = len(valid)
+        partial.first_by_person = valid.drop_duplicates(subset=['person_tracker_id'])[
+            ['person_tracker_id', 'gender', 'age']
+        ].astype({'gender': object, 'age': object})
+        partial.first_by_zone = valid.drop_duplicates(subset=['zone_id', 'person_tracker_id'])[
+            ['zone_id', 'person_tracker_id', 'gender', 'age']
+        ].astype({'gender': object, 'age': object})
+        for column in partial.confidence_sums:
+            if column in valid.columns:
+                values = valid[column].dropna()
+                partial.confidence_sums[column] = [float(values.to_numpy(dtype=np.float64).sum()), len(values)]
+        return partial
+
+    def merge(self, other: "DemographicsPartial") -> "DemographicsPartial":
+        """Fusiona un estado posterior en el orden del archivo (conserva la primera clasificación)"""
+        self.has_columns = self.has_columns and other.has_columns
+        self.persons = _union(self.persons, other.persons)
+        self.valid_rows += other.valid_rows
+        self.first_by_person = pd.concat([self.first_by_person, other.first_by_person]).drop_duplicates(
+            subset=['person_tracker_id']
+        )
+        self.first_by_zone = pd.concat([self.first_by_zone, other.first_by_zone]).drop_duplicates(
+            subset=['zone_id', 'person_tracker_id']
+        )
+        for column, (total, count) in other.confidence_sums.items():
+            self.confidence_sums[column][0] += total
+            self.confidence_sums[column][1] += count
+        return self
+
+    def result(self, processor) -> Dict:
+        demographic_data = {
+            "gender_distribution": {},
+            "age_distribution": {},
+            "gender_by_zone": {},
+            "age_by_zone": {},
+            "summary": {},
+            "has_data": False
+        }
+        if not self.has_columns:
+            demographic_data["note"] = "No demographic data available in this analysis"
+            return demographic_data
+        if self.valid_rows == 0:
+            demographic_data["note"] = "No valid demographic data found"
+            return demographic_data
+
+        demographic_data["has_data"] = True
+        total_persons = len(self.first_by_person)
+        gender_counts = processor._count_values(self.first_by_person['gender'])
+        age_counts = processor._count_values(self.first_by_person['age'])
+
+        demographic_data["gender_distribution"] = {
+            "counts": gender_counts,
+            "percentages": {gender: round((count / total_persons) * 100, 2) for gender, count in gender_counts.items()},
+            "total_classified": total_persons
+        }
+        demographic_data["age_distribution"] = {
+            "counts": age_counts,
+            "percentages": {age: round((count / total_persons) * 100, 2) for age, count in age_counts.items()},
+            "total_classified": total_persons
+        }
+
+        for zone_id, zone_unique in self.first_by_zone.groupby('zone_id', sort=False):
+            zone_key = f"zone_{zone_id}"
+            zone_total = len(zone_unique)
+            zone_gender = processor._count_values(zone_unique['gender'])
+            zone_age = processor._count_values(zone_unique['age'])
+            demographic_data["gender_by_zone"][zone_key] = {
+                "counts": zone_gender,
+                "percentages": {gender: round((count / zone_total) * 100, 2) for gender, count in zone_gender.items()},
+                "total": zone_total
+            }
+            demographic_data["age_by_zone"][zone_key] = {
+                "counts": zone_age,
+                "percentages": {age: round((count / zone_total) * 100, 2) for age, count in zone_age.items()},
+                "total": zone_total
+            }
+
+        averages = {
+            column: (total / count if count else 0)
+            for column, (total, count) in self.confidence_sums.items()
+        }
+        demographic_data["summary"] = {
+            "total_persons_classified": total_persons,
+            "total_detections_with_demographics": self.valid_rows,
+            "classification_rate": round((total_persons / len(self.persons)) * 100, 2),
+            "average_gender_confidence": round(averages['gender_confidence'], 3),
+            "average_age_confidence": round(averages['age_confidence'], 3),
+            "most_common_gender": max(gender_counts, key=gender_counts.get) if gender_counts else "N/A",
+            "most_common_age": max(age_counts, key=age_counts.get) if age_counts else "N/A"
+        }
+        return demographic_data
+
+
+class LinePartial:
+    """
+    Estado parcial de line_analysis: cruces por (línea, intervalo, sentido),
+    primer/último cruce y pares (línea, persona). El intervalo automático se
+    agrupa como en ZoneTimelinePartial.
+    """
+
+    def __init__(self, processor, bucket_seconds: Optional[float]):
+        self.processor = processor
+        self.auto_bucket = bucket_seconds is None
+        self.bucket_seconds = float(processor.TIME_BUCKET_STEPS[0] if bucket_seconds is None else bucket_seconds)
+        self.crossing_counts = pd.Series(dtype=np.int64)
+        self.line_times = pd.DataFrame(columns=['t_min', 't_max'])
+        self.pair_keys = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_chunk(cls, chunk: pd.DataFrame, processor, bucket_seconds: Optional[float]) -> "LinePartial":
+        partial = cls(processor, bucket_seconds)
+        lines = chunk['line_id'].to_numpy()
+        partial.crossing_counts = chunk.groupby([
+            lines,
+            processor._time_buckets(chunk['timestamp_seconds'], partial.bucket_seconds),
+            (chunk['event'] == 'line_in').to_numpy()
+        ]).size()
+        timestamps = chunk.groupby(lines)['timestamp_seconds']
+        partial.line_times = pd.DataFrame({'t_min': timestamps.min(), 't_max': timestamps.max()})
+        partial.pair_keys = np.unique(_pair_keys(lines, chunk['person_tracker_id'].to_numpy()))
+        return partial
+
+    def merge(self, other: "LinePartial") -> "LinePartial":
+        while other.bucket_seconds > self.bucket_seconds:
+            self._coarsen()
+        while self.bucket_seconds > other.bucket_seconds:
+            other._coarsen()
+
+        self.crossing_counts = pd.concat([self.crossing_counts, other.crossing_counts]).groupby(level=[0, 1, 2]).sum()
+        grouped = pd.concat([self.line_times, other.line_times]).groupby(level=0)
+        self.line_times = pd.DataFrame({'t_min': grouped['t_min'].min(), 't_max': grouped['t_max'].max()})
+        self.pair_keys = _union(self.pair_keys, other.pair_keys)
+
+        if self.auto_bucket:
+            while (self.crossing_counts.index.get_level_values(1).nunique() > self.processor.MAX_TIMELINE_BUCKETS + 1
+                   and self._coarsen()):
+                pass
+        return self
+
+    def _coarsen(self, target: Optional[float] = None) -> bool:
+        """Reagrupa la serie en el siguiente intervalo (o en `target`); False si no hay mayor"""
+        larger = [step for step in self.processor.TIME_BUCKET_STEPS if step > self.bucket_seconds]
+        if target is None and not larger:
+            return False
+        self.bucket_seconds = float(target if target is not None else larger[0])
+        index = self.crossing_counts.index
+        buckets = index.get_level_values(1).to_numpy(dtype=np.float64)
+        coarse = np.round(np.floor(np.round(buckets / self.bucket_seconds, 6)) * self.bucket_seconds, 6)
+        self.crossing_counts = self.crossing_counts.groupby(
+            [index.get_level_values(0), coarse, index.get_level_values(2)]
+        ).sum()
+        return True
+
+    def result(self, t_min: float, t_max: float) -> Dict:
+        if self.auto_bucket:
+            target = self.processor.bucket_for_duration(float(t_max - t_min))
+            if target > self.bucket_seconds:
+                self._coarsen(target)
+        lines, persons_per_line = np.unique(self.pair_keys >> 32, return_counts=True)
+        return self.processor._lines_from_counts(
+            self.crossing_counts, self.line_times, dict(zip(lines.tolist(), persons_per_line.tolist())),
+            self.bucket_seconds
+        )
+
+
+class ChunkedAnalytics:
+    """
+    Analytics de un archivo de eventos en una sola pasada por bloques, con
+    memoria acotada por personas, zonas e intervalos (no por filas).
+
+    Cada bloque produce un estado parcial por sección que se fusiona con el
+    acumulado (merge). Los resultados tienen el mismo formato que
+    AnalyticsProcessor salvo en dwell_time_analysis: sin raw_times y con
+    medianas aproximadas (ver DwellAccumulator).
+    """
+
+    def __init__(self, processor, chunk_rows: int = 500_000):
+        self.processor = processor
+        self.chunk_rows = chunk_rows
+
+    def _duration(self, path: str) -> float:
+        """Duración del archivo (último menos primer timestamp), leyendo solo esa columna"""
+        t_min, t_max = None, None
+        for chunk in iter_events(path, columns=['timestamp_seconds'], chunk_rows=self.chunk_rows):
+            if len(chunk):
+                t_min = chunk['timestamp_seconds'].min() if t_min is None else min(t_min, chunk['timestamp_seconds'].min())
+                t_max = chunk['timestamp_seconds'].max() if t_max is None else max(t_max, chunk['timestamp_seconds'].max())
+        return float(t_max - t_min) if t_min is not None else 0.0
+
+    def process_events_file(self, path: str, sections: Optional[List[str]] = None,
+                            bucket_seconds: Optional[float] = None) -> Dict:
+        processor = self.processor
+        sections = list(processor.SECTIONS) if sections is None else list(sections)
+        columns = sorted({column for section in sections for column in processor.SECTIONS[section][1]}
+                         | {'timestamp_seconds', 'zone_id', 'person_tracker_id', 'event'})
+
+        # Summary siempre se acumula: aporta duración y zonas a las demás secciones
+        summary = None
+        zone_timeline = None
+        flow = None
+        demographics = None
+        lines = None
+        dwell = DwellAccumulator(processor) if "dwell_time_analysis" in sections else None
+        needs_timeline = any(section in sections for section in ("zone_analysis", "temporal_analysis"))
+        # Rango de tiempo de todos los eventos (zona y línea): determina el intervalo automático
+        t_min, t_max = None, None
+        if bucket_seconds is not None:
+            # Un intervalo pedido que deja demasiados intervalos se agrupa como el
+            # automático: hace falta la duración antes de acumular las series
+            bucket_seconds = processor.bucket_for_duration(self._duration(path), bucket_seconds)
+
+        for chunk in iter_events(path, columns=columns, chunk_rows=self.chunk_rows):
+            t_min = chunk['timestamp_seconds'].min() if t_min is None else min(t_min, chunk['timestamp_seconds'].min())
+            t_max = chunk['timestamp_seconds'].max() if t_max is None else max(t_max, chunk['timestamp_seconds'].max())
+            chunk, line_chunk = split_events(chunk)
+            if "line_analysis" in sections and len(line_chunk):
+                partial = LinePartial.from_chunk(line_chunk, processor, bucket_seconds)
+                lines = partial if lines is None else lines.merge(partial)
+            if chunk.empty:
+                continue
+
+            partial = SummaryPartial.from_chunk(chunk)
+            summary = partial if summary is None else summary.merge(partial)
+            if needs_timeline:
+                partial = ZoneTimelinePartial.from_chunk(chunk, processor, bucket_seconds)
+                zone_timeline = partial if zone_timeline is None else zone_timeline.merge(partial)
+            if "flow_analysis" in sections:
+                partial = FlowPartial.from_chunk(chunk)
+                flow = partial if flow is None else flow.merge(partial)
+            if "demographic_analysis" in sections:
+                partial = DemographicsPartial.from_chunk(chunk)
+                demographics = partial if demographics is None else demographics.merge(partial)
+            if dwell is not None:
+                dwell.update(chunk)
+
+        if t_min is None:
+            return {"error": "CSV file is empty"}
+
+        # Intervalo resuelto sobre todo el archivo, como en el modo en memoria
+        bucket = processor.bucket_for_duration(float(t_max - t_min), bucket_seconds)
+        results = {}
+        for section in sections:
+            if section == "line_analysis":
+                results[section] = (lines.result(t_min, t_max) if lines is not None
+                                    else processor._analyze_lines(pd.DataFrame(columns=columns), bucket_seconds=bucket))
+            elif summary is None:
+                # Configuración solo con líneas: sin eventos de zona que analizar
+                results[section] = processor._generate_summary(pd.DataFrame()) if section == "summary" else {}
+            elif section == "summary":
+                results[section] = summary.result()
+            elif section == "zone_analysis":
+                results[section] = zone_timeline.zones_result(t_min, t_max)
+            elif section == "temporal_analysis":
+                results[section] = zone_timeline.temporal_result(t_min, t_max)
+            elif section == "flow_analysis":
+                results[section] = flow.result(summary.zones)
+            elif section == "dwell_time_analysis":
+                results[section] = dwell.result()
+            elif section == "demographic_analysis":
+                results[section] = demographics.result(processor)
+        return results
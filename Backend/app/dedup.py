@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+def processing_fingerprint(content_sha256: str, params: Dict) -> str:
+    """
+    Huella de un procesamiento: SHA-256 del video más los parámetros que
+    determinan el resultado (mismo video con otros parámetros = otra huella)
+    """
+    payload = json.dumps({"content_sha256": content_sha256.lower(), "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DedupIndex:
+    """
+    Índice persistente (SQLite) huella -> task_id de los videos procesados.
+
+    Al recibir un video con una huella ya registrada se reutiliza esa tarea
+    en lugar de volver a correr YOLO: si terminó se sirven sus resultados y si
+    sigue en curso el cliente se une a ella. El estado se decide al consultar
+    (`state_of(task_id)`), así una tarea fallida o con resultados borrados no
+    bloquea el reprocesamiento.
+    """
+
+    DB_DIRNAME = ".index"
+    DB_FILENAME = "dedup_v1.sqlite3"
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.db_path = os.path.join(output_dir, self.DB_DIRNAME, self.DB_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Conexión de corta duración: commit al salir sin error y cierre siempre"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS processed_videos (
+                    fingerprint TEXT PRIMARY KEY,
+                    task_id TEXT NOT NULL,
+                    content_sha256 TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_videos_task ON processed_videos(task_id)")
+
+    def claim(self, content_sha256: str, params: Dict, task_id: str,
+              state_of: Callable[[str], Optional[str]], force: bool = False) -> Dict:
+        """
+        Registra `task_id` para la huella del video, salvo que ya exista una
+        tarea reutilizable. `state_of(task_id)` retorna 'completed',
+        'in_progress' o None (fallida/inexistente). Retorna {task_id,
+        fingerprint, deduplicated, state}: si deduplicated es True, task_id es
+        la tarea existente y no hay que procesar.
+        """
+        fingerprint = processing_fingerprint(content_sha256, params)
+        # Consulta y registro atómicos: dos subidas simultáneas del mismo video no procesan dos veces
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT task_id FROM processed_videos WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is not None and not force and row["task_id"] != task_id:
+                state = state_of(row["task_id"])
+                if state is not None:
+                    return {"task_id": row["task_id"], "fingerprint": fingerprint,
+                            "deduplicated": True, "state": state}
+
+            conn.execute(
+                "INSERT OR REPLACE INTO processed_videos (fingerprint, task_id, content_sha256, params, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, task_id, content_sha256.lower(), json.dumps(params, sort_keys=True), time.time())
+            )
+        return {"task_id": task_id, "fingerprint": fingerprint, "deduplicated": False, "state": "in_progress"}
+
+    def find(self, content_sha256: str, params: Dict,
+             state_of: Callable[[str], Optional[str]]) -> Optional[Dict]:
+        """Tarea reutilizable para el video y parámetros (sin registrar nada), o None"""
+        fingerprint = processing_fingerprint(content_sha256, params)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT task_id FROM processed_videos WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        if row is None:
+            return None
+        state = state_of(row["task_id"])
+        if state is None:
+            return None
+        return {"task_id": row["task_id"], "fingerprint": fingerprint, "deduplicated": True, "state": state}
+
+
+_dedup_indexes: Dict[str, DedupIndex] = {}
+_dedup_indexes_lock = threading.Lock()
+
+
+def get_dedup_index(output_dir: str) -> DedupIndex:
+    """
+    Obtiene (o crea) el índice de deduplicación asociado a un directorio de salida
+    """
+    key = os.path.abspath(output_dir)
+    with _dedup_indexes_lock:
+        if key not in _dedup_indexes:
+            _dedup_indexes[key] = DedupIndex(output_dir)
+        return _dedup_indexes[key]
@@ -0,0 +1,321 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from Backend.app.chunked_analytics import SummaryPartial
+from Backend.app.events_io import iter_events, list_events_files, split_events
+from Backend.app.index_db import remove_superseded_databases
+from Backend.app.responses import dumps_json, loads_json
+
+
+class EventStore:
+    """
+    Almacén analítico local (SQLite) con los eventos de todas las tareas.
+
+    El pipeline ingiere el archivo de eventos al completar cada tarea y los
+    endpoints consultan agregados filtrados por tarea, zona, tiempo y
+    demografía con una sola consulta indexada, sin releer archivos. Como
+    SummaryIndex, se re-sincroniza de forma incremental comparando tamaño y
+    mtime de cada archivo de eventos (solo se ingieren los nuevos o modificados).
+    """
+
+    DB_DIRNAME = ".index"
+    DB_FILENAME = "event_store_v3.sqlite3"
+
+    EVENT_COLUMNS = (
+        "timestamp_seconds", "frame", "zone_id", "line_id", "person_tracker_id", "event",
+        "gender", "gender_confidence", "age", "age_confidence"
+    )
+
+    # Dimensiones de agrupación permitidas -> expresión SQL
+    GROUP_COLUMNS = {
+        "task_id": "t.task_id",
+        "zone_id": "e.zone_id",
+        "line_id": "e.line_id",
+        "event": "e.event",
+        "gender": "e.gender",
+        "age": "e.age"
+    }
+
+    INGEST_CHUNK_ROWS = 200_000
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.db_path = os.path.join(output_dir, self.DB_DIRNAME, self.DB_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # Las versiones anteriores del esquema se reconstruyen aquí al re-ingerir
+        remove_superseded_databases(self.db_path)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Conexión de corta duración: commit al salir sin error y cierre siempre"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._lock, self._connect() as conn:
+            # WAL: las consultas no esperan a una ingesta en curso
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_key INTEGER PRIMARY KEY,
+                    task_id TEXT NOT NULL UNIQUE,
+                    events_path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    timestamp REAL NOT NULL,
+                    ingested_at REAL NOT NULL,
+                    rows INTEGER NOT NULL,
+                    summary TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    task_key INTEGER NOT NULL,
+                    timestamp_seconds REAL NOT NULL,
+                    frame INTEGER NOT NULL,
+                    zone_id INTEGER NOT NULL,
+                    line_id INTEGER,
+                    person_tracker_id INTEGER NOT NULL,
+                    event TEXT,
+                    gender TEXT,
+                    gender_confidence REAL,
+                    age TEXT,
+                    age_confidence REAL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_events_task_zone_time ON events(task_key, zone_id, timestamp_seconds)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_zone_time ON events(zone_id, timestamp_seconds)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_demographics ON events(gender, age, zone_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_age ON events(age, zone_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def ingest_task(self, task_id: str, events_path: str) -> int:
+        """
+        Ingiere (o re-ingiere) el archivo de eventos de una tarea. Retorna las filas insertadas.
+        """
+        stat = os.stat(events_path)
+        rows = 0
+        with self._lock, self._connect() as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            existing = conn.execute("SELECT task_key FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if existing is not None:
+                conn.execute("DELETE FROM events WHERE task_key = ?", (existing["task_key"],))
+                conn.execute("DELETE FROM tasks WHERE task_key = ?", (existing["task_key"],))
+            task_key = conn.execute(
+                "INSERT INTO tasks (task_id, events_path, size, mtime_ns, timestamp, ingested_at, rows) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (task_id, os.path.abspath(events_path), stat.st_size, stat.st_mtime_ns,
+                 float(stat.st_ctime), time.time())
+            ).lastrowid
+
+            placeholders = ", ".join("?" * (len(self.EVENT_COLUMNS) + 1))
+            insert = f"INSERT INTO events (task_key, {', '.join(self.EVENT_COLUMNS)}) VALUES ({placeholders})"
+            summary = None
+            for chunk in iter_events(events_path, chunk_rows=self.INGEST_CHUNK_ROWS):
+                zone_chunk, _ = split_events(chunk)
+                if len(zone_chunk):
+                    partial = SummaryPartial.from_chunk(zone_chunk)
+                    summary = partial if summary is None else summary.merge(partial)
+                # tolist() da tipos nativos de Python; las columnas ausentes (tareas antiguas) quedan NULL
+                columns = [
+                    chunk[column].tolist() if column in chunk.columns else [None] * len(chunk)
+                    for column in self.EVENT_COLUMNS
+                ]
+                conn.executemany(insert, zip([task_key] * len(chunk), *columns))
+                rows += len(chunk)
+
+            conn.execute(
+                "UPDATE tasks SET rows = ?, summary = ? WHERE task_key = ?",
+                (rows, dumps_json(summary.result()).decode("utf-8") if summary is not None else None, task_key)
+            )
+        return rows
+
+    def refresh(self, force: bool = False) -> Dict:
+        """
+        Sincroniza el almacén con los archivos de eventos del directorio de salida
+        (con `force`, re-ingiere todas las tareas). Un stat por archivo: el mtime
+        del directorio no cambia si un archivo se reescribe en su lugar.
+        """
+        with self._connect() as conn:
+            ingested = {
+                row["task_id"]: row
+                for row in conn.execute("SELECT task_id, events_path, size, mtime_ns FROM tasks")
+            }
+
+        on_disk = list_events_files(self.output_dir)
+
+        updated = 0
+        for task_id, path in on_disk.items():
+            try:
+                stat = os.stat(path)
+                row = ingested.get(task_id)
+                if (force or row is None or row["events_path"] != os.path.abspath(path)
+                        or row["size"] != stat.st_size or row["mtime_ns"] != stat.st_mtime_ns):
+                    self.ingest_task(task_id, path)
+                    updated += 1
+            except (OSError, ValueError) as e:
+                print(f"Error ingesting {path}: {str(e)}")
+
+        removed = [task_id for task_id in ingested if task_id not in on_disk]
+        if removed:
+            with self._lock, self._connect() as conn:
+                for task_id in removed:
+                    conn.execute(
+                        "DELETE FROM events WHERE task_key = (SELECT task_key FROM tasks WHERE task_id = ?)",
+                        (task_id,)
+                    )
+                    conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+        return {"added_or_updated": updated, "removed": len(removed)}
+
+    @staticmethod
+    def _where(task_ids: Optional[List[str]] = None, zone_ids: Optional[List[int]] = None,
+               line_ids: Optional[List[int]] = None, start: Optional[float] = None, end: Optional[float] = None,
+               gender: Optional[List[str]] = None, age: Optional[List[str]] = None,
+               event: Optional[str] = None):
+        """Cláusula WHERE y parámetros de los filtros indicados"""
+        clauses, params = [], []
+        for expression, values in (("t.task_id", task_ids), ("e.zone_id", zone_ids), ("e.line_id", line_ids),
+                                   ("e.gender", gender), ("e.age", age)):
+            if values:
+                clauses.append(f"{expression} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if start is not None:
+            clauses.append("e.timestamp_seconds >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("e.timestamp_seconds < ?")
+            params.append(end)
+        if event is not None:
+            clauses.append("e.event = ?")
+            params.append(event)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def query(self, group_by: Optional[List[str]] = None, bucket_seconds: Optional[float] = None,
+              limit: int = 10_000, **filters) -> Dict:
+        """
+        Agregados de los eventos que cumplen los filtros (task_ids, zone_ids,
+        line_ids, start/end en segundos de video, gender, age, event), agrupados por
+        las dimensiones de GROUP_COLUMNS y, con `bucket_seconds`, por intervalo
+        de tiempo. Las personas únicas se cuentan por (tarea, persona).
+        """
+        group_by = list(group_by or [])
+        unknown = [column for column in group_by if column not in self.GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"group_by debe estar en: {', '.join(self.GROUP_COLUMNS)}")
+
+        dimensions = [(column, self.GROUP_COLUMNS[column]) for column in group_by]
+        if bucket_seconds is not None:
+            bucket = float(bucket_seconds)
+            if not bucket > 0:
+                raise ValueError("bucket debe ser un número de segundos mayor que 0")
+            dimensions.append(("bucket", f"CAST(e.timestamp_seconds / {bucket!r} AS INTEGER) * {bucket!r}"))
+
+        select = [f"{expression} AS {name}" for name, expression in dimensions] + [
+            "COUNT(*) AS detections",
+            "SUM(e.event = 'entry') AS entries",
+            "SUM(e.event = 'exit') AS exits",
+            "SUM(e.event = 'line_in') AS line_in",
+            "SUM(e.event = 'line_out') AS line_out",
+            "COUNT(DISTINCT e.task_key * 4294967296 + e.person_tracker_id) AS unique_persons",
+            "COUNT(DISTINCT e.task_key) AS tasks",
+            "MIN(e.timestamp_seconds) AS first_seen",
+            "MAX(e.timestamp_seconds) AS last_seen",
+            "AVG(e.gender_confidence) AS avg_gender_confidence",
+            "AVG(e.age_confidence) AS avg_age_confidence"
+        ]
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(select)} FROM events e JOIN tasks t ON t.task_key = e.task_key {where}"
+        if dimensions:
+            group = ", ".join(str(i + 1) for i in range(len(dimensions)))
+            sql += f" GROUP BY {group} ORDER BY {group}"
+        sql += " LIMIT ?"
+
+        start = time.perf_counter()
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(sql, (*params, limit))]
+        # Sin filas que cumplan los filtros el agregado global es una fila de NULL
+        if not dimensions and rows and rows[0]["detections"] == 0:
+            rows = []
+
+        return {
+            "group_by": [name for name, _ in dimensions],
+            "bucket_seconds": bucket_seconds,
+            "filters": {key: value for key, value in filters.items() if value is not None},
+            "rows": rows,
+            "query_seconds": round(time.perf_counter() - start, 4)
+        }
+
+    def fresh_tasks(self, events_files: Dict[str, str]) -> List[str]:
+        """
+        Tareas de {task_id: ruta} ya ingeridas desde la versión actual de su archivo
+        """
+        if not events_files:
+            return []
+        placeholders = ", ".join("?" * len(events_files))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT task_id, events_path, size, mtime_ns FROM tasks WHERE task_id IN ({placeholders})",
+                list(events_files)
+            ).fetchall()
+
+        fresh = []
+        for row in rows:
+            try:
+                stat = os.stat(events_files[row["task_id"]])
+            except OSError:
+                continue
+            if (row["events_path"] == os.path.abspath(events_files[row["task_id"]])
+                    and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns):
+                fresh.append(row["task_id"])
+        return fresh
+
+    def task_summaries(self, task_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Sección summary de cada tarea ingerida (mismo formato que
+        AnalyticsProcessor), guardada al ingerir: una consulta por clave primaria
+        """
+        if not task_ids:
+            return {}
+        where, params = self._where(task_ids=task_ids)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT t.task_id, t.summary FROM tasks t {where}", params).fetchall()
+        return {row["task_id"]: loads_json(row["summary"]) for row in rows if row["summary"] is not None}
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            tasks = conn.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM tasks").fetchone()
+        return {
+            "tasks": tasks[0],
+            "events": tasks[1],
+            "db_path": self.db_path,
+            "db_size_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        }
+
+
+_event_stores: Dict[str, EventStore] = {}
+_event_stores_lock = threading.Lock()
+
+
+def get_event_store(output_dir: str) -> EventStore:
+    """
+    Obtiene (o crea) el almacén de eventos asociado a un directorio de salida
+    """
+    key = os.path.abspath(output_dir)
+    with _event_stores_lock:
+        if key not in _event_stores:
+            _event_stores[key] = EventStore(output_dir)
+        return _event_stores[key]
@@ -0,0 +1,200 @@
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Formato columnar (Parquet) opcional: si pyarrow no está instalado se usa CSV
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EVENTS_SUFFIX = "_events.parquet"
+CSV_SUFFIX = "_data.csv"
+
+# Tipos explícitos de la tabla de eventos: categorías para columnas de texto
+# repetitivo (diccionario de códigos enteros en Parquet) y anchos reducidos
+# para números
+EVENT_DTYPES = {
+    'timestamp_seconds': 'float32',
+    'frame': 'int32',
+    'zone_id': 'int16',
+    'line_id': 'int16',
+    'person_tracker_id': 'int32',
+    'event': 'category',
+    'gender': 'category',
+    'gender_confidence': 'float32',
+    'age': 'category',
+    'age_confidence': 'float32',
+}
+
+# Tipos de evento: entradas/salidas de zona y cruces de línea por sentido. Las
+# filas de cruce tienen zone_id NO_ZONE y las de zona line_id NO_LINE
+ZONE_EVENTS = ('entry', 'exit')
+LINE_EVENTS = ('line_in', 'line_out')
+NO_ZONE = -1
+NO_LINE = -1
+
+# Columnas enteras que read_csv no puede tipar directamente (NaN en archivos antiguos)
+_CSV_INT_COLUMNS = ('frame', 'zone_id', 'line_id', 'person_tracker_id')
+
+
+def apply_event_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica EVENT_DTYPES a las columnas presentes"""
+    return df.astype({column: dtype for column, dtype in EVENT_DTYPES.items() if column in df.columns})
+
+
+def events_path(output_dir: str, task_id: str) -> str:
+    return os.path.join(output_dir, f"{task_id}{EVENTS_SUFFIX}")
+
+
+def csv_path(output_dir: str, task_id: str) -> str:
+    return os.path.join(output_dir, f"{task_id}{CSV_SUFFIX}")
+
+
+def write_events(df: pd.DataFrame, path: str) -> str:
+    """
+    Guarda la tabla de eventos tipada. `path` es la ruta Parquet
+    ({task_id}_events.parquet); sin pyarrow se escribe el CSV equivalente
+    ({task_id}_data.csv). Retorna la ruta efectivamente escrita.
+    """
+    df = apply_event_dtypes(df)
+    if PARQUET_AVAILABLE:
+        df.to_parquet(path, index=False)
+        return path
+
+    print("⚠️  pyarrow no disponible, guardando eventos en CSV")
+    fallback_path = path[:-len(EVENTS_SUFFIX)] + CSV_SUFFIX if path.endswith(EVENTS_SUFFIX) else path
+    df.to_csv(fallback_path, index=False)
+    return fallback_path
+
+
+def read_events(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lee una tabla de eventos (Parquet o CSV legado) con tipos explícitos.
+    `columns` limita la lectura a esas columnas.
+    """
+    if path.endswith(".parquet"):
+        if columns is not None:
+            # Ignorar columnas ausentes (p. ej. demografía en tareas antiguas)
+            import pyarrow.parquet as pq
+            available = set(pq.read_schema(path).names)
+            columns = [column for column in columns if column in available]
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        # Las columnas enteras se convierten después (read_csv falla con enteros y NaN)
+        df = pd.read_csv(path, usecols=None if columns is None else (lambda c: c in columns), dtype={
+            column: dtype for column, dtype in EVENT_DTYPES.items()
+            if column not in _CSV_INT_COLUMNS
+        })
+    return apply_event_dtypes(df)
+
+
+def split_events(df: pd.DataFrame):
+    """
+    (eventos de zona, cruces de línea) de una tabla de eventos. Las tablas
+    sin columna 'event' (tareas antiguas) son solo de zona.
+    """
+    if 'event' not in df.columns:
+        return df, df.iloc[:0]
+    is_line = df['event'].isin(LINE_EVENTS).to_numpy()
+    if not is_line.any():
+        return df, df.iloc[:0]
+    return df[~is_line], df[is_line]
+
+
+def estimate_rows(path: str) -> int:
+    """
+    Filas de un archivo de eventos: exacto para Parquet (metadatos), estimado
+    por tamaño para CSV (~60 bytes por fila)
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    return os.path.getsize(path) // 60
+
+
+def iter_events(path: str, columns: Optional[List[str]] = None, chunk_rows: int = 500_000) -> Iterator[pd.DataFrame]:
+    """
+    Lee un archivo de eventos en bloques de ~chunk_rows filas con tipos
+    explícitos. Los bloques no parten frames: las filas del último frame de
+    un bloque pasan al siguiente (los eventos están en orden de frame, como
+    los escribe el pipeline). Siempre incluye la columna 'frame'.
+    """
+    if columns is not None and 'frame' not in columns:
+        columns = [*columns, 'frame']
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        if columns is not None:
+            columns = [column for column in columns if column in parquet.schema_arrow.names]
+        batches = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns))
+    else:
+        batches = pd.read_csv(path, usecols=None if columns is None else (lambda c: c in columns), chunksize=chunk_rows, dtype={
+            column: dtype for column, dtype in EVENT_DTYPES.items()
+            if column not in (*_CSV_INT_COLUMNS, 'event', 'gender', 'age')
+        })
+
+    carry = None
+    for batch in batches:
+        if carry is not None:
+            batch = pd.concat([carry, batch], ignore_index=True)
+        batch = apply_event_dtypes(batch)
+        frames = batch['frame'].to_numpy()
+        other_frames = np.flatnonzero(frames != frames[-1]) if len(frames) else np.empty(0, dtype=np.int64)
+        cut = other_frames[-1] + 1 if len(other_frames) else 0
+        carry = batch.iloc[cut:]
+        if cut:
+            yield batch.iloc[:cut].reset_index(drop=True)
+    if carry is not None and len(carry):
+        yield carry.reset_index(drop=True)
+
+
+def find_events_file(output_dir: str, task_id: str) -> Optional[str]:
+    """
+    Archivo de eventos de una tarea: Parquet si existe, si no el CSV (tareas antiguas)
+    """
+    for path in (events_path(output_dir, task_id), csv_path(output_dir, task_id)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def list_events_files(output_dir: str) -> Dict[str, str]:
+    """
+    {task_id: ruta} de todas las tareas del directorio, prefiriendo Parquet sobre CSV
+    """
+    files = {}
+    if not os.path.exists(output_dir):
+        return files
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(EVENTS_SUFFIX):
+                files[entry.name[:-len(EVENTS_SUFFIX)]] = entry.path
+            elif entry.name.endswith(CSV_SUFFIX):
+                files.setdefault(entry.name[:-len(CSV_SUFFIX)], entry.path)
+    return files
+
+
+def export_csv(output_dir: str, task_id: str) -> Optional[str]:
+    """
+    CSV descargable de una tarea, derivado del Parquet (se regenera solo si está desactualizado)
+    """
+    source = find_events_file(output_dir, task_id)
+    if source is None:
+        return None
+
+    target = csv_path(output_dir, task_id)
+    if source == target:
+        return target
+
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source):
+        tmp_path = target + ".tmp"
+        read_events(source).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, target)
+    return target
@@ -0,0 +1,33 @@
+import os
+import re
+from typing import List
+
+# Archivos auxiliares de SQLite que acompañan a la base
+SQLITE_SIDE_SUFFIXES = ("", "-wal", "-shm", "-journal")
+
+
+def remove_superseded_databases(db_path: str) -> List[str]:
+    """
+    Borra del directorio de la base las versiones anteriores de su esquema
+    (nombre_vN.sqlite3 o nombre.sqlite3 sin versión, con sus -wal/-shm/-journal)
+    para que no se acumulen tras cada cambio de DB_FILENAME. Solo para índices
+    derivados que se reconstruyen desde los archivos de eventos (almacén de
+    eventos, índice de resumen): no se pierde nada. Retorna los archivos borrados.
+    """
+    directory, filename = os.path.split(db_path)
+    prefix = re.match(r"^(.*?)(?:_v\d+)?\.sqlite3$", filename).group(1)
+    pattern = re.compile(rf"^{re.escape(prefix)}(?:_v\d+)?\.sqlite3(?:-wal|-shm|-journal)?$")
+    current = {filename + suffix for suffix in SQLITE_SIDE_SUFFIXES}
+
+    removed = []
+    for name in sorted(os.listdir(directory)):
+        if name in current or not pattern.match(name):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+            removed.append(name)
+        except OSError as e:
+            print(f"⚠️  No se pudo borrar la versión anterior {name}: {e}")
+    if removed:
+        print(f"🧹 Versiones anteriores de {filename} eliminadas: {', '.join(removed)}")
+    return removed
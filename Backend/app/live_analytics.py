@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.events_io import LINE_EVENTS
+
+
+class LiveAggregates:
+    """
+    Agregados de analytics mantenidos incrementalmente por el pipeline mientras
+    procesa un video: conteos por zona, ocupación actual, entradas por
+    intervalo de tiempo, cruces por línea y demografía. Cada evento actualiza contadores en O(1),
+    así que /analytics/live/{task_id} responde sin leer el archivo de eventos.
+
+    El intervalo de la serie temporal empieza en 1s y pasa al siguiente de
+    TIME_BUCKET_STEPS cuando la serie supera MAX_TIMELINE_BUCKETS, de modo que
+    el tamaño se mantiene acotado en videos largos.
+    """
+
+    def __init__(self, n_zones: int, total_frames: int = 0, n_lines: int = 0):
+        self.n_zones = n_zones
+        self.n_lines = n_lines
+        self.total_frames = total_frames
+        self._lock = threading.Lock()
+        self._bucket_steps = list(AnalyticsProcessor.TIME_BUCKET_STEPS)
+        self._max_buckets = AnalyticsProcessor.MAX_TIMELINE_BUCKETS
+        self.bucket_seconds = float(self._bucket_steps[0])
+
+        self.frame = 0
+        self.timestamp_seconds = 0.0
+        self.status = "processing"
+        self.entries = [0] * n_zones
+        self.exits = [0] * n_zones
+        self.occupancy = [0] * n_zones
+        self.peak_occupancy = [0] * n_zones
+        self._persons_per_zone = [set() for _ in range(n_zones)]
+        self.line_in = [0] * n_lines
+        self.line_out = [0] * n_lines
+        self._persons = set()
+        # {inicio del intervalo: [entradas por zona]}
+        self.entries_timeline: Dict[float, list] = {}
+        # Demografía: primera clasificación válida de cada persona
+        self._classified = set()
+        self.gender_counts = Counter()
+        self.age_counts = Counter()
+
+    def record_event(self, event: Dict):
+        """
+        Registra una fila de evento (mismas claves que el archivo de eventos)
+        """
+        zone_id = event['zone_id']
+        person = event['person_tracker_id']
+        with self._lock:
+            if event['event'] in LINE_EVENTS:
+                counts = self.line_in if event['event'] == 'line_in' else self.line_out
+                counts[event['line_id']] += 1
+                return
+            if event['event'] == 'exit':
+                self.exits[zone_id] += 1
+                return
+
+            self.entries[zone_id] += 1
+            self._persons_per_zone[zone_id].add(person)
+            self._persons.add(person)
+
+            bucket = (event['timestamp_seconds'] // self.bucket_seconds) * self.bucket_seconds
+            counts = self.entries_timeline.setdefault(bucket, [0] * self.n_zones)
+            counts[zone_id] += 1
+            if len(self.entries_timeline) > self._max_buckets:
+                self._coarsen_timeline()
+
+            gender, age = event.get('gender', 'Desconocido'), event.get('age', 'Desconocido')
+            if person not in self._classified and gender != 'Desconocido' and age != 'Desconocido':
+                self._classified.add(person)
+                self.gender_counts[gender] += 1
+                self.age_counts[age] += 1
+
+    def update_frame(self, frame: int, timestamp_seconds: float, occupancy_per_zone: Dict[int, int]):
+        """
+        Actualiza el frame actual y la ocupación (personas presentes) de cada zona
+        """
+        with self._lock:
+            self.frame = frame
+            self.timestamp_seconds = timestamp_seconds
+            for zone_id, count in occupancy_per_zone.items():
+                self.occupancy[zone_id] = count
+                if count > self.peak_occupancy[zone_id]:
+                    self.peak_occupancy[zone_id] = count
+
+    def finish(self, status: str = "completed"):
+        with self._lock:
+            self.status = status
+
+    def _coarsen_timeline(self):
+        """Pasa al siguiente intervalo (múltiplo del actual) y reagrupa la serie"""
+        larger = [step for step in self._bucket_steps if step > self.bucket_seconds]
+        if not larger:
+            return
+        self.bucket_seconds = float(larger[0])
+        merged: Dict[float, list] = {}
+        for bucket, counts in self.entries_timeline.items():
+            target = merged.setdefault((bucket // self.bucket_seconds) * self.bucket_seconds, [0] * self.n_zones)
+            for zone_id, count in enumerate(counts):
+                target[zone_id] += count
+        self.entries_timeline = merged
+
+    def snapshot(self) -> Dict:
+        """
+        Estado actual de los agregados (copia, segura para serializar)
+        """
+        with self._lock:
+            timeline = sorted(self.entries_timeline.items())
+            classified = len(self._classified)
+            return {
+                "status": self.status,
+                "frame": self.frame,
+                "total_frames": self.total_frames,
+                "timestamp_seconds": self.timestamp_seconds,
+                "updated_at": time.time(),
+                "total_entries": sum(self.entries),
+                "unique_persons": len(self._persons),
+                "current_occupancy": sum(self.occupancy),
+                "zones": {
+                    f"zone_{zone_id}": {
+                        "entries": self.entries[zone_id],
+                        "exits": self.exits[zone_id],
+                        "unique_persons": len(self._persons_per_zone[zone_id]),
+                        "occupancy": self.occupancy[zone_id],
+                        "peak_occupancy": self.peak_occupancy[zone_id]
+                    }
+                    for zone_id in range(self.n_zones)
+                },
+                "lines": {
+                    f"line_{line_id}": {
+                        "in": self.line_in[line_id],
+                        "out": self.line_out[line_id],
+                        "net": self.line_in[line_id] - self.line_out[line_id]
+                    }
+                    for line_id in range(self.n_lines)
+                },
+                "bucket_seconds": self.bucket_seconds,
+                "entries_timeline": {bucket: sum(counts) for bucket, counts in timeline},
+                "zone_entries_timeline": {
+                    f"zone_{zone_id}": {bucket: counts[zone_id] for bucket, counts in timeline if counts[zone_id]}
+                    for zone_id in range(self.n_zones)
+                },
+                "demographics": {
+                    "classified_persons": classified,
+                    "gender_counts": dict(self.gender_counts),
+                    "age_counts": dict(self.age_counts),
+                    "gender_percentages": {
+                        gender: round(count / classified * 100, 2) for gender, count in self.gender_counts.items()
+                    } if classified else {},
+                    "age_percentages": {
+                        age: round(count / classified * 100, 2) for age, count in self.age_counts.items()
+                    } if classified else {}
+                }
+            }
+
+
+# Agregados en vivo por task_id (en memoria, como task_status), solo de las tareas en curso
+live_aggregates: Dict[str, LiveAggregates] = {}
+
+# Segundos que se conserva el snapshot final de una tarea terminada
+FINISHED_RETENTION_SECONDS = 300
+
+# Snapshot final de las tareas terminadas: {task_id: (momento de fin, snapshot)}
+_finished_snapshots: Dict[str, Tuple[float, Dict]] = {}
+_finished_lock = threading.Lock()
+
+
+def _expire_finished(now: float):
+    for task_id in [task_id for task_id, (finished_at, _) in _finished_snapshots.items()
+                    if now - finished_at > FINISHED_RETENTION_SECONDS]:
+        del _finished_snapshots[task_id]
+
+
+def release_live_aggregates(task_id: str, status: str):
+    """
+    La tarea terminó (y sus analytics están persistidos): descarta el estado
+    incremental (personas por zona, clasificadas...) y conserva solo su
+    snapshot final durante FINISHED_RETENTION_SECONDS
+    """
+    live = live_aggregates.pop(task_id, None)
+    if live is None:
+        return
+    live.finish(status)
+    snapshot = live.snapshot()
+    now = time.monotonic()
+    with _finished_lock:
+        _expire_finished(now)
+        _finished_snapshots[task_id] = (now, snapshot)
+
+
+def get_live_snapshot(task_id: str) -> Optional[Dict]:
+    live = live_aggregates.get(task_id)
+    if live is not None:
+        return live.snapshot()
+    with _finished_lock:
+        _expire_finished(time.monotonic())
+        finished = _finished_snapshots.get(task_id)
+    return finished[1] if finished is not None else None
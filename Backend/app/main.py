@@ -1,12 +1,35 @@
-from fastapi import FastAPI, File, UploadFile, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, BackgroundTasks, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import math
 import os
 import uuid
-import shutil
+import hashlib
 import traceback
-from Backend.app.processing import process_video_task, task_status
-from Backend.app.analytics import analytics_processor
+from typing import Dict, List, Optional
+from Backend.app.processing import PROCESSING_PARAMS, process_video_task, reevaluate_task, task_status, publish_status
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.analysis_cache import analysis_cache
+from Backend.app.approximate_analytics import TaskSketches, rollup
+from Backend.app.summary_index import SummaryIndex, get_summary_index, summarize_events_file
+from Backend.app.analysis_pool import analysis_pool, cached_sketches, cached_summary
+from Backend.app.event_store import get_event_store
+from Backend.app.dedup import get_dedup_index
+from Backend.app.track_log import read_track_log_metadata, track_log_path
+from Backend.app.zone_config import get_zone_config_store, polygons_zone_config
+from Backend.app.events_io import events_path, csv_path, find_events_file, list_events_files, export_csv
+from Backend.app.responses import (
+    CORS_HEADERS, dumps_json, json_response, etag_matches, not_modified_response, request_scope
+)
+from Backend.app.task_events import TERMINAL_STATUSES, status_broadcaster
+from Backend.app.throughput_index import get_throughput_index
+from Backend.app.live_analytics import get_live_snapshot
+from Backend.app.uploads import (
+    UPLOAD_CHUNK_BYTES, ChecksumError, UploadOffsetError, UploadSession, get_upload_manager, write_and_hash
+)
 
 app = FastAPI(title="People Tracking API", version="1.0.0")
 
@@ -25,18 +48,150 @@ OUTPUT_DIR = "Backend/outputs"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Subidas reanudables por bloques (sobreviven a reinicios)
+upload_manager = get_upload_manager(UPLOAD_DIR)
+
+# Índice persistente con el resumen de cada tarea (lo actualiza también el pipeline)
+summary_index = get_summary_index(OUTPUT_DIR)
+
+# Almacén de eventos de todas las tareas para consultas entre tareas (lo alimenta el pipeline)
+event_store = get_event_store(OUTPUT_DIR)
+
+# Videos ya procesados (SHA-256 + parámetros) para no volver a correr YOLO sobre el mismo video
+dedup_index = get_dedup_index(OUTPUT_DIR)
+
+# Zonas y líneas de conteo configuradas por cámara
+zone_config_store = get_zone_config_store(OUTPUT_DIR)
+
+# Throughput de cada procesamiento por cámara y configuración de detección (lo alimenta el pipeline)
+throughput_index = get_throughput_index(OUTPUT_DIR)
+
+# Límites del tamaño de inferencia por tarea (imgsz)
+MIN_IMGSZ = 160
+MAX_IMGSZ = 1920
+
+@app.on_event("startup")
+async def refresh_event_store():
+    """
+    Ingiere en segundo plano las tareas que falten en el almacén de eventos
+    (las procesadas antes del arranque); las nuevas las ingiere el pipeline
+    """
+    asyncio.get_running_loop().run_in_executor(None, event_store.refresh)
+
+@app.on_event("shutdown")
+def shutdown_analysis_pool():
+    """Cierra los procesos del pool de análisis (compare, summary)"""
+    analysis_pool.shutdown()
+
+def get_analysis_sections(events_file: str, sections: Optional[List[str]] = None,
+                          bucket_seconds: Optional[float] = None) -> Dict:
+    """
+    Secciones de análisis de una tarea (todas por defecto), servidas desde el
+    artefacto precalculado por el pipeline o calculadas y memoizadas si falta.
+    """
+    return analysis_cache.get_analysis(events_file, sections, bucket_seconds)
+
+def parse_bucket(bucket: Optional[str]) -> Optional[float]:
+    """
+    Parámetro `bucket` de las series temporales: segundos (p. ej. 1, 10, 60) o
+    'auto'/vacío para elegirlo según la duración. ValueError si no es válido o
+    es menor que el menor intervalo automático (si deja más de
+    MAX_TIMELINE_BUCKETS intervalos el análisis lo agrupa como 'auto').
+    """
+    if bucket is None or bucket.strip().lower() in ("", "auto"):
+        return None
+    value = float(bucket)
+    minimum = AnalyticsProcessor.TIME_BUCKET_STEPS[0]
+    if not math.isfinite(value) or value < minimum:
+        raise ValueError(f"bucket debe ser un número de segundos mayor o igual que {minimum:g} o 'auto'")
+    return value
+
+def task_state(task_id: str) -> Optional[str]:
+    """
+    Estado reutilizable de una tarea para la deduplicación: 'in_progress',
+    'completed' (con sus resultados en disco) o None si falló o se borraron
+    """
+    status = task_status.get(task_id, {}).get("status")
+    if status in ("pending", "processing"):
+        return "in_progress"
+    if status == "failed":
+        return None
+    if (find_events_file(OUTPUT_DIR, task_id) is not None
+            and os.path.exists(os.path.join(OUTPUT_DIR, f"{task_id}_processed.mp4"))):
+        return "completed"
+    return None
+
+def processing_params(zone_config: Optional[Dict], options: Optional[Dict] = None) -> Dict:
+    """
+    Parámetros que determinan el resultado (huella de deduplicación), incluidas
+    las zonas de la cámara y las opciones de procesamiento de la tarea
+    """
+    params = {**PROCESSING_PARAMS, **(options or {})}
+    return {**params, "zones": zone_config} if zone_config else params
+
+def task_options(frame_stride: int, imgsz: Optional[int], roi: bool) -> Dict:
+    """Opciones de procesamiento por tarea (argumentos de process_video_task); 400 si no son válidas"""
+    if frame_stride < 1:
+        raise HTTPException(status_code=400, detail="frame_stride debe ser mayor o igual que 1")
+    imgsz = PROCESSING_PARAMS["imgsz"] if imgsz is None else imgsz
+    if not MIN_IMGSZ <= imgsz <= MAX_IMGSZ or imgsz % 32:
+        raise HTTPException(status_code=400,
+                            detail=f"imgsz debe ser múltiplo de 32 entre {MIN_IMGSZ} y {MAX_IMGSZ}")
+    return {"frame_stride": frame_stride, "imgsz": imgsz, "roi": roi}
+
+def camera_zone_config(camera_id: Optional[str]) -> Optional[Dict]:
+    """Configuración de zonas de una cámara (None sin cámara); 404 si no está configurada"""
+    if not camera_id:
+        return None
+    config = zone_config_store.get(camera_id)
+    if config is None:
+        raise HTTPException(status_code=404, detail=f"Camera '{camera_id}' has no zone configuration")
+    return config
+
+def duplicate_response(claim: Dict) -> Dict:
+    """Respuesta de una subida cuyo video ya fue procesado (o se está procesando)"""
+    message = ("El video ya fue procesado: se reutilizan sus resultados." if claim["state"] == "completed"
+               else "El video ya se está procesando: se reutiliza esa tarea.")
+    return {"message": message, "task_id": claim["task_id"], "deduplicated": True, "state": claim["state"]}
+
 @app.post("/upload-and-process/")
-async def upload_and_process(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_and_process(background_tasks: BackgroundTasks, file: UploadFile = File(...), force: bool = False,
+                             camera_id: Optional[str] = None,
+                             frame_stride: int = PROCESSING_PARAMS["frame_stride"],
+                             imgsz: Optional[int] = None, roi: bool = PROCESSING_PARAMS["roi"]):
+    """
+    Sube y procesa un video con las zonas de `camera_id` (cuadrantes si se
+    omite). Si el mismo contenido ya se procesó con los mismos parámetros y
+    zonas se retorna esa tarea (deduplicated) salvo `force=true`.
+    `frame_stride` > 1 detecta uno de cada N frames e interpola los tracks
+    del resto (más rápido, menos preciso). `imgsz` fija el tamaño de entrada
+    del detector y `roi=true` detecta solo en el área de las zonas y líneas.
+    """
+    options = task_options(frame_stride, imgsz, roi)
+    zone_config = await run_in_threadpool(camera_zone_config, camera_id)
     task_id = str(uuid.uuid4())
     
     # Rutas de archivos
-    input_path = os.path.join(UPLOAD_DIR, f"{task_id}_{file.filename}")
+    input_path = os.path.join(UPLOAD_DIR, f"{task_id}_{os.path.basename(file.filename or 'video')}")
     output_video_path = os.path.join(OUTPUT_DIR, f"{task_id}_processed.mp4")
-    output_csv_path = os.path.join(OUTPUT_DIR, f"{task_id}_data.csv")
+    output_events_path = events_path(OUTPUT_DIR, task_id)
 
-    # Guardar el archivo subido
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Guardar el archivo subido por bloques, fuera del event loop, calculando su SHA-256
+    hasher = hashlib.sha256()
+    buffer = await run_in_threadpool(open, input_path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            await run_in_threadpool(write_and_hash, buffer, chunk, hasher)
+    finally:
+        await run_in_threadpool(buffer.close)
+    sha256 = hasher.hexdigest()
+
+    claim = await run_in_threadpool(
+        dedup_index.claim, sha256, processing_params(zone_config, options), task_id, task_state, force
+    )
+    if claim["deduplicated"]:
+        await run_in_threadpool(os.remove, input_path)
+        return {**duplicate_response(claim), "sha256": sha256}
 
     # Iniciar la tarea en segundo plano
     background_tasks.add_task(
@@ -44,17 +199,295 @@ async def upload_and_process(background_tasks: BackgroundTasks, file: UploadFile
         task_id,
         input_path,
         output_video_path,
-        output_csv_path
+        output_events_path,
+        zone_config=zone_config,
+        camera_id=camera_id,
+        **options
+    )
+    
+    publish_status(task_id, status="pending")
+    
+    return {"message": "El procesamiento del video ha comenzado.", "task_id": task_id, "sha256": sha256,
+            "deduplicated": False}
+
+# ===== SUBIDAS REANUDABLES POR BLOQUES =====
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    size: int
+    sha256: Optional[str] = None      # SHA-256 del archivo completo (se verifica al completar)
+    early_start: bool = False         # Empezar a procesar antes de completar (formatos progresivos)
+    force: bool = False               # Reprocesar aunque el video ya se haya procesado
+    camera_id: Optional[str] = None   # Cámara cuyas zonas se aplican (cuadrantes si se omite)
+    frame_stride: int = PROCESSING_PARAMS["frame_stride"]   # Detectar uno de cada N frames
+    imgsz: Optional[int] = None       # Tamaño de entrada del detector (por defecto el de PROCESSING_PARAMS)
+    roi: bool = PROCESSING_PARAMS["roi"]   # Detectar solo en el área de las zonas y líneas
+
+async def start_upload_processing(background_tasks: BackgroundTasks, session: UploadSession,
+                                  zone_config: Optional[Dict] = None):
+    """Encola el procesamiento del video de una subida (una sola vez)"""
+    if session.processing_started:
+        return
+    # Guarda la sesión en disco: fuera del event loop
+    if not await run_in_threadpool(upload_manager.mark_processing, session):
+        return
+    background_tasks.add_task(
+        process_video_task,
+        session.task_id,
+        session.path,
+        os.path.join(OUTPUT_DIR, f"{session.task_id}_processed.mp4"),
+        events_path(OUTPUT_DIR, session.task_id),
+        source=None if session.complete else session,
+        zone_config=zone_config,
+        camera_id=session.camera_id,
+        **session.options
+    )
+    publish_status(session.task_id, status="pending")
+
+@app.post("/uploads", status_code=201)
+async def create_upload(body: UploadCreateRequest):
+    """
+    Crea una subida reanudable. Retorna upload_id (también el task_id del
+    procesamiento), el tamaño de bloque sugerido y el offset inicial.
+    Si se declara el SHA-256 y ese video ya se procesó con los mismos
+    parámetros y zonas, no se crea la subida: se retorna la tarea existente.
+    """
+    options = task_options(body.frame_stride, body.imgsz, body.roi)
+    zone_config = await run_in_threadpool(camera_zone_config, body.camera_id)
+    if body.sha256 and not body.force:
+        claim = await run_in_threadpool(dedup_index.find, body.sha256, processing_params(zone_config, options),
+                                        task_state)
+        if claim is not None:
+            return JSONResponse(content=duplicate_response(claim), status_code=200, headers=CORS_HEADERS)
+    try:
+        session = await run_in_threadpool(
+            upload_manager.create, body.filename, body.size, body.sha256, body.early_start, body.force,
+            body.camera_id, options
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**session.to_dict(), "chunk_size": UPLOAD_CHUNK_BYTES}
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """
+    Estado de una subida: `offset` es desde donde reanudar tras un corte
+    """
+    session = upload_manager.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {**session.to_dict(), "chunk_size": UPLOAD_CHUNK_BYTES}
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(request: Request, background_tasks: BackgroundTasks, upload_id: str, offset: int):
+    """
+    Recibe un bloque (cuerpo binario) que empieza en `offset`. El header
+    opcional X-Chunk-SHA256 verifica el bloque; si no coincide se descarta (422).
+    Si el offset no es el esperado responde 409 con el offset actual.
+    """
+    session = upload_manager.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    try:
+        received = await upload_manager.append(
+            session, offset, request.stream(), request.headers.get("x-chunk-sha256")
+        )
+    except UploadOffsetError as e:
+        return JSONResponse(
+            content={"error": "Offset mismatch", "offset": e.offset},
+            status_code=409,
+            headers=CORS_HEADERS
+        )
+    except ChecksumError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Inicio anticipado: el pipeline empieza a decodificar mientras llega el resto
+    if session.can_start_early():
+        zone_config = await run_in_threadpool(camera_zone_config, session.camera_id)
+        await start_upload_processing(background_tasks, session, zone_config)
+    
+    return {"upload_id": upload_id, "offset": received, "size": session.size,
+            "processing_started": session.processing_started}
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_upload(background_tasks: BackgroundTasks, upload_id: str):
+    """
+    Completa la subida: verifica tamaño y SHA-256 y encola el procesamiento
+    (si no empezó ya de forma anticipada). Si el video ya se procesó con los
+    mismos parámetros se descarta la copia y se retorna la tarea existente.
+    """
+    session = upload_manager.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session.duplicate_of:
+        claim = {"task_id": session.duplicate_of, "state": task_state(session.duplicate_of) or "completed"}
+        return {**duplicate_response(claim), "sha256": session.sha256}
+    
+    try:
+        await upload_manager.complete(session)
+    except UploadOffsetError as e:
+        return JSONResponse(
+            content={"error": "Upload incomplete", "offset": e.offset, "size": session.size},
+            status_code=409,
+            headers=CORS_HEADERS
+        )
+    except ChecksumError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    # Con inicio anticipado la tarea ya corre: solo se registra su huella
+    zone_config = await run_in_threadpool(camera_zone_config, session.camera_id)
+    claim = await run_in_threadpool(
+        dedup_index.claim, session.sha256, processing_params(zone_config, session.options), session.task_id,
+        task_state,
+        session.force or session.processing_started
     )
+    if claim["deduplicated"]:
+        await run_in_threadpool(upload_manager.mark_duplicate, session, claim["task_id"])
+        return {**duplicate_response(claim), "sha256": session.sha256}
+    
+    await start_upload_processing(background_tasks, session, zone_config)
+    
+    return {"message": "El procesamiento del video ha comenzado.", "task_id": session.task_id,
+            "sha256": session.sha256, "deduplicated": False}
+
+# ===== ZONAS Y LÍNEAS DE CONTEO POR CÁMARA =====
+
+class ZoneDefinition(BaseModel):
+    polygon: List[List[float]]        # [[x, y], ...] en píxeles de reference_size (o del video)
+    name: Optional[str] = None
+
+class LineDefinition(BaseModel):
+    start: List[float]                # [x, y]
+    end: List[float]
+    name: Optional[str] = None
+
+class CameraZonesRequest(BaseModel):
+    zones: List[ZoneDefinition] = []
+    lines: List[LineDefinition] = []
+    reference_size: Optional[List[int]] = None   # [ancho, alto] de las coordenadas; se escalan a cada video
+    min_frames_in: Optional[int] = None          # Histéresis de la cámara (por defecto la del procesamiento)
+    min_frames_out: Optional[int] = None
+
+@app.get("/cameras")
+async def list_cameras():
+    """Cámaras con zonas configuradas"""
+    return {"cameras": await run_in_threadpool(zone_config_store.list)}
+
+@app.put("/cameras/{camera_id}/zones")
+async def put_camera_zones(camera_id: str, body: CameraZonesRequest):
+    """
+    Define (reemplaza) las zonas y líneas de conteo de una cámara. Se aplican
+    a los videos subidos con ese camera_id a partir de ahora.
+    """
+    try:
+        config = await run_in_threadpool(zone_config_store.put, camera_id, body.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"camera_id": camera_id, **config}
+
+@app.get("/cameras/{camera_id}/throughput")
+async def get_camera_throughput(camera_id: str):
+    """
+    Throughput de los videos procesados de una cámara por configuración de
+    detección (imgsz, roi, frame_stride, compuerta de movimiento), con la
+    aceleración de cada una frente a imgsz por defecto sin ROI
+    """
+    configurations = await run_in_threadpool(throughput_index.camera_report, camera_id, PROCESSING_PARAMS["imgsz"])
+    if not configurations:
+        raise HTTPException(status_code=404, detail=f"No throughput recorded for camera '{camera_id}'")
+    return {"camera_id": camera_id, "default_imgsz": PROCESSING_PARAMS["imgsz"], "configurations": configurations}
+
+@app.get("/cameras/{camera_id}/zones")
+async def get_camera_zones(camera_id: str):
+    config = await run_in_threadpool(zone_config_store.get, camera_id)
+    if config is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return {"camera_id": camera_id, **config}
+
+@app.delete("/cameras/{camera_id}/zones")
+async def delete_camera_zones(camera_id: str):
+    if not await run_in_threadpool(zone_config_store.delete, camera_id):
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return {"camera_id": camera_id, "deleted": True}
+
+# ===== REEVALUACIÓN DESDE EL LOG DE TRACKS =====
+
+class ReevaluateRequest(BaseModel):
+    zones: Optional[List[List[List[float]]]] = None   # Polígonos [[x, y], ...] en píxeles del video
+    camera_id: Optional[str] = None                   # O bien las zonas configuradas de una cámara
+    par_interval: Optional[int] = None                # Múltiplo del intervalo PAR original (por defecto el mismo)
+    min_frames_in: Optional[int] = None               # Histéresis de zonas (por defecto la original)
+    min_frames_out: Optional[int] = None
+
+@app.post("/reevaluate/{task_id}")
+async def reevaluate(background_tasks: BackgroundTasks, task_id: str, body: Optional[ReevaluateRequest] = None):
+    """
+    Recalcula eventos de zona y analytics de una tarea desde su log de
+    tracks (otras zonas, otro intervalo PAR o lógica de entradas/salidas
+    actualizada) sin volver a decodificar ni detectar. Crea una tarea nueva
+    cuyo estado se sigue igual que el de un procesamiento. Sin zones ni
+    camera_id se usan las zonas del procesamiento original.
+    """
+    body = body or ReevaluateRequest()
+    log_path = track_log_path(OUTPUT_DIR, task_id)
+    if not os.path.exists(log_path):
+        raise HTTPException(status_code=404, detail="Track log not found for this task")
+    
+    zone_config = await run_in_threadpool(camera_zone_config, body.camera_id)
+    try:
+        if body.zones:
+            zone_config = polygons_zone_config(body.zones)
+        if body.par_interval is not None:
+            recorded = (await run_in_threadpool(read_track_log_metadata, log_path))["params"]["par_interval"]
+            if body.par_interval <= 0 or body.par_interval % recorded != 0:
+                raise ValueError(f"par_interval debe ser un múltiplo positivo de {recorded}")
+        for name in ("min_frames_in", "min_frames_out"):
+            if getattr(body, name) is not None and getattr(body, name) < 1:
+                raise ValueError(f"{name} debe ser mayor o igual que 1")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    task_status[task_id] = {"status": "pending"}
+    new_task_id = str(uuid.uuid4())
+    background_tasks.add_task(
+        reevaluate_task, new_task_id, task_id, OUTPUT_DIR, zone_config, body.par_interval,
+        body.min_frames_in, body.min_frames_out
+    )
+    publish_status(new_task_id, status="pending", source_task_id=task_id)
     
-    return {"message": "El procesamiento del video ha comenzado.", "task_id": task_id}
+    return {"message": "La reevaluación ha comenzado.", "task_id": new_task_id, "source_task_id": task_id}
 
 @app.get("/status/{task_id}")
 async def get_status(task_id: str):
     return task_status.get(task_id, {"status": "not_found"})
 
+@app.get("/status/{task_id}/stream")
+async def stream_status(task_id: str):
+    """
+    Canal Server-Sent Events con el estado de la tarea: envía progreso y
+    throughput por etapa cuando cambian (fusionando actualizaciones para
+    clientes lentos) y un evento 'completed' o 'failed' final antes de cerrar.
+    """
+    def format_event(status: Dict) -> str:
+        event = status["status"] if status.get("status") in TERMINAL_STATUSES else "status"
+        return f"event: {event}\ndata: {dumps_json(status).decode('utf-8')}\n\n"
+    
+    async def event_stream():
+        if status_broadcaster.latest(task_id) is None:
+            # Tarea desconocida (o de una ejecución anterior): un único evento
+            yield format_event(task_status.get(task_id, {"status": "not_found"}))
+            return
+        async for status in status_broadcaster.subscribe(task_id):
+            yield ": keep-alive\n\n" if status is None else format_event(status)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={**CORS_HEADERS, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/download/{file_type}/{task_id}")
 async def download_file(file_type: str, task_id: str):
     if file_type == "video":
@@ -62,7 +495,8 @@ async def download_file(file_type: str, task_id: str):
         media_type = "video/mp4"
         filename = "video_procesado.mp4"
     elif file_type == "csv":
-        file_path = os.path.join(OUTPUT_DIR, f"{task_id}_data.csv")
+        # El CSV se deriva del archivo de eventos Parquet (lectura y escritura fuera del event loop)
+        file_path = await run_in_threadpool(export_csv, OUTPUT_DIR, task_id) or csv_path(OUTPUT_DIR, task_id)
         media_type = "text/csv"
         filename = "datos_conteo.csv"
     else:
@@ -90,17 +524,38 @@ async def options_analyze(task_id: str):
     )
 
 @app.get("/analytics/analyze/{task_id}")
-async def analyze_task_data(task_id: str):
+async def analyze_task_data(request: Request, task_id: str, sections: Optional[str] = None,
+                            bucket: Optional[str] = None, approximate: bool = False):
     """
-    Analiza los datos de una tarea específica y retorna estadísticas detalladas
+    Analiza los datos de una tarea específica y retorna estadísticas detalladas.
+    `sections` (separadas por comas) limita la respuesta a esas secciones y
+    `bucket` fija el intervalo (segundos) de las series temporales.
+    Con `approximate=true` responde desde los sketches de la tarea (personas
+    únicas y cuantiles de permanencia aproximados, con sus cotas de error).
+    Responde 304 si el If-None-Match coincide con el ETag del análisis.
     """
     try:
-        csv_path = os.path.join(OUTPUT_DIR, f"{task_id}_data.csv")
+        try:
+            bucket_seconds = parse_bucket(bucket)
+        except ValueError:
+            return JSONResponse(
+                content={"error": f"bucket must be at least {AnalyticsProcessor.TIME_BUCKET_STEPS[0]:g} "
+                                  "second(s) or 'auto'"},
+                status_code=400,
+                headers={
+                    "Access-Control-Allow-Origin": "*",
+                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+                    "Access-Control-Allow-Headers": "*"
+                }
+            )
         
-        if not os.path.exists(csv_path):
+        requested = [s.strip() for s in sections.split(",") if s.strip()] if sections else None
+        unknown = [s for s in requested or [] if s not in AnalyticsProcessor.SECTIONS]
+        if unknown:
             return JSONResponse(
-                content={"error": "CSV file not found for this task"},
-                status_code=404,
+                content={"error": f"Unknown sections: {', '.join(unknown)}",
+                         "available_sections": list(AnalyticsProcessor.SECTIONS)},
+                status_code=400,
                 headers={
                     "Access-Control-Allow-Origin": "*",
                     "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
@@ -108,13 +563,12 @@ async def analyze_task_data(task_id: str):
                 }
             )
         
-        # Procesar los datos reales del CSV
-        analysis = analytics_processor.process_csv_data(csv_path)
+        events_file = find_events_file(OUTPUT_DIR, task_id)
         
-        if "error" in analysis:
+        if events_file is None:
             return JSONResponse(
-                content={"error": analysis["error"]},
-                status_code=500,
+                content={"error": "Events file not found for this task"},
+                status_code=404,
                 headers={
                     "Access-Control-Allow-Origin": "*",
                     "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
@@ -122,28 +576,56 @@ async def analyze_task_data(task_id: str):
                 }
             )
         
-        # Convertir cualquier int64 a int o float para JSON serialization
-        def convert_numpy_types(obj):
-            if hasattr(obj, 'item'):  # numpy scalar
-                return obj.item()
-            elif isinstance(obj, dict):
-                return {k: convert_numpy_types(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_numpy_types(v) for v in obj]
-            else:
-                return obj
+        if approximate:
+            # El cuerpo se filtra por las secciones pedidas: forman parte de la clave
+            etag = analysis_cache.etag({events_file: ["sketches", *sorted(requested or [])]},
+                                       scope=request_scope(request))
+            if etag_matches(request, etag):
+                return not_modified_response(etag)
+            
+            # Sin sketches guardados se construyen leyendo los eventos: fuera del event loop
+            sketches = await run_in_threadpool(analysis_cache.get_sketches, events_file, task_id)
+            if "error" in sketches:
+                return JSONResponse(
+                    content={"error": sketches["error"]},
+                    status_code=500,
+                    headers={
+                        "Access-Control-Allow-Origin": "*",
+                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+                        "Access-Control-Allow-Headers": "*"
+                    }
+                )
+            approximate_analysis = TaskSketches.from_dict(sketches).result()
+            if requested:
+                approximate_analysis = {
+                    key: value for key, value in approximate_analysis.items()
+                    if key not in AnalyticsProcessor.SECTIONS or key in requested
+                }
+            return await json_response(request, approximate_analysis, etag=etag)
+        
+        # El ETag sale de las claves de caché: un refresco sin cambios no recalcula ni serializa
+        etag = analysis_cache.etag({events_file: [
+            AnalyticsProcessor.section_cache_key(section, bucket_seconds)
+            for section in requested or AnalyticsProcessor.SECTIONS
+        ]}, scope=request_scope(request))
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
         
-        # Aplicar conversión a todo el análisis
-        clean_analysis = convert_numpy_types(analysis)
+        # Procesar los datos reales de la tarea (o servirlos desde la caché), fuera del event loop
+        clean_analysis = await run_in_threadpool(get_analysis_sections, events_file, requested, bucket_seconds)
         
-        return JSONResponse(
-            content=clean_analysis,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "*"
-            }
-        )
+        if "error" in clean_analysis:
+            return JSONResponse(
+                content={"error": clean_analysis["error"]},
+                status_code=500,
+                headers={
+                    "Access-Control-Allow-Origin": "*",
+                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+                    "Access-Control-Allow-Headers": "*"
+                }
+            )
+        
+        return await json_response(request, clean_analysis, etag=etag)
     
     except Exception as e:
         print(f"Error in analyze_task_data: {str(e)}")
@@ -160,23 +642,51 @@ async def analyze_task_data(task_id: str):
         )
 
 @app.get("/analytics/visualization/{task_id}")
-async def get_visualization_data(task_id: str):
+async def get_visualization_data(request: Request, task_id: str, bucket: Optional[str] = None,
+                                 max_points: Optional[int] = None):
     """
-    Retorna datos optimizados para visualización en el dashboard
+    Retorna datos optimizados para visualización en el dashboard.
+    `bucket` fija el intervalo (segundos) de las series y `max_points` el
+    máximo de puntos por gráfico de líneas.
     """
-    csv_path = os.path.join(OUTPUT_DIR, f"{task_id}_data.csv")
+    try:
+        bucket_seconds = parse_bucket(bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if max_points is None:
+        max_points = AnalyticsProcessor.DEFAULT_MAX_CHART_POINTS
+    if max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points debe ser al menos 3")
+    
+    events_file = find_events_file(OUTPUT_DIR, task_id)
+    
+    if events_file is None:
+        raise HTTPException(status_code=404, detail="Events file not found for this task")
+    
+    etag = analysis_cache.etag({events_file: [analysis_cache.visualization_kind(bucket_seconds, max_points)]},
+                               scope=request_scope(request))
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
     
-    if not os.path.exists(csv_path):
-        raise HTTPException(status_code=404, detail="CSV file not found for this task")
+    viz_data = await run_in_threadpool(analysis_cache.get_visualization, events_file, bucket_seconds, max_points)
     
-    analysis = analytics_processor.process_csv_data(csv_path)
+    if "error" in viz_data:
+        raise HTTPException(status_code=500, detail=viz_data["error"])
     
-    if "error" in analysis:
-        raise HTTPException(status_code=500, detail=analysis["error"])
+    return await json_response(request, viz_data, etag=etag)
+
+@app.get("/analytics/live/{task_id}")
+async def get_live_analytics(request: Request, task_id: str):
+    """
+    Agregados en vivo de una tarea en procesamiento (conteos y ocupación por
+    zona, entradas por intervalo, demografía), sin leer el archivo de eventos
+    """
+    snapshot = get_live_snapshot(task_id)
     
-    viz_data = analytics_processor.generate_visualization_data(analysis)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No live analytics for this task")
     
-    return JSONResponse(content=viz_data)
+    return await json_response(request, snapshot)
 
 @app.get("/analytics/debug")
 async def debug_summary():
@@ -189,7 +699,7 @@ async def debug_summary():
             content={
                 "debug": "working", 
                 "output_dir_exists": os.path.exists(OUTPUT_DIR),
-                "files_count": len([f for f in os.listdir(OUTPUT_DIR) if f.endswith("_data.csv")]) if os.path.exists(OUTPUT_DIR) else 0
+                "files_count": len(list_events_files(OUTPUT_DIR))
             },
             headers={
                 "Access-Control-Allow-Origin": "*",
@@ -236,78 +746,42 @@ async def options_summary():
     )
 
 @app.get("/analytics/summary")
-async def get_all_tasks_summary():
+async def get_all_tasks_summary(
+    request: Request,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    sort_by: str = "timestamp",
+    order: str = "desc"
+):
     """
-    Retorna un resumen de todas las tareas procesadas
+    Retorna un resumen de todas las tareas procesadas (desde el índice persistente).
+    Soporta paginación (offset/limit) y orden (sort_by, order=asc|desc).
     """
+    if sort_by not in SummaryIndex.SORTABLE_COLUMNS or order not in ("asc", "desc"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"sort_by debe ser uno de {list(SummaryIndex.SORTABLE_COLUMNS)} y order 'asc' o 'desc'"
+        )
+    
     try:
-        tasks = []
-        
-        if os.path.exists(OUTPUT_DIR):
-            csv_files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith("_data.csv")]
-            
-            for filename in csv_files:
-                task_id = filename.replace("_data.csv", "")
-                csv_path = os.path.join(OUTPUT_DIR, filename)
-                
-                try:
-                    # Procesar cada archivo CSV para obtener un resumen real
-                    analysis = analytics_processor.process_csv_data(csv_path)
-                    
-                    if "error" not in analysis and "summary" in analysis:
-                        # Convertir numpy types
-                        summary = analysis["summary"]
-                        
-                        tasks.append({
-                            "task_id": task_id,
-                            "timestamp": float(os.path.getctime(csv_path)),
-                            "summary": {
-                                "total_detections": int(summary.get("total_detections", 0)),
-                                "unique_persons": int(summary.get("unique_persons", 0)),
-                                "duration_seconds": float(summary.get("duration_seconds", 0.0)),
-                                "zones_count": int(summary.get("zones_count", 0)),
-                                "detection_rate": float(summary.get("detection_rate", 0.0))
-                            }
-                        })
-                    else:
-                        # Si hay error en el procesamiento, crear datos básicos
-                        tasks.append({
-                            "task_id": task_id,
-                            "timestamp": float(os.path.getctime(csv_path)),
-                            "summary": {
-                                "total_detections": 0,
-                                "unique_persons": 0,
-                                "duration_seconds": 0.0,
-                                "zones_count": 0,
-                                "detection_rate": 0.0
-                            }
-                        })
-                except Exception as e:
-                    print(f"Error processing {filename}: {str(e)}")
-                    # Crear entrada básica en caso de error
-                    tasks.append({
-                        "task_id": task_id,
-                        "timestamp": float(os.path.getctime(csv_path)),
-                        "summary": {
-                            "total_detections": 0,
-                            "unique_persons": 0,
-                            "duration_seconds": 0.0,
-                            "zones_count": 0,
-                            "detection_rate": 0.0
-                        }
-                    })
+        # Sincronización incremental: solo re-analiza CSV nuevos o modificados, en el pool de procesos
+        plan = await run_in_threadpool(summary_index.plan_refresh)
+        if plan is not None:
+            analyses, errors = await analysis_pool.run_many(
+                summarize_events_file, {task_id: (path,) for task_id, path in plan["to_update"].items()}
+            )
+            for task_id, error in errors.items():
+                print(f"⚠️  Resumen no calculado para {task_id}: {error}")
+            await run_in_threadpool(summary_index.apply_refresh, plan, analyses)
         
-        return JSONResponse(
-            content={
-                "total_tasks": len(tasks),
-                "tasks": sorted(tasks, key=lambda x: x["timestamp"], reverse=True)
-            },
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "*"
-            }
+        summary = await run_in_threadpool(
+            summary_index.query,
+            offset=max(offset, 0),
+            limit=limit,
+            sort_by=sort_by,
+            descending=(order == "desc")
         )
+        return await json_response(request, summary)
     
     except Exception as e:
         print(f"Error in summary endpoint: {str(e)}")
@@ -325,22 +799,148 @@ async def get_all_tasks_summary():
         )
 
 @app.get("/analytics/compare")
-async def compare_tasks(task_ids: str):
+async def compare_tasks(request: Request, background_tasks: BackgroundTasks, task_ids: str):
     """
     Compara múltiples tareas. task_ids debe ser una lista separada por comas
     """
-    task_list = task_ids.split(",")
-    comparison_data = {}
+    task_list = [task_id.strip() for task_id in task_ids.split(",")]
+    events_files = {
+        task_id: events_file
+        for task_id in task_list
+        if (events_file := find_events_file(OUTPUT_DIR, task_id)) is not None
+    }
     
-    for task_id in task_list:
-        csv_path = os.path.join(OUTPUT_DIR, f"{task_id.strip()}_data.csv")
-        
-        if os.path.exists(csv_path):
-            analysis = analytics_processor.process_csv_data(csv_path)
-            if "error" not in analysis:
-                comparison_data[task_id.strip()] = analysis["summary"]
+    etag = analysis_cache.etag({events_file: ["section:summary"] for events_file in events_files.values()},
+                               scope=request_scope(request))
+    if events_files and etag_matches(request, etag):
+        return not_modified_response(etag)
+    
+    # Una consulta agrupada al almacén de eventos para las tareas ya ingeridas...
+    fresh = await run_in_threadpool(event_store.fresh_tasks, events_files)
+    comparison_data = await run_in_threadpool(event_store.task_summaries, fresh)
+    
+    # ...y el resto en el pool de procesos, fuera del event loop
+    pending = {task_id: (events_file,) for task_id, events_file in events_files.items() if task_id not in comparison_data}
+    if pending:
+        summaries, errors = await analysis_pool.run_many(cached_summary, pending)
+        comparison_data.update({task_id: summary for task_id, summary in summaries.items() if "error" not in summary})
+        for task_id, error in errors.items():
+            print(f"⚠️  Comparación sin la tarea {task_id}: {error}")
+        # Ingerir las tareas que faltaban para que la próxima comparación sea una sola consulta
+        background_tasks.add_task(event_store.refresh)
+    else:
+        errors = {}
+    
+    comparison_data = {task_id: comparison_data[task_id] for task_id in events_files if task_id in comparison_data}
     
     if not comparison_data:
         raise HTTPException(status_code=404, detail="No valid tasks found for comparison")
     
-    return JSONResponse(content=comparison_data)
\ No newline at end of file
+    # Sin ETag si faltó alguna tarea por error o timeout: la respuesta es parcial
+    return await json_response(request, comparison_data, etag=None if errors else etag)
+
+@app.get("/analytics/rollup")
+async def rollup_tasks(request: Request, task_ids: Optional[str] = None):
+    """
+    Analytics aproximados agregados de varias tareas (todas por defecto;
+    task_ids separadas por comas), fusionando los sketches guardados de cada una
+    """
+    all_files = list_events_files(OUTPUT_DIR)
+    if task_ids:
+        task_list = [task_id.strip() for task_id in task_ids.split(",") if task_id.strip()]
+        events_files = {task_id: all_files[task_id] for task_id in task_list if task_id in all_files}
+    else:
+        events_files = all_files
+    
+    etag = analysis_cache.etag({events_file: ["sketches"] for events_file in events_files.values()},
+                               scope=request_scope(request))
+    if events_files and etag_matches(request, etag):
+        return not_modified_response(etag)
+    
+    # Sketches precalculados por el pipeline (memoria o sidecar)...
+    found = await run_in_threadpool(
+        lambda: {task_id: analysis_cache.find(events_file, "sketches") for task_id, events_file in events_files.items()}
+    )
+    sketches = {task_id: sketch for task_id, sketch in found.items() if sketch is not None}
+    
+    # ...y los que faltan se construyen en el pool de procesos, fuera del event loop
+    pending = {task_id: (events_file, task_id) for task_id, events_file in events_files.items() if task_id not in sketches}
+    errors = {}
+    if pending:
+        built, errors = await analysis_pool.run_many(cached_sketches, pending)
+        # Las tareas sin eventos no tienen sketches: se omiten como antes
+        sketches.update({task_id: sketch for task_id, sketch in built.items() if "error" not in sketch})
+        for task_id, error in errors.items():
+            print(f"⚠️  Rollup sin la tarea {task_id}: {error}")
+    
+    result = rollup([sketches[task_id] for task_id in events_files if task_id in sketches])
+    if result is None:
+        raise HTTPException(status_code=404, detail="No valid tasks found for rollup")
+    if errors:
+        result["skipped_tasks"] = errors
+    
+    # Sin ETag si faltó alguna tarea por error o timeout: la respuesta es parcial
+    return await json_response(request, result, etag=None if errors else etag)
+
+@app.get("/analytics/query")
+async def query_events(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    task_ids: Optional[str] = None,
+    zones: Optional[str] = None,
+    lines: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    gender: Optional[str] = None,
+    age: Optional[str] = None,
+    event: Optional[str] = None,
+    group_by: Optional[str] = None,
+    bucket: Optional[float] = None,
+    limit: int = 10_000
+):
+    """
+    Agregados filtrados sobre los eventos de todas las tareas (almacén de eventos).
+    Filtros: task_ids, zones, lines, gender y age (listas separadas por comas), start/end
+    (segundos de video) y event (entry|exit|line_in|line_out). group_by: task_id, zone_id,
+    line_id, event, gender, age (separados por comas); bucket agrupa además por intervalo de tiempo.
+    Consulta lo ya ingerido: la sincronización con el directorio corre después de responder.
+    """
+    split = lambda value: [part.strip() for part in value.split(",") if part.strip()] if value else None
+    
+    try:
+        zone_ids = [int(zone) for zone in split(zones)] if zones else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="zones debe ser una lista de enteros separados por comas")
+    try:
+        line_ids = [int(line) for line in split(lines)] if lines else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="lines debe ser una lista de enteros separados por comas")
+    
+    try:
+        result = await run_in_threadpool(
+            event_store.query,
+            group_by=split(group_by),
+            bucket_seconds=bucket,
+            limit=max(limit, 1),
+            task_ids=split(task_ids),
+            zone_ids=zone_ids,
+            line_ids=line_ids,
+            start=start,
+            end=end,
+            gender=split(gender),
+            age=split(age),
+            event=event
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Tareas copiadas o borradas a mano: visibles en la próxima consulta
+    background_tasks.add_task(event_store.refresh)
+    return await json_response(request, result)
+
+@app.get("/analytics/cache/stats")
+async def get_cache_stats():
+    """
+    Estadísticas de la caché de analytics (aciertos en memoria/disco, fallos, desalojos)
+    """
+    return JSONResponse(content=analysis_cache.get_stats())
@@ -0,0 +1,74 @@
+from typing import Dict
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Compuerta de movimiento para no correr el detector en frames sin cambios
+    (cámaras fijas con largos tramos estáticos).
+
+    Cada frame se reduce a WIDTH píxeles de ancho en escala de grises
+    suavizada y se compara con el último frame en que corrió la detección:
+    si cambió menos de `min_changed_fraction` de los píxeles (diferencia
+    mayor que PIXEL_THRESHOLD) se salta la detección. Comparar contra el
+    último frame detectado, y no contra el anterior, hace que el movimiento
+    lento se acumule hasta superar el umbral. Tras detectar movimiento se
+    detectan todos los frames durante `hold_frames` frames (la escena está
+    activa), y cada `max_skip_frames` frames seguidos sin detección se
+    detecta igual, para refrescar el tracker.
+    """
+
+    WIDTH = 160
+    PIXEL_THRESHOLD = 25
+
+    def __init__(self, min_changed_fraction: float, max_skip_frames: int, hold_frames: int):
+        self.min_changed_fraction = min_changed_fraction
+        self.max_skip_frames = max_skip_frames
+        self.hold_frames = hold_frames
+        self.frames = 0
+        self.skipped_frames = 0
+        self._reference = None
+        self._skipped_run = 0
+        self._hold = 0
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.WIDTH, max(1, round(height * self.WIDTH / width)))
+        # Reducción en dos pasos: submuestreo (barato) hasta 4x el tamaño final
+        # y promedio de área al final, que atenúa el ruido del sensor
+        if width > 4 * self.WIDTH:
+            frame = cv2.resize(frame, (4 * size[0], 4 * size[1]), interpolation=cv2.INTER_NEAREST)
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_detect(self, frame: np.ndarray) -> bool:
+        """True si hay que correr la detección en este frame"""
+        self.frames += 1
+        signature = self._signature(frame)
+        if self._reference is not None:
+            changed = np.count_nonzero(cv2.absdiff(signature, self._reference) > self.PIXEL_THRESHOLD)
+            if changed >= self.min_changed_fraction * signature.size:
+                self._hold = self.hold_frames
+            elif self._hold > 0:
+                self._hold -= 1
+            elif self._skipped_run < self.max_skip_frames:
+                self._skipped_run += 1
+                self.skipped_frames += 1
+                return False
+        self._reference = signature
+        self._skipped_run = 0
+        return True
+
+    def report(self) -> Dict:
+        return {
+            "frames": self.frames,
+            "detected_frames": self.frames - self.skipped_frames,
+            "skipped_frames": self.skipped_frames,
+            "skipped_fraction": round(self.skipped_frames / self.frames, 4) if self.frames else 0.0,
+            "min_changed_fraction": self.min_changed_fraction,
+            "max_skip_frames": self.max_skip_frames,
+            "hold_frames": self.hold_frames
+        }
@@ -8,6 +8,21 @@ import os
 import warnings
 import sys
 from pathlib import Path
+from Backend.app.summary_index import get_summary_index
+from Backend.app.event_store import get_event_store
+from Backend.app.analysis_cache import analysis_cache
+from Backend.app.live_analytics import LiveAggregates, live_aggregates, release_live_aggregates
+from Backend.app.motion_gate import MotionGate
+from Backend.app.task_events import StageTimer, status_broadcaster
+from Backend.app.throughput_index import get_throughput_index
+from Backend.app.events_io import EVENT_DTYPES, events_path, write_events
+from Backend.app.track_log import (
+    NO_TRACK, TrackLogWriter, interpolate_tracks, iter_track_frames, link_track_log, read_track_log,
+    track_log_path
+)
+from Backend.app.zone_config import compile_zone_config, default_zone_config, line_segments
+from Backend.app.zone_events import LineCrossingCounter, ZoneEventTracker
+from Backend.app.zone_geometry import roi_bounds, roi_to_frame
 
 # Agregar path para imports de modelos
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -19,12 +34,67 @@ warnings.filterwarnings("once", category=DeprecationWarning)
 # En una app de producción, usarías una base de datos o Redis.
 task_status = {}
 
+# Intervalo mínimo (segundos) entre publicaciones de progreso
+STATUS_PUBLISH_INTERVAL = 0.5
+
+
+def publish_status(task_id: str, **fields):
+    """
+    Actualiza task_status y publica el estado en el canal de streaming (/status/{task_id}/stream)
+    """
+    task_status.setdefault(task_id, {}).update(fields)
+    status_broadcaster.publish(task_id, task_status[task_id])
+
 # MEJORAS DE TRACKING IMPLEMENTADAS:
 # 1. YOLOv8s en lugar de YOLOv8n: Mejor precisión en detección
 # 2. BotSORT en lugar de ByteTrack: Mejor manejo de oclusiones y cruces
 # 3. Parámetros optimizados: conf=0.3, iou=0.5, max_det=50
 # 4. PAR (Pedestrian Attribute Recognition): Detección de género y edad
 
+# Parámetros que determinan el resultado del procesamiento. Junto con el
+# SHA-256 del video forman la huella con la que se deduplican las subidas
+# (dedup.py): cualquier cambio de modelo, tracker o umbrales debe reflejarse aquí.
+PROCESSING_PARAMS = {
+    "model": "yolov8s.pt",
+    "tracker": "botsort.yaml",
+    "conf": 0.3,
+    "iou": 0.5,
+    "max_det": 50,
+    "enable_par": True,
+    "par_interval": 10,
+    # Histéresis de zonas: frames seguidos dentro/fuera para confirmar una entrada/salida
+    "zone_min_frames_in": 3,
+    "zone_min_frames_out": 5,
+    # Frame que llevan los eventos de zona: el inicio de la racha (no el de confirmación)
+    "zone_event_frame": "streak_start",
+    # Compuerta de movimiento (motion_gate.py): saltar la detección en frames sin cambios
+    "motion_gate": True,
+    "motion_min_changed_fraction": 0.001,
+    "motion_max_skip_frames": 15,
+    "motion_hold_frames": 10,
+    # Detectar uno de cada N frames; los intermedios se saltan sin decodificar y
+    # sus tracks se interpolan (opción por tarea, ver process_video_task)
+    "frame_stride": 1,
+    # Tamaño de entrada del detector (lado mayor, múltiplo de 32; opción por tarea)
+    "imgsz": 640,
+    # Modo ROI (opción por tarea): detectar solo en el rectángulo que cubre las
+    # zonas y líneas, con un margen de roi_padding (fracción del frame)
+    "roi": False,
+    "roi_padding": 0.1,
+}
+
+
+def zone_hysteresis(zone_config, params):
+    """
+    Umbrales (min_frames_in, min_frames_out) de histéresis de zonas: los de la
+    cámara o, si no los define, los de `params` (1 en logs de tracks anteriores
+    a la histéresis, que no la tenían)
+    """
+    zone_config = zone_config or {}
+    return tuple(
+        zone_config.get(key) or params.get(f"zone_{key}", 1) for key in ("min_frames_in", "min_frames_out")
+    )
+
 # Importar modelo PAR (lazy loading)
 _par_model = None
 _use_ntqai = True  # Flag para usar modelos NTQAI (True) o baseline PAR (False)
@@ -64,13 +134,66 @@ def get_par_model():
             _par_model = None
     return _par_model
 
+def save_events(task_id: str, data_list: list, output_events_path: str, timer: StageTimer):
+    """
+    Etapas finales comunes al procesamiento y a la reevaluación: escribe los
+    eventos, actualiza el índice de resumen y el almacén de eventos y
+    precalcula los analytics
+    """
+    # Las entradas y salidas de zona llevan el inicio de su racha de histéresis
+    # (se emiten unos frames después): orden estable por timestamp. Sin eventos
+    # (video sin personas) se escribe la tabla vacía: registra que la tarea
+    # terminó (task_state, deduplicación) y se descarga como un CSV sin filas
+    df = pd.DataFrame(data_list, columns=list(EVENT_DTYPES))
+    df = df.sort_values('timestamp_seconds', kind='mergesort', ignore_index=True)
+    written_path = write_events(df, output_events_path)
+    timer.mark("write_events")
+    
+    # Registrar el resumen en el índice para /analytics/summary
+    try:
+        get_summary_index(os.path.dirname(written_path)).update_task(task_id, written_path)
+    except Exception as e:
+        print(f"⚠️  No se pudo actualizar el índice de resumen: {e}")
+    
+    # Ingerir los eventos en el almacén consultable entre tareas (/analytics/query)
+    publish_status(task_id, stage="indexing")
+    timer.restart()
+    try:
+        get_event_store(os.path.dirname(written_path)).ingest_task(task_id, written_path)
+    except Exception as e:
+        print(f"⚠️  No se pudieron ingerir los eventos en el almacén: {e}")
+    timer.mark("event_store")
+    
+    if df.empty:
+        return  # Sin eventos no hay analytics que precalcular
+    
+    # Etapa final: precalcular analytics y visualización junto al archivo de eventos
+    publish_status(task_id, stage="analytics")
+    timer.restart()
+    try:
+        artifact = analysis_cache.precompute(written_path, task_id)
+        if "error" in artifact:
+            print(f"⚠️  Analytics no precalculados para {task_id}: {artifact['error']}")
+        else:
+            print(f"📊 Analytics precalculados en {artifact['seconds']}s")
+    except Exception as e:
+        print(f"⚠️  No se pudieron precalcular los analytics: {e}")
+    timer.mark("analytics")
+
 def process_video_task(
     task_id: str,
     video_path: str,
     output_video_path: str,
-    output_csv_path: str,
-    enable_par: bool = True,  # Nuevo parámetro para habilitar/deshabilitar PAR
-    par_interval: int = 10,   # Analizar PAR cada N frames (reducido de 15 a 10 para más análisis)
+    output_events_path: str,
+    enable_par: bool = PROCESSING_PARAMS["enable_par"],      # Habilitar/deshabilitar PAR
+    par_interval: int = PROCESSING_PARAMS["par_interval"],   # Analizar PAR cada N frames
+    source=None,              # Subida en curso (UploadSession) si el video aún está llegando
+    zone_config=None,         # Zonas y líneas de la cámara (zone_config.py); por defecto los cuadrantes
+    motion_gate: bool = PROCESSING_PARAMS["motion_gate"],  # Saltar la detección en frames sin movimiento
+    frame_stride: int = PROCESSING_PARAMS["frame_stride"],  # Detectar uno de cada N frames
+    imgsz: int = PROCESSING_PARAMS["imgsz"],                # Tamaño de entrada del detector
+    roi: bool = PROCESSING_PARAMS["roi"],                   # Detectar solo en el área de las zonas
+    camera_id=None,           # Cámara del video (throughput por cámara)
 ):
     """
     Función que procesa el video en segundo plano.
@@ -80,13 +203,43 @@ def process_video_task(
         task_id: ID único de la tarea
         video_path: Ruta al video de entrada
         output_video_path: Ruta para guardar video procesado
-        output_csv_path: Ruta para guardar datos CSV
+        output_events_path: Ruta para guardar los eventos (Parquet; CSV si falta pyarrow)
         enable_par: Habilitar análisis de género y edad (default: True)
-        par_interval: Analizar atributos cada N frames (default: 15)
+        par_interval: Analizar atributos cada N frames (default: 10)
+        source: Subida en curso (inicio anticipado). Al llegar al final de lo
+            recibido se espera a que lleguen más datos y se reabre el video en
+            el frame siguiente, hasta que la subida se complete.
+        zone_config: Configuración de zonas de la cámara (normalize_zone_config);
+            None para los cuatro cuadrantes
+        motion_gate: Saltar la detección en frames sin movimiento respecto del
+            último frame detectado (se reutilizan sus detecciones y tracks)
+        frame_stride: Decodificar y detectar solo uno de cada N frames; los
+            intermedios se saltan con grab() (sin decodificar) y sus tracks se
+            interpolan linealmente entre los frames detectados para zonas,
+            líneas y el log de tracks. El video anotado contiene solo los
+            frames detectados (a fps / N, misma duración): dibujar las cajas
+            interpoladas obligaría a decodificar los intermedios, justo lo
+            que el stride ahorra. par_interval se redondea hacia arriba a un
+            múltiplo de N.
+        imgsz: Tamaño de entrada del detector (lado mayor, múltiplo de 32);
+            menor es más rápido y pierde personas pequeñas
+        roi: Recortar cada frame al rectángulo que cubre las zonas y líneas
+            (más roi_padding) antes de detectar; las cajas se devuelven a
+            coordenadas del frame completo. Sin efecto si el rectángulo es el
+            frame entero (p. ej. los cuadrantes por defecto)
+        camera_id: Cámara del video; al completar se registra el throughput
+            de la tarea en el índice por cámara (throughput_index.py)
     """
+    track_log = None
     try:
+        frame_stride = int(frame_stride)
+        if frame_stride < 1:
+            raise ValueError("frame_stride debe ser mayor o igual que 1")
+        # PAR corre en frames detectados: su intervalo debe ser múltiplo de frame_stride
+        par_interval = -(-par_interval // frame_stride) * frame_stride
+
         # 1. Cargar modelo YOLO
-        model = YOLO('yolov8s.pt')  # Small model - mejor balance precisión/velocidad que nano
+        model = YOLO(PROCESSING_PARAMS["model"])  # Small model - mejor balance precisión/velocidad que nano
         
         # 1b. Cargar modelo PAR si está habilitado
         par_model = None
@@ -106,64 +259,151 @@ def process_video_task(
 
         task_status[task_id] = {
             "status": "processing",
+            "stage": "detection",
             "progress": 0,
             "total_frames": total_frames
         }
+        status_broadcaster.publish(task_id, task_status[task_id])
 
         # 2. Configurar video de salida y zonas
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
+        out = cv2.VideoWriter(output_video_path, fourcc, fps / frame_stride, (width, height))
         
-        # Definición de polígonos (igual que en tu script)
-        POLYGONS = [
-            np.array([[0, 0], [width // 2, 0], [width // 2, height // 2], [0, height // 2]], np.int32),
-            np.array([[width // 2, 0], [width, 0], [width, height // 2], [width // 2, height // 2]], np.int32),
-            np.array([[0, height // 2], [width // 2, height // 2], [width // 2, height], [0, height]], np.int32),
-            np.array([[width // 2, height // 2], [width, height // 2], [width, height], [width // 2, height]], np.int32)
-        ]
-
-        zones = [sv.PolygonZone(p) for p in POLYGONS]
+        # Zonas de la cámara (o los cuatro cuadrantes), compiladas una vez para la resolución del video
+        zone_config = zone_config or default_zone_config(width, height)
+        min_frames_in, min_frames_out = zone_hysteresis(zone_config, PROCESSING_PARAMS)
+        zone_tracker = ZoneEventTracker(compile_zone_config(zone_config, width, height), min_frames_in, min_frames_out)
+        zone_polygons = zone_tracker.geometry.polygons
+        zone_names = [zone["name"] for zone in zone_config["zones"]]
+        # Líneas de conteo direccional (entradas/salidas por puertas)
+        line_counter = LineCrossingCounter(line_segments(zone_config, width, height), width, height)
+        line_names = [line["name"] for line in zone_config["lines"]]
+        # Modo ROI: rectángulo de las zonas y líneas donde corre la detección
+        roi_box = roi_bounds(zone_polygons, line_segments(zone_config, width, height), width, height,
+                             PROCESSING_PARAMS["roi_padding"]) if roi else None
+        roi_area_fraction = ((roi_box[2] - roi_box[0]) * (roi_box[3] - roi_box[1]) / (width * height)
+                             if roi_box is not None else 1.0)
+        if roi_box is not None:
+            print(f"🔲 ROI de detección {roi_box} ({roi_area_fraction:.0%} del frame)")
         bounding_box_annotator = sv.BoundingBoxAnnotator(thickness=2)
         label_annotator = sv.LabelAnnotator(text_thickness=1, text_scale=0.5)
+        
+        # Log de tracks por frame para reevaluar zonas y eventos sin volver a detectar
+        track_log = TrackLogWriter(
+            track_log_path(os.path.dirname(output_events_path), task_id),
+            {"fps": fps, "width": width, "height": height, "total_frames": total_frames,
+             "params": {**PROCESSING_PARAMS, "enable_par": bool(enable_par and par_model), "par_interval": par_interval,
+                        "motion_gate": bool(motion_gate), "frame_stride": frame_stride,
+                        "imgsz": imgsz, "roi": bool(roi), "roi_box": roi_box,
+                        "zone_min_frames_in": min_frames_in, "zone_min_frames_out": min_frames_out},
+             "zone_config": zone_config}
+        )
 
         # 3. Procesamiento
         data_list = []
-        entered_ids_per_zone = {i: set() for i in range(len(zones))}
-        total_counts_per_zone = {i: 0 for i in range(len(zones))}
-        # Rastrear personas actualmente en cada zona para detectar salidas
-        current_ids_per_zone = {i: set() for i in range(len(zones))}
-        previous_ids_per_zone = {i: set() for i in range(len(zones))}
         frame_count = 0
+        gate = MotionGate(PROCESSING_PARAMS["motion_min_changed_fraction"],
+                          PROCESSING_PARAMS["motion_max_skip_frames"],
+                          PROCESSING_PARAMS["motion_hold_frames"]) if motion_gate else None
         
         # Caché de atributos demográficos por track_id
         demographic_cache = {}
+        
+        # Agregados en vivo consultables durante el procesamiento (/analytics/live)
+        live = LiveAggregates(n_zones=len(zone_polygons), total_frames=total_frames, n_lines=line_counter.n_lines)
+        live_aggregates[task_id] = live
+        
+        # Tiempo por etapa para reportar throughput en el estado
+        timer = StageTimer()
+        processing_start = time.perf_counter()
+        last_publish = processing_start
+
+        def update_zones(frame_number, xyxy, tracker_ids):
+            """Entradas y salidas por zona y cruces de línea de los tracks de un frame"""
+            timestamp = frame_number / fps
+            for event in zone_tracker.update(frame_number, timestamp, xyxy, tracker_ids, demographic_cache):
+                data_list.append(event)
+                live.record_event(event)
+            for event in line_counter.update(frame_number, timestamp, xyxy, tracker_ids, demographic_cache):
+                data_list.append(event)
+                live.record_event(event)
+
+        # Último frame detectado con tracks (frame, cajas, ids), origen de la interpolación
+        previous_tracks = None
 
         while cap.isOpened():
-            ret, frame = cap.read()
+            # Con frame_stride > 1 los frames intermedios se saltan sin decodificarlos
+            keyframe = (frame_count + 1) % frame_stride == 0
+            if keyframe:
+                ret, frame = cap.read()
+            else:
+                ret = cap.grab()
             if not ret:
+                # Inicio anticipado: esperar más datos de la subida y continuar donde quedó
+                if source is not None and source.wait_for_data(os.path.getsize(video_path)):
+                    cap.release()
+                    cap = cv2.VideoCapture(video_path)
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+                    continue
                 break
+            timer.mark("decode")
             
             frame_count += 1
+            if not keyframe:
+                continue
             timestamp = frame_count / fps
 
-            # Usar BotSORT con parámetros optimizados para mejor tracking en cruces
-            results = model.track(
-                frame, 
-                persist=True, 
-                classes=[0],  # Solo personas
-                verbose=False, 
-                tracker="botsort.yaml",  # Mejor tracker para oclusiones y cruces
-                conf=0.3,     # Umbral de confianza más bajo para detectar personas parcialmente ocultas
-                iou=0.5,      # Intersection over Union threshold
-                max_det=50    # Máximo de detecciones por frame
-            )[0]
-            detections = sv.Detections.from_ultralytics(results)
-
-            if results.boxes.id is not None:
-                detections.tracker_id = results.boxes.id.cpu().numpy().astype(int)
-
-                # Análisis PAR (Pedestrian Attribute Recognition) cada N frames
-                if par_model and frame_count % par_interval == 0:
+            # Modo ROI: el detector (y la compuerta) solo ven el área de las zonas
+            if roi_box is not None:
+                x0, y0, x1, y1 = roi_box
+                detection_input = frame[y0:y1, x0:x1]
+            else:
+                detection_input = frame
+
+            # Compuerta de movimiento: en un frame sin cambios se reutilizan las
+            # detecciones y tracks del último frame detectado (el tracker no avanza)
+            detect = gate is None or gate.should_detect(detection_input)
+            timer.mark("motion")
+
+            if detect:
+                # Usar BotSORT con parámetros optimizados para mejor tracking en cruces
+                results = model.track(
+                    detection_input, 
+                    persist=True, 
+                    imgsz=imgsz, 
+                    classes=[0],  # Solo personas
+                    verbose=False, 
+                    tracker=PROCESSING_PARAMS["tracker"],  # BotSORT: mejor tracker para oclusiones y cruces
+                    conf=PROCESSING_PARAMS["conf"],        # Umbral bajo para detectar personas parcialmente ocultas
+                    iou=PROCESSING_PARAMS["iou"],          # Intersection over Union threshold
+                    max_det=PROCESSING_PARAMS["max_det"]   # Máximo de detecciones por frame
+                )[0]
+                detections = sv.Detections.from_ultralytics(results)
+                detections.tracker_id = (
+                    results.boxes.id.cpu().numpy().astype(int) if results.boxes.id is not None else None
+                )
+                if roi_box is not None:
+                    # Cajas del recorte a coordenadas del frame completo
+                    detections.xyxy = roi_to_frame(detections.xyxy, roi_box)
+                timer.mark("detect")
+
+            if detections.tracker_id is not None:
+                # Frames saltados desde el último frame detectado: tracks interpolados, en
+                # orden y antes del PAR de este frame (como los recorre la reevaluación)
+                if previous_tracks is not None:
+                    for skipped_frame, skipped_xyxy, skipped_ids in interpolate_tracks(
+                            *previous_tracks, frame_count, detections.xyxy, detections.tracker_id):
+                        track_log.add_frame(skipped_frame, skipped_xyxy, None, skipped_ids)
+                        update_zones(skipped_frame, skipped_xyxy, skipped_ids)
+                        live.update_frame(skipped_frame, skipped_frame / fps, zone_tracker.occupancy())
+                    timer.mark("interpolate")
+                previous_tracks = (frame_count, detections.xyxy, detections.tracker_id)
+
+                # Resultados PAR obtenidos en este frame (para el log de tracks)
+                par_updates = {}
+
+                # Análisis PAR (Pedestrian Attribute Recognition) cada N frames detectados
+                if par_model and detect and frame_count % par_interval == 0:
                     # Batch processing de atributos demográficos
                     bboxes = detections.xyxy.tolist()  # Lista de [x1, y1, x2, y2]
                     track_ids = detections.tracker_id.tolist()
@@ -186,7 +426,7 @@ def process_video_task(
                                     result = par_model.predict(pil_image)
                                     
                                     # Mapear a formato compatible
-                                    demographic_cache[track_id] = {
+                                    demographic_cache[track_id] = par_updates[track_id] = {
                                         'gender': result['gender'],  # 'M' o 'F'
                                         'gender_confidence': result['gender_conf'],
                                         'age': result['age_group'],  # '0-18', '19-35', etc.
@@ -199,65 +439,22 @@ def process_video_task(
                             # Guardar en caché
                             for track_id, par_result in zip(track_ids, par_results):
                                 if par_result['gender'] != 'Desconocido':
-                                    demographic_cache[track_id] = par_result
+                                    demographic_cache[track_id] = par_updates[track_id] = par_result
                                     
                     except Exception as e:
                         print(f"⚠️  Error en análisis PAR (frame {frame_count}): {e}")
                         import traceback
                         traceback.print_exc()
+                    timer.mark("par")
 
-                # Guardar el estado anterior
-                previous_ids_per_zone = {i: current_ids_per_zone[i].copy() for i in range(len(zones))}
-                # Resetear el estado actual
-                current_ids_per_zone = {i: set() for i in range(len(zones))}
+                track_log.add_frame(frame_count, detections.xyxy, detections.confidence,
+                                    detections.tracker_id, par_updates)
+                update_zones(frame_count, detections.xyxy, detections.tracker_id)
+            else:
+                previous_tracks = None
 
-                # Detectar personas actualmente en cada zona
-                for i, zone in enumerate(zones):
-                    mask = zone.trigger(detections=detections)
-                    detections_in_zone = detections[mask]
-
-                    for tracker_id in detections_in_zone.tracker_id:
-                        current_ids_per_zone[i].add(tracker_id)
-                        
-                        # Detectar ENTRADA: persona no estaba en zona anterior pero sí está ahora
-                        if tracker_id not in previous_ids_per_zone[i]:
-                            if tracker_id not in entered_ids_per_zone[i]:
-                                entered_ids_per_zone[i].add(tracker_id)
-                                total_counts_per_zone[i] += 1
-                            
-                            # Obtener atributos demográficos del caché
-                            demo_attrs = demographic_cache.get(tracker_id, {})
-                            
-                            data_list.append({
-                                'timestamp_seconds': timestamp, 
-                                'frame': frame_count,
-                                'zone_id': i, 
-                                'person_tracker_id': tracker_id,
-                                'event': 'entry',
-                                'gender': demo_attrs.get('gender', 'Desconocido'),
-                                'gender_confidence': demo_attrs.get('gender_confidence', 0.0),
-                                'age': demo_attrs.get('age', 'Desconocido'),
-                                'age_confidence': demo_attrs.get('age_confidence', 0.0)
-                            })
-
-                # Detectar SALIDAS: personas que estaban en zona anterior pero ya no están
-                for i in range(len(zones)):
-                    exited_ids = previous_ids_per_zone[i] - current_ids_per_zone[i]
-                    for tracker_id in exited_ids:
-                        # Obtener atributos demográficos del caché
-                        demo_attrs = demographic_cache.get(tracker_id, {})
-                        
-                        data_list.append({
-                            'timestamp_seconds': timestamp, 
-                            'frame': frame_count,
-                            'zone_id': i, 
-                            'person_tracker_id': tracker_id,
-                            'event': 'exit',
-                            'gender': demo_attrs.get('gender', 'Desconocido'),
-                            'gender_confidence': demo_attrs.get('gender_confidence', 0.0),
-                            'age': demo_attrs.get('age', 'Desconocido'),
-                            'age_confidence': demo_attrs.get('age_confidence', 0.0)
-                        })
+            live.update_frame(frame_count, timestamp, zone_tracker.occupancy())
+            timer.mark("zones")
 
             # Anotación del frame con atributos demográficos
             if detections.tracker_id is not None:
@@ -301,36 +498,207 @@ def process_video_task(
             
             annotated_frame = bounding_box_annotator.annotate(scene=frame.copy(), detections=detections)
             annotated_frame = label_annotator.annotate(scene=annotated_frame, detections=detections, labels=labels)
-            for i, zone in enumerate(zones):
-                polygon = zone.polygon.astype(int)
-                count = total_counts_per_zone[i]
+            for i, polygon in enumerate(zone_polygons):
+                count = zone_tracker.total_counts[i]
                 cv2.polylines(annotated_frame, [polygon], True, (255, 255, 255), 2)
-                cv2.putText(annotated_frame, f"Zona {i}: {count}", (polygon[0][0], polygon[0][1] - 10),
+                cv2.putText(annotated_frame, f"{zone_names[i]}: {count}", (polygon[0][0], polygon[0][1] - 10),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            for i, (start, end) in enumerate(zip(line_counter.starts, line_counter.ends)):
+                start, end = tuple(np.round(start).astype(int)), tuple(np.round(end).astype(int))
+                line_in, line_out = line_counter.counts[i]
+                cv2.line(annotated_frame, start, end, (0, 255, 255), 2)
+                cv2.putText(annotated_frame, f"{line_names[i]}: {line_in} in / {line_out} out",
+                            (start[0], start[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            if roi_box is not None:
+                cv2.rectangle(annotated_frame, roi_box[:2], roi_box[2:], (255, 128, 0), 1)
+            timer.mark("annotate")
             
             out.write(annotated_frame)
+            timer.mark("encode")
 
-            # Actualizar progreso
-            if frame_count % 30 == 0: # Actualiza cada 30 frames
-                task_status[task_id]["progress"] = frame_count
+            # Publicar progreso y throughput (como mucho cada STATUS_PUBLISH_INTERVAL segundos)
+            now = time.perf_counter()
+            if now - last_publish >= STATUS_PUBLISH_INTERVAL:
+                last_publish = now
+                elapsed = now - processing_start
+                frames_per_second = frame_count / elapsed if elapsed > 0 else 0.0
+                publish_status(
+                    task_id,
+                    progress=frame_count,
+                    elapsed_seconds=round(elapsed, 2),
+                    fps=round(frames_per_second, 2),
+                    eta_seconds=round((total_frames - frame_count) / frames_per_second, 1)
+                    if frames_per_second > 0 and total_frames > frame_count else None,
+                    stages=timer.report(),
+                    motion_gate=gate.report() if gate is not None else None
+                )
 
         # 4. Limpieza y guardado
+        detection_seconds = time.perf_counter() - processing_start
         cap.release()
         out.release()
+        
+        if source is not None and not source.complete:
+            raise IOError(f"La subida no se completó correctamente (estado: {source.status})")
 
-        if data_list:
-            df = pd.DataFrame(data_list)
-            df.to_csv(output_csv_path, index=False)
+        publish_status(task_id, stage="saving", progress=frame_count, stages=timer.report())
+        timer.restart()
+        try:
+            track_log.close()
+        except Exception as e:
+            print(f"⚠️  No se pudo guardar el log de tracks: {e}")
+            track_log.abort()
+        timer.mark("track_log")
+
+        save_events(task_id, data_list, output_events_path, timer)
+        
+        # Throughput de la configuración de detección, para el reporte por cámara
+        try:
+            get_throughput_index(os.path.dirname(output_events_path)).record(
+                task_id, camera_id, imgsz, roi, frame_stride, motion_gate, width, height, roi_area_fraction,
+                frame_count, detection_seconds, timer.seconds.get("detect", 0.0)
+            )
+        except Exception as e:
+            print(f"⚠️  No se pudo registrar el throughput de la tarea: {e}")
         
         # 5. Marcar la tarea como completada
-        task_status[task_id].update({
-            "status": "completed",
-            "progress": total_frames,
-            "results": {
+        release_live_aggregates(task_id, "completed")
+        publish_status(
+            task_id,
+            status="completed",
+            stage="done",
+            progress=total_frames,
+            elapsed_seconds=round(time.perf_counter() - processing_start, 2),
+            stages=timer.report(),
+            zone_events=zone_tracker.event_stats(frame_count / fps if fps else 0.0),
+            motion_gate=gate.report() if gate is not None else None,
+            frame_stride=frame_stride,
+            # Con frame_stride > 1 el video anotado tiene solo los frames detectados
+            video={"fps": round(fps / frame_stride, 3), "keyframes_only": frame_stride > 1},
+            detection={"imgsz": imgsz, "roi": bool(roi), "roi_box": roi_box,
+                       "roi_area_fraction": round(roi_area_fraction, 4),
+                       "fps": round(frame_count / detection_seconds, 2) if detection_seconds > 0 else None},
+            results={
                 "video_url": f"/download/video/{task_id}",
                 "csv_url": f"/download/csv/{task_id}",
+                "analytics_url": f"/analytics/analyze/{task_id}",
+            }
+        )
+
+    except Exception as e:
+        task_status[task_id] = {"status": "failed", "error": str(e)}
+        status_broadcaster.publish(task_id, task_status[task_id])
+        release_live_aggregates(task_id, "failed")
+        if track_log is not None:
+            track_log.abort()
+
+
+def reevaluate_task(
+    task_id: str,
+    source_task_id: str,
+    output_dir: str,
+    zone_config=None,
+    par_interval: int = None,
+    min_frames_in: int = None,
+    min_frames_out: int = None,
+):
+    """
+    Tarea de reevaluación: recalcula los eventos de zona y línea y los analytics de
+    una tarea ya procesada a partir de su log de tracks, sin decodificar el
+    video ni correr el detector. El resultado es una tarea nueva (task_id)
+    que comparte el video anotado de la original.
+    
+    Args:
+        task_id: ID de la nueva tarea
+        source_task_id: Tarea procesada cuyo log de tracks se reevalúa
+        output_dir: Directorio de salida (log de tracks y eventos)
+        zone_config: Configuración de zonas (normalize_zone_config); por defecto
+            la misma con que se procesó el video
+        par_interval: Usar atributos PAR cada N frames; debe ser múltiplo del
+            intervalo con que se procesó el video (por defecto el mismo)
+        min_frames_in, min_frames_out: Umbrales de histéresis de zonas (por
+            defecto los de la configuración de zonas o los del procesamiento original)
+    """
+    try:
+        timer = StageTimer()
+        processing_start = time.perf_counter()
+        source_log = track_log_path(output_dir, source_task_id)
+        tracks, meta = read_track_log(source_log)
+        timer.mark("read_track_log")
+        
+        recorded = meta["params"]
+        if par_interval is None:
+            par_interval = recorded["par_interval"]
+        elif par_interval % recorded["par_interval"] != 0:
+            raise ValueError(
+                f"par_interval debe ser múltiplo de {recorded['par_interval']} (intervalo del procesamiento original)"
+            )
+        use_par = recorded["enable_par"]
+        
+        publish_status(
+            task_id,
+            status="processing",
+            stage="reevaluation",
+            source_task_id=source_task_id,
+            progress=0,
+            total_frames=meta["total_frames"]
+        )
+        
+        fps = meta["fps"]
+        zone_config = zone_config or meta.get("zone_config")
+        default_in, default_out = zone_hysteresis(zone_config, recorded)
+        zone_tracker = ZoneEventTracker(
+            compile_zone_config(zone_config, meta["width"], meta["height"]),
+            min_frames_in or default_in,
+            min_frames_out or default_out
+        )
+        line_counter = LineCrossingCounter(
+            line_segments(zone_config, meta["width"], meta["height"]), meta["width"], meta["height"]
+        )
+        xyxy = tracks[["x1", "y1", "x2", "y2"]].to_numpy(dtype=np.float32)
+        track_ids = tracks["track_id"].to_numpy().astype(int)
+        has_attributes = tracks["gender"].notna().to_numpy()
+        data_list = []
+        demographic_cache = {}
+        
+        for frame, rows in iter_track_frames(tracks):
+            # Atributos PAR en los mismos frames que el pipeline (cada par_interval)
+            if use_par and frame % par_interval == 0 and has_attributes[rows].any():
+                for row in np.flatnonzero(has_attributes[rows]) + rows.start:
+                    demographic_cache[track_ids[row]] = {
+                        'gender': tracks.at[row, 'gender'],
+                        'gender_confidence': float(tracks.at[row, 'gender_confidence']),
+                        'age': tracks.at[row, 'age'],
+                        'age_confidence': float(tracks.at[row, 'age_confidence'])
+                    }
+            tracked = np.arange(rows.start, rows.stop)[track_ids[rows] != NO_TRACK]
+            data_list.extend(zone_tracker.update(frame, frame / fps, xyxy[tracked], track_ids[tracked], demographic_cache))
+            data_list.extend(line_counter.update(frame, frame / fps, xyxy[tracked], track_ids[tracked], demographic_cache))
+        timer.mark("zones")
+        
+        publish_status(task_id, stage="saving", progress=meta["total_frames"], stages=timer.report())
+        timer.restart()
+        # La nueva tarea también se puede reevaluar
+        link_track_log(source_log, track_log_path(output_dir, task_id))
+        save_events(task_id, data_list, events_path(output_dir, task_id), timer)
+        
+        publish_status(
+            task_id,
+            status="completed",
+            stage="done",
+            elapsed_seconds=round(time.perf_counter() - processing_start, 2),
+            stages=timer.report(),
+            events=len(data_list),
+            zone_events=zone_tracker.event_stats(meta["total_frames"] / fps if fps else 0.0),
+            results={
+                "video_url": f"/download/video/{source_task_id}",
+                "csv_url": f"/download/csv/{task_id}",
+                "analytics_url": f"/analytics/analyze/{task_id}",
             }
-        })
+        )
+        print(f"♻️  Tarea {source_task_id} reevaluada como {task_id}: {len(data_list)} eventos "
+              f"en {time.perf_counter() - processing_start:.2f}s")
 
     except Exception as e:
-        task_status[task_id] = {"status": "failed", "error": str(e)}
\ No newline at end of file
+        task_status[task_id] = {"status": "failed", "error": str(e)}
+        status_broadcaster.publish(task_id, task_status[task_id])
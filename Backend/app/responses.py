@@ -0,0 +1,145 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+from Backend.app.analytics import convert_numpy_types
+
+# Serialización rápida opcional: orjson serializa tipos NumPy de forma nativa
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Compresión brotli opcional (si no está instalada se usa gzip)
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Expose-Headers": "ETag"
+}
+
+# Por debajo de este tamaño comprimir no compensa
+MIN_COMPRESS_BYTES = 1024
+
+# Cuerpos ya serializados/comprimidos por (ruta y query, ETag, codificación)
+MAX_ENCODED_BODIES = 32
+_encoded_bodies: "OrderedDict[Tuple[str, str, Optional[str]], Tuple[bytes, Optional[str]]]" = OrderedDict()
+_encoded_bodies_lock = threading.Lock()
+
+
+def dumps_json(content) -> bytes:
+    """
+    Serializa a JSON (bytes). Con orjson los escalares y arrays NumPy se
+    serializan directamente, sin recorrer el resultado con convert_numpy_types.
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # Tipos no soportados por orjson: ruta estándar
+    return json.dumps(convert_numpy_types(content), separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: bytes):
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Codificación de contenido a usar según Accept-Encoding: 'br', 'gzip' o None
+    """
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if BROTLI_AVAILABLE and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _encode(content, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    body = dumps_json(content)
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=5), "br"
+    return gzip.compress(body, compresslevel=5), "gzip"
+
+
+def request_scope(request: Request) -> str:
+    """
+    Ruta y query normalizada (parámetros ordenados) de la petición. Distintos
+    endpoints pueden construir el ETag con las mismas claves de caché para
+    cuerpos distintos: el ETag y la caché de cuerpos incluyen este alcance.
+    """
+    return f"{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """
+    True si el If-None-Match del cliente coincide con el ETag (comparación débil)
+    """
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    strip_weak = lambda tag: tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+    return strip_weak(etag) in {strip_weak(tag) for tag in header.split(",")}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=304,
+        headers={**CORS_HEADERS, "ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    )
+
+
+async def json_response(request: Request, content, status_code: int = 200,
+                        etag: Optional[str] = None) -> Response:
+    """
+    Respuesta JSON serializada con dumps_json, comprimida (brotli/gzip) si el
+    cliente lo acepta y el cuerpo es grande, y con ETag si se indica. Con ETag
+    el cuerpo codificado se reutiliza entre peticiones. La serialización y la
+    compresión (varios MB en los análisis grandes) corren fuera del event loop.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+
+    if etag is None:
+        body, used_encoding = await run_in_threadpool(_encode, content, encoding)
+    else:
+        key = (request_scope(request), etag, encoding)
+        with _encoded_bodies_lock:
+            cached = _encoded_bodies.get(key)
+            if cached is not None:
+                _encoded_bodies.move_to_end(key)
+        if cached is None:
+            cached = await run_in_threadpool(_encode, content, encoding)
+            with _encoded_bodies_lock:
+                _encoded_bodies[key] = cached
+                while len(_encoded_bodies) > MAX_ENCODED_BODIES:
+                    _encoded_bodies.popitem(last=False)
+        body, used_encoding = cached
+
+    headers = {**CORS_HEADERS, "Vary": "Accept-Encoding"}
+    if etag is not None:
+        # no-cache: el navegador revalida siempre y recibe 304 si nada cambió
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"
+    if used_encoding is not None:
+        headers["Content-Encoding"] = used_encoding
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
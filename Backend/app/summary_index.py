@@ -0,0 +1,233 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from Backend.app.analytics import ANALYTICS_VERSION, analytics_processor
+from Backend.app.events_io import list_events_files
+from Backend.app.index_db import remove_superseded_databases
+
+
+class SummaryIndex:
+    """
+    Índice persistente (SQLite) con el resumen de cada tarea procesada.
+
+    El pipeline inserta la fila al completar una tarea y el endpoint
+    /analytics/summary solo lee del índice. Cada lectura lo re-sincroniza de
+    forma incremental comparando tamaño y mtime de cada archivo de eventos (un
+    stat por tarea): solo se re-analizan los nuevos o modificados y se eliminan
+    los que ya no existen. El mtime del directorio no basta: reescribir un
+    archivo en su lugar no lo cambia.
+    """
+
+    # En un subdirectorio para que escribir la base no cambie el mtime del directorio de salida
+    DB_DIRNAME = ".index"
+    DB_FILENAME = "summary_index_v2.sqlite3"
+
+    # Columnas por las que se puede ordenar (todas indexadas)
+    SORTABLE_COLUMNS = (
+        "timestamp", "total_detections", "unique_persons",
+        "duration_seconds", "zones_count", "detection_rate"
+    )
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.db_path = os.path.join(output_dir, self.DB_DIRNAME, self.DB_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # Las versiones anteriores del esquema se reconstruyen aquí al re-sincronizar
+        remove_superseded_databases(self.db_path)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Conexión de corta duración: commit al salir sin error y cierre siempre"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_summary (
+                    task_id TEXT PRIMARY KEY,
+                    events_path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    analytics_version TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    total_detections INTEGER NOT NULL,
+                    unique_persons INTEGER NOT NULL,
+                    duration_seconds REAL NOT NULL,
+                    zones_count INTEGER NOT NULL,
+                    detection_rate REAL NOT NULL
+                )
+            """)
+            for column in self.SORTABLE_COLUMNS:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_task_summary_{column} ON task_summary({column})"
+                )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def update_task(self, task_id: str, events_path: str):
+        """
+        Calcula (solo el resumen) y guarda la fila de una tarea
+        """
+        self.store_summary(task_id, events_path, summarize_events_file(events_path))
+
+    def store_summary(self, task_id: str, events_path: str, analysis: Dict):
+        """
+        Guarda la fila de una tarea a partir de su análisis (summarize_events_file)
+        """
+        stat = os.stat(events_path)
+        if "error" in analysis:
+            print(f"⚠️  Resumen no disponible para {task_id}: {analysis['error']}")
+        summary = analysis.get("summary", {})
+
+        row = {
+            "task_id": task_id,
+            "events_path": os.path.abspath(events_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "analytics_version": ANALYTICS_VERSION,
+            "timestamp": float(stat.st_ctime),
+            "total_detections": int(summary.get("total_detections", 0)),
+            "unique_persons": int(summary.get("unique_persons", 0)),
+            "duration_seconds": float(summary.get("duration_seconds", 0.0)),
+            "zones_count": int(summary.get("zones_count", 0)),
+            "detection_rate": float(summary.get("detection_rate", 0.0))
+        }
+
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{column}" for column in row)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO task_summary ({columns}) VALUES ({placeholders})", row)
+
+    def refresh(self, force: bool = False) -> Dict:
+        """
+        Sincroniza el índice con los archivos de eventos del directorio de salida
+        (con `force`, re-analiza todas las tareas)
+        """
+        plan = self.plan_refresh(force)
+        if plan is None:
+            return {"added_or_updated": 0, "removed": 0}
+
+        analyses = {}
+        for task_id, path in plan["to_update"].items():
+            try:
+                analyses[task_id] = summarize_events_file(path)
+            except (OSError, ValueError) as e:
+                print(f"Error indexing {path}: {str(e)}")
+        return self.apply_refresh(plan, analyses)
+
+    def plan_refresh(self, force: bool = False) -> Optional[Dict]:
+        """
+        Tareas a re-analizar ({task_id: ruta}) y a eliminar del índice, o None
+        si el índice está al día. Los análisis pueden calcularse en paralelo
+        (summarize_events_file) y guardarse después con apply_refresh().
+        """
+        with self._connect() as conn:
+            indexed = {
+                row["task_id"]: row
+                for row in conn.execute(
+                    "SELECT task_id, events_path, size, mtime_ns, analytics_version FROM task_summary"
+                )
+            }
+
+        on_disk = list_events_files(self.output_dir)
+
+        to_update = {}
+        for task_id, path in on_disk.items():
+            try:
+                stat = os.stat(path)
+                row = indexed.get(task_id)
+                if (force or row is None or row["events_path"] != os.path.abspath(path)
+                        or row["size"] != stat.st_size or row["mtime_ns"] != stat.st_mtime_ns
+                        or row["analytics_version"] != ANALYTICS_VERSION):
+                    to_update[task_id] = path
+            except OSError as e:
+                print(f"Error indexing {path}: {str(e)}")
+
+        removed = [task_id for task_id in indexed if task_id not in on_disk]
+        if not to_update and not removed:
+            return None
+        return {"to_update": to_update, "removed": removed}
+
+    def apply_refresh(self, plan: Dict, analyses: Dict[str, Dict]) -> Dict:
+        """
+        Guarda los análisis de plan_refresh() y elimina las tareas borradas. Las
+        tareas sin análisis (error o timeout) conservan su fila anterior, así que
+        se reintentan en la próxima lectura.
+        """
+        updated = 0
+        for task_id, analysis in analyses.items():
+            try:
+                self.store_summary(task_id, plan["to_update"][task_id], analysis)
+                updated += 1
+            except OSError as e:
+                print(f"Error indexing {plan['to_update'][task_id]}: {str(e)}")
+
+        with self._lock, self._connect() as conn:
+            conn.executemany("DELETE FROM task_summary WHERE task_id = ?", [(t,) for t in plan["removed"]])
+
+        return {"added_or_updated": updated, "removed": len(plan["removed"])}
+
+    def query(self, offset: int = 0, limit: Optional[int] = None,
+              sort_by: str = "timestamp", descending: bool = True) -> Dict:
+        """
+        Lectura paginada y ordenada del índice
+        """
+        if sort_by not in self.SORTABLE_COLUMNS:
+            raise ValueError(f"sort_by debe ser uno de: {', '.join(self.SORTABLE_COLUMNS)}")
+
+        order = "DESC" if descending else "ASC"
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM task_summary").fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM task_summary ORDER BY {sort_by} {order}, task_id LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+
+        tasks = [
+            {
+                "task_id": row["task_id"],
+                "timestamp": row["timestamp"],
+                "summary": {
+                    "total_detections": row["total_detections"],
+                    "unique_persons": row["unique_persons"],
+                    "duration_seconds": row["duration_seconds"],
+                    "zones_count": row["zones_count"],
+                    "detection_rate": row["detection_rate"]
+                }
+            }
+            for row in rows
+        ]
+        return {"total_tasks": total, "offset": offset, "limit": limit, "tasks": tasks}
+
+
+def summarize_events_file(events_path: str) -> Dict:
+    """
+    Análisis (solo summary) de un archivo de eventos para el índice. Función
+    de módulo para poder ejecutarse en un proceso del pool de análisis.
+    """
+    return analytics_processor.process_events_file(events_path, sections=["summary"])
+
+
+_summary_indexes: Dict[str, SummaryIndex] = {}
+_summary_indexes_lock = threading.Lock()
+
+
+def get_summary_index(output_dir: str) -> SummaryIndex:
+    """
+    Obtiene (o crea) el índice de resumen asociado a un directorio de salida
+    """
+    key = os.path.abspath(output_dir)
+    with _summary_indexes_lock:
+        if key not in _summary_indexes:
+            _summary_indexes[key] = SummaryIndex(output_dir)
+        return _summary_indexes[key]
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+# Estados finales: el canal envía el último estado y se cierra
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class StatusBroadcaster:
+    """
+    Canal de estado por tarea para clientes en streaming (SSE).
+
+    El worker publica el estado completo con publish(); solo se guarda el
+    último (con un número de versión) y se avisa a los suscriptores, sin colas.
+    Cada suscriptor envía siempre el estado más reciente y como mucho uno cada
+    `min_interval` segundos: los estados intermedios se fusionan, así un
+    cliente lento nunca retiene memoria ni bloquea al worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Tuple[int, Dict]] = {}
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+    def publish(self, task_id: str, status: Dict):
+        """
+        Publica el estado actual de una tarea (llamable desde cualquier hilo)
+        """
+        with self._lock:
+            version = self._latest.get(task_id, (0, None))[0] + 1
+            self._latest[task_id] = (version, dict(status))
+            subscribers = list(self._subscribers.get(task_id, ()))
+
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Event loop cerrado: el suscriptor ya no existe
+
+    def latest(self, task_id: str) -> Optional[Tuple[int, Dict]]:
+        with self._lock:
+            return self._latest.get(task_id)
+
+    async def subscribe(self, task_id: str, min_interval: float = 0.25,
+                        heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict]]:
+        """
+        Itera los estados de la tarea a medida que cambian. Produce None cada
+        `heartbeat` segundos sin cambios (para mantener viva la conexión) y
+        termina después de enviar un estado final.
+        """
+        event = asyncio.Event()
+        entry = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(entry)
+
+        try:
+            sent_version = 0
+            while True:
+                latest = self.latest(task_id)
+                if latest is not None and latest[0] > sent_version:
+                    sent_version, status = latest
+                    yield status
+                    if status.get("status") in TERMINAL_STATUSES:
+                        return
+                    # Fusionar las publicaciones que lleguen mientras tanto
+                    await asyncio.sleep(min_interval)
+                    continue
+
+                event.clear()
+                # Re-verificar tras limpiar para no perder una publicación concurrente
+                latest = self.latest(task_id)
+                if latest is not None and latest[0] > sent_version:
+                    continue
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(task_id)
+                if subscribers is not None:
+                    subscribers.discard(entry)
+                    if not subscribers:
+                        del self._subscribers[task_id]
+
+
+class StageTimer:
+    """
+    Acumula el tiempo de cada etapa del pipeline por frame (decodificación,
+    detección, PAR, zonas, anotación, escritura) para reportar su throughput
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._last = time.perf_counter()
+
+    def restart(self):
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        """Asigna a `stage` el tiempo transcurrido desde la marca anterior"""
+        now = time.perf_counter()
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + (now - self._last)
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self._last = now
+
+    def report(self) -> Dict:
+        """{etapa: {segundos, llamadas, ejecuciones por segundo}}"""
+        return {
+            stage: {
+                "seconds": round(seconds, 3),
+                "calls": self.calls[stage],
+                "per_second": round(self.calls[stage] / seconds, 2) if seconds > 0 else None
+            }
+            for stage, seconds in self.seconds.items()
+        }
+
+
+# Instancia global del canal de estado
+status_broadcaster = StatusBroadcaster()
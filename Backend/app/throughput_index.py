@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class ThroughputIndex:
+    """
+    Índice persistente (SQLite) del throughput de cada procesamiento por
+    cámara y configuración de detección (tamaño de inferencia, ROI,
+    frame_stride, compuerta de movimiento).
+
+    El pipeline registra una fila al completar cada tarea y
+    /cameras/{camera_id}/throughput agrupa por configuración y reporta la
+    ganancia de cada una frente a la detección sobre el frame completo con
+    el tamaño de inferencia por defecto (misma frame_stride y compuerta).
+    """
+
+    DB_DIRNAME = ".index"
+    DB_FILENAME = "throughput_v1.sqlite3"
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.db_path = os.path.join(output_dir, self.DB_DIRNAME, self.DB_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Conexión de corta duración: commit al salir sin error y cierre siempre"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_throughput (
+                    task_id TEXT PRIMARY KEY,
+                    camera_id TEXT,
+                    imgsz INTEGER NOT NULL,
+                    roi INTEGER NOT NULL,
+                    frame_stride INTEGER NOT NULL,
+                    motion_gate INTEGER NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    roi_area_fraction REAL NOT NULL,
+                    frames INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    detect_seconds REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_task_throughput_camera ON task_throughput(camera_id)")
+
+    def record(self, task_id: str, camera_id: Optional[str], imgsz: int, roi: bool, frame_stride: int,
+               motion_gate: bool, width: int, height: int, roi_area_fraction: float, frames: int,
+               seconds: float, detect_seconds: float):
+        """Registra (o reemplaza) el throughput de una tarea procesada"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO task_throughput (task_id, camera_id, imgsz, roi, frame_stride, motion_gate, "
+                "width, height, roi_area_fraction, frames, seconds, detect_seconds, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, camera_id, int(imgsz), int(bool(roi)), int(frame_stride), int(bool(motion_gate)),
+                 int(width), int(height), float(roi_area_fraction), int(frames), float(seconds),
+                 float(detect_seconds), time.time())
+            )
+
+    def camera_report(self, camera_id: str, default_imgsz: int) -> List[Dict]:
+        """
+        Throughput por configuración de detección de una cámara (frames de
+        video por segundo de procesamiento) y su aceleración frente a la
+        configuración base: imgsz por defecto y sin ROI, con la misma
+        frame_stride y compuerta de movimiento (None si no hay tareas base)
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT imgsz, roi, frame_stride, motion_gate,
+                       COUNT(*) AS tasks, SUM(frames) AS frames, SUM(seconds) AS seconds,
+                       SUM(detect_seconds) AS detect_seconds, AVG(roi_area_fraction) AS roi_area_fraction
+                FROM task_throughput
+                WHERE camera_id = ?
+                GROUP BY imgsz, roi, frame_stride, motion_gate
+                ORDER BY frame_stride, motion_gate, roi, imgsz
+            """, (camera_id,)).fetchall()
+
+        configurations = []
+        for row in rows:
+            fps = row["frames"] / row["seconds"] if row["seconds"] > 0 else None
+            configurations.append({
+                "imgsz": row["imgsz"],
+                "roi": bool(row["roi"]),
+                "frame_stride": row["frame_stride"],
+                "motion_gate": bool(row["motion_gate"]),
+                "tasks": row["tasks"],
+                "frames": row["frames"],
+                "seconds": round(row["seconds"], 2),
+                "fps": round(fps, 2) if fps is not None else None,
+                "detect_ms_per_frame": round(row["detect_seconds"] / row["frames"] * 1000, 2) if row["frames"] else None,
+                "roi_area_fraction": round(row["roi_area_fraction"], 4)
+            })
+
+        baselines = {
+            (c["frame_stride"], c["motion_gate"]): c["fps"]
+            for c in configurations if c["imgsz"] == default_imgsz and not c["roi"]
+        }
+        for configuration in configurations:
+            baseline = baselines.get((configuration["frame_stride"], configuration["motion_gate"]))
+            configuration["speedup"] = (round(configuration["fps"] / baseline, 2)
+                                        if baseline and configuration["fps"] is not None else None)
+        return configurations
+
+
+_throughput_indexes: Dict[str, ThroughputIndex] = {}
+_throughput_indexes_lock = threading.Lock()
+
+
+def get_throughput_index(output_dir: str) -> ThroughputIndex:
+    """
+    Obtiene (o crea) el índice de throughput asociado a un directorio de salida
+    """
+    key = os.path.abspath(output_dir)
+    with _throughput_indexes_lock:
+        if key not in _throughput_indexes:
+            _throughput_indexes[key] = ThroughputIndex(output_dir)
+        return _throughput_indexes[key]
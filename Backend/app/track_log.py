@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from Backend.app.events_io import PARQUET_AVAILABLE
+
+TRACKS_SUFFIX = "_tracks.parquet"
+
+# Filas acumuladas en memoria antes de escribir un row group
+TRACK_LOG_ROW_GROUP_ROWS = 256_000
+
+# track_id de la fila centinela de un frame con tracks vacíos
+NO_TRACK = -1
+
+# Clave de los metadatos del log (fps, resolución, parámetros) en el esquema Parquet
+TRACK_LOG_METADATA_KEY = b"track_log"
+
+
+def track_log_path(output_dir: str, task_id: str) -> str:
+    return os.path.join(output_dir, f"{task_id}{TRACKS_SUFFIX}")
+
+
+def _schema(metadata: Dict):
+    import pyarrow as pa
+    return pa.schema([
+        ("frame", pa.int32()),
+        ("track_id", pa.int32()),
+        ("x1", pa.float32()),
+        ("y1", pa.float32()),
+        ("x2", pa.float32()),
+        ("y2", pa.float32()),
+        ("confidence", pa.float32()),
+        # Resultado PAR del track en ese frame (nulo si PAR no corrió o no dio resultado)
+        ("gender", pa.dictionary(pa.int8(), pa.string())),
+        ("gender_confidence", pa.float32()),
+        ("age", pa.dictionary(pa.int8(), pa.string())),
+        ("age_confidence", pa.float32()),
+    ], metadata={TRACK_LOG_METADATA_KEY: json.dumps(metadata).encode("utf-8")})
+
+
+class TrackLogWriter:
+    """
+    Log compacto por frame de los tracks del detector (frame, track id, bbox,
+    confianza y resultados PAR) en Parquet, escrito por row groups mientras
+    se procesa el video. Permite recalcular eventos de zona y analytics con
+    otras zonas o lógica (reevaluate_task) sin volver a decodificar ni detectar.
+
+    Solo se registran los frames que actualizan las zonas (con tracks); un
+    frame con tracks vacíos se registra con una fila centinela (track_id -1).
+    Con frame_stride > 1 también los frames intermedios, con las cajas
+    interpoladas (interpolate_tracks) y sin confianza.
+    """
+
+    def __init__(self, path: str, metadata: Dict):
+        self.path = path
+        self.metadata = metadata
+        self.rows = 0
+        self._columns = {name: [] for name in ("frame", "track_id", "xyxy", "confidence")}
+        self._attributes = []  # (índice de fila, atributos PAR)
+        self._pending = 0
+        self._writer = None
+        if not PARQUET_AVAILABLE:
+            print("⚠️  pyarrow no disponible, no se guardará el log de tracks")
+
+    def add_frame(self, frame: int, xyxy: np.ndarray, confidence: Optional[np.ndarray],
+                  tracker_ids: np.ndarray, attributes: Optional[Dict[int, Dict]] = None):
+        """Tracks de un frame; `attributes` son los resultados PAR obtenidos en este frame por track"""
+        if not PARQUET_AVAILABLE:
+            return
+        if len(tracker_ids) == 0:
+            xyxy, confidence, tracker_ids = np.full((1, 4), np.nan), None, np.array([NO_TRACK])
+        n = len(tracker_ids)
+        self._columns["frame"].append(np.full(n, frame, dtype=np.int32))
+        self._columns["track_id"].append(np.asarray(tracker_ids, dtype=np.int32))
+        self._columns["xyxy"].append(np.asarray(xyxy, dtype=np.float32).reshape(n, 4))
+        self._columns["confidence"].append(
+            np.asarray(confidence, dtype=np.float32) if confidence is not None else np.full(n, np.nan, np.float32)
+        )
+        if attributes:
+            for offset, tracker_id in enumerate(tracker_ids.tolist()):
+                if tracker_id in attributes:
+                    self._attributes.append((self._pending + offset, attributes[tracker_id]))
+        self._pending += n
+        if self._pending >= TRACK_LOG_ROW_GROUP_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        xyxy = np.concatenate(self._columns["xyxy"])
+        gender = [None] * self._pending
+        age = [None] * self._pending
+        gender_confidence = np.full(self._pending, np.nan, dtype=np.float32)
+        age_confidence = np.full(self._pending, np.nan, dtype=np.float32)
+        for row, attrs in self._attributes:
+            gender[row] = attrs.get('gender')
+            age[row] = attrs.get('age')
+            gender_confidence[row] = attrs.get('gender_confidence', np.nan)
+            age_confidence[row] = attrs.get('age_confidence', np.nan)
+
+        schema = _schema(self.metadata)
+        table = pa.Table.from_arrays([
+            pa.array(np.concatenate(self._columns["frame"])),
+            pa.array(np.concatenate(self._columns["track_id"])),
+            pa.array(xyxy[:, 0]), pa.array(xyxy[:, 1]), pa.array(xyxy[:, 2]), pa.array(xyxy[:, 3]),
+            pa.array(np.concatenate(self._columns["confidence"])),
+            pa.array(gender, pa.string()).dictionary_encode().cast(schema.field("gender").type),
+            pa.array(gender_confidence, from_pandas=True),
+            pa.array(age, pa.string()).dictionary_encode().cast(schema.field("age").type),
+            pa.array(age_confidence, from_pandas=True),
+        ], schema=schema)
+
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path + ".tmp", schema, compression="zstd")
+        self._writer.write_table(table)
+        self.rows += self._pending
+        self._columns = {name: [] for name in self._columns}
+        self._attributes = []
+        self._pending = 0
+
+    def close(self) -> Optional[str]:
+        """Escribe lo pendiente y publica el archivo. Retorna su ruta (None si no hay log)"""
+        if not PARQUET_AVAILABLE:
+            return None
+        self._flush()
+        if self._writer is None:
+            # Video sin tracks: log vacío pero válido (la reevaluación da cero eventos)
+            import pyarrow.parquet as pq
+            pq.write_table(_schema(self.metadata).empty_table(), self.path + ".tmp")
+        else:
+            self._writer.close()
+        os.replace(self.path + ".tmp", self.path)
+        return self.path
+
+    def abort(self):
+        """Descarta el log parcial (la tarea falló)"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.path + ".tmp"):
+            os.remove(self.path + ".tmp")
+
+
+def read_track_log_metadata(path: str) -> Dict:
+    import pyarrow.parquet as pq
+    return json.loads(pq.read_schema(path).metadata[TRACK_LOG_METADATA_KEY])
+
+
+def read_track_log(path: str) -> Tuple[pd.DataFrame, Dict]:
+    """Tabla de tracks (ordenada por frame) y metadatos del log"""
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    metadata = json.loads(table.schema.metadata[TRACK_LOG_METADATA_KEY])
+    return table.to_pandas(), metadata
+
+
+def iter_track_frames(tracks: pd.DataFrame) -> Iterator[Tuple[int, slice]]:
+    """
+    (frame, filas del frame) en orden; el log se escribe ordenado por frame.
+    Las filas pueden incluir la centinela NO_TRACK.
+    """
+    frames = tracks["frame"].to_numpy()
+    if not len(frames):
+        return
+    starts = np.flatnonzero(np.r_[True, frames[1:] != frames[:-1]])
+    ends = np.r_[starts[1:], len(frames)]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield int(frames[start]), slice(start, end)
+
+
+def interpolate_tracks(start_frame: int, start_xyxy: np.ndarray, start_ids: np.ndarray,
+                       end_frame: int, end_xyxy: np.ndarray, end_ids: np.ndarray
+                       ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    (frame, cajas, track ids) de los frames intermedios entre dos frames
+    detectados (frame_stride > 1). La caja de cada track presente en ambos se
+    interpola linealmente, en el orden de detección del frame final; los
+    tracks que aparecen o desaparecen entre ellos no se rellenan.
+    """
+    end_ids = np.asarray(end_ids)
+    _, start_idx, end_idx = np.intersect1d(start_ids, end_ids, assume_unique=True, return_indices=True)
+    order = np.argsort(end_idx)
+    ids, start_idx, end_idx = end_ids[end_idx[order]], start_idx[order], end_idx[order]
+    start = np.asarray(start_xyxy, dtype=np.float64).reshape(-1, 4)[start_idx]
+    step = np.asarray(end_xyxy, dtype=np.float64).reshape(-1, 4)[end_idx] - start
+    span = end_frame - start_frame
+    for frame in range(start_frame + 1, end_frame):
+        yield frame, (start + step * ((frame - start_frame) / span)).astype(np.float32), ids
+
+
+def link_track_log(source_path: str, target_path: str):
+    """Comparte el log de una tarea con otra (hard link; copia si el sistema no lo permite)"""
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
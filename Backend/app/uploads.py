@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Tamaño de bloque sugerido a los clientes y de las escrituras a disco
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Inicio anticipado: formatos que se pueden decodificar a medida que llegan
+# (sin índice al final del archivo, a diferencia del MP4 clásico) y bytes
+# mínimos recibidos antes de empezar
+PROGRESSIVE_EXTENSIONS = (".ts", ".mts", ".m2ts", ".mkv", ".webm")
+EARLY_START_MIN_BYTES = 32 * 1024 * 1024
+
+# Escrituras a disco agrupadas durante la recepción de un bloque
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+class UploadOffsetError(Exception):
+    """El bloque no empieza donde termina lo recibido (el cliente debe reanudar desde `offset`)"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"offset esperado: {offset}")
+        self.offset = offset
+
+
+class ChecksumError(Exception):
+    """El SHA-256 de un bloque o del archivo completo no coincide con el declarado"""
+
+
+def write_and_hash(f, data: bytes, *hashers):
+    """Escribe un bloque y actualiza los hashes (en un hilo: ambas operaciones liberan el GIL)"""
+    f.write(data)
+    for hasher in hashers:
+        hasher.update(data)
+
+
+def file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(UPLOAD_CHUNK_BYTES):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class UploadSession:
+    """
+    Subida por bloques de un video. El id de la subida es también el task_id
+    de la tarea que lo procesa. Los datos se escriben directamente en la ruta
+    final para que el pipeline pueda leer el archivo mientras crece (inicio
+    anticipado); los metadatos se guardan en disco para reanudar tras un reinicio.
+    """
+
+    def __init__(self, upload_id: str, filename: str, size: int, path: str, meta_path: str,
+                 sha256: Optional[str] = None, early_start: bool = False, force: bool = False,
+                 camera_id: Optional[str] = None, options: Optional[Dict] = None):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.size = size
+        self.path = path
+        self.meta_path = meta_path
+        self.sha256 = sha256.lower() if sha256 else None
+        self.early_start = early_start
+        # Reprocesar aunque el mismo video ya se haya procesado (ver dedup.py)
+        self.force = force
+        # Cámara cuya configuración de zonas se aplica al procesar (zone_config.py)
+        self.camera_id = camera_id
+        # Opciones de procesamiento de la tarea (frame_stride, imgsz, roi de process_video_task)
+        self.options = options or {}
+        self.received = 0
+        self.status = "uploading"
+        self.processing_started = False
+        # Tarea existente reutilizada en lugar de procesar este video (deduplicación)
+        self.duplicate_of: Optional[str] = None
+        self.created_at = time.time()
+        # Hash incremental (solo en memoria: tras un reinicio se recalcula al completar)
+        self._hasher = hashlib.sha256()
+        self._write_lock = threading.Lock()
+        self._data_arrived = threading.Condition()
+
+    @property
+    def task_id(self) -> str:
+        return self.upload_id
+
+    @property
+    def complete(self) -> bool:
+        return self.status == "complete"
+
+    @property
+    def progressive(self) -> bool:
+        return os.path.splitext(self.filename)[1].lower() in PROGRESSIVE_EXTENSIONS
+
+    def can_start_early(self) -> bool:
+        """True si ya llegó lo suficiente para empezar a decodificar antes de completar"""
+        return (self.early_start and self.progressive and not self.processing_started
+                and self.status == "uploading" and self.received >= min(EARLY_START_MIN_BYTES, self.size))
+
+    def wait_for_data(self, offset: int, timeout: float = 300.0) -> bool:
+        """
+        Espera (en el hilo del pipeline) a que haya datos más allá de `offset`.
+        False si la subida terminó o falló sin datos nuevos, o si se agotó el tiempo.
+        """
+        deadline = time.monotonic() + timeout
+        with self._data_arrived:
+            while self.received <= offset and self.status == "uploading":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._data_arrived.wait(remaining)
+            return self.received > offset
+
+    def _notify(self):
+        with self._data_arrived:
+            self._data_arrived.notify_all()
+
+    def to_dict(self) -> Dict:
+        return {
+            "upload_id": self.upload_id,
+            "task_id": self.task_id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.received,
+            "sha256": self.sha256,
+            "early_start": self.early_start,
+            "force": self.force,
+            "camera_id": self.camera_id,
+            "options": self.options,
+            "status": self.status,
+            "processing_started": self.processing_started,
+            "duplicate_of": self.duplicate_of,
+            "created_at": self.created_at
+        }
+
+    def save(self):
+        tmp_path = f"{self.meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**self.to_dict(), "path": self.path}, f)
+        os.replace(tmp_path, self.meta_path)
+
+
+class UploadManager:
+    """
+    Subidas reanudables: el cliente crea la subida, envía bloques con su
+    offset (opcionalmente con el SHA-256 de cada bloque), consulta el offset
+    para reanudar tras un corte y la completa; el SHA-256 del archivo se
+    verifica antes de procesar. Toda la E/S de disco ocurre fuera del event loop.
+    """
+
+    META_DIRNAME = ".partial"
+
+    def __init__(self, upload_dir: str):
+        self.upload_dir = upload_dir
+        self.meta_dir = os.path.join(upload_dir, self.META_DIRNAME)
+        os.makedirs(self.meta_dir, exist_ok=True)
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+        self._load_sessions()
+
+    def _load_sessions(self):
+        """Recupera las subidas en curso de una ejecución anterior"""
+        for name in os.listdir(self.meta_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.meta_dir, name)) as f:
+                    meta = json.load(f)
+                session = UploadSession(
+                    meta["upload_id"], meta["filename"], meta["size"], meta["path"],
+                    os.path.join(self.meta_dir, name), meta.get("sha256"), meta.get("early_start", False),
+                    meta.get("force", False), meta.get("camera_id"),
+                    meta.get("options")
+                )
+                session.status = meta["status"]
+                session.processing_started = meta.get("processing_started", False)
+                session.duplicate_of = meta.get("duplicate_of")
+                session.created_at = meta["created_at"]
+                # Lo escrito en disco manda: un bloque a medio escribir se vuelve a pedir
+                session.received = min(os.path.getsize(session.path), session.size) if os.path.exists(session.path) else 0
+                session._hasher = None
+                self._sessions[session.upload_id] = session
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Metadatos de subida ilegibles ({name}): {e}")
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None,
+               early_start: bool = False, force: bool = False, camera_id: Optional[str] = None,
+               options: Optional[Dict] = None) -> UploadSession:
+        if size <= 0:
+            raise ValueError("size debe ser mayor que 0")
+        upload_id = str(uuid.uuid4())
+        filename = os.path.basename(filename) or "video"
+        session = UploadSession(
+            upload_id, filename, size,
+            os.path.join(self.upload_dir, f"{upload_id}_{filename}"),
+            os.path.join(self.meta_dir, f"{upload_id}.json"),
+            sha256, early_start, force, camera_id, options
+        )
+        open(session.path, "wb").close()
+        session.save()
+        with self._lock:
+            self._sessions[upload_id] = session
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        with self._lock:
+            return self._sessions.get(upload_id)
+
+    async def append(self, session: UploadSession, offset: int, body: AsyncIterator[bytes],
+                     chunk_sha256: Optional[str] = None) -> int:
+        """
+        Agrega un bloque que empieza en `offset`, leyendo el cuerpo en streaming.
+        Si el SHA-256 del bloque no coincide se descarta y se lanza ChecksumError.
+        Retorna el nuevo offset.
+        """
+        if not session._write_lock.acquire(blocking=False):
+            raise UploadOffsetError(session.received)  # Otro bloque de la misma subida en curso
+        try:
+            if session.status != "uploading":
+                raise ValueError(f"La subida está en estado '{session.status}'")
+            if offset != session.received:
+                raise UploadOffsetError(session.received)
+
+            chunk_hasher = hashlib.sha256()
+            hasher_before = session._hasher.copy() if session._hasher is not None else None
+            hashers = [chunk_hasher] + ([session._hasher] if session._hasher is not None else [])
+            written = 0
+            buffer = bytearray()
+            f = await run_in_threadpool(open, session.path, "r+b")
+            try:
+                await run_in_threadpool(f.seek, offset)
+                # El cuerpo llega en trozos pequeños: se agrupan en escrituras de ~1 MB
+                async for data in body:
+                    if offset + written + len(buffer) + len(data) > session.size:
+                        raise ValueError("El bloque excede el tamaño declarado del archivo")
+                    buffer += data
+                    if len(buffer) >= WRITE_BUFFER_BYTES:
+                        await run_in_threadpool(write_and_hash, f, bytes(buffer), *hashers)
+                        written += len(buffer)
+                        buffer.clear()
+                if buffer:
+                    await run_in_threadpool(write_and_hash, f, bytes(buffer), *hashers)
+                    written += len(buffer)
+
+                if chunk_sha256 and chunk_hasher.hexdigest() != chunk_sha256.lower():
+                    raise ChecksumError("El SHA-256 del bloque no coincide")
+                await run_in_threadpool(f.flush)
+            except BaseException:
+                # Descartar el bloque incompleto o inválido
+                await run_in_threadpool(f.truncate, offset)
+                session._hasher = hasher_before
+                raise
+            finally:
+                await run_in_threadpool(f.close)
+
+            session.received = offset + written
+            await run_in_threadpool(session.save)
+            session._notify()
+            return session.received
+        finally:
+            session._write_lock.release()
+
+    async def complete(self, session: UploadSession) -> UploadSession:
+        """
+        Cierra la subida verificando el tamaño y, si se declaró, el SHA-256 del archivo
+        """
+        if session.complete:
+            return session
+        if session.received != session.size:
+            raise UploadOffsetError(session.received)
+
+        digest = (session._hasher.hexdigest() if session._hasher is not None
+                  else await run_in_threadpool(file_sha256, session.path))
+        if session.sha256 and digest != session.sha256:
+            session.status = "failed"
+            await run_in_threadpool(session.save)
+            session._notify()
+            raise ChecksumError(f"SHA-256 del archivo no coincide (recibido {digest})")
+
+        session.sha256 = digest
+        session.status = "complete"
+        await run_in_threadpool(session.save)
+        session._notify()
+        return session
+
+    def mark_processing(self, session: UploadSession) -> bool:
+        """
+        Marca la subida como encolada para procesar. False si ya lo estaba: con
+        bloques y /complete concurrentes solo un llamador encola la tarea.
+        """
+        with self._lock:
+            if session.processing_started:
+                return False
+            session.processing_started = True
+        session.save()
+        return True
+
+    def mark_duplicate(self, session: UploadSession, task_id: str):
+        """El video ya fue procesado por `task_id`: se descarta la copia subida"""
+        session.duplicate_of = task_id
+        session.save()
+        try:
+            os.remove(session.path)
+        except OSError:
+            pass
+
+
+_upload_managers: Dict[str, UploadManager] = {}
+_upload_managers_lock = threading.Lock()
+
+
+def get_upload_manager(upload_dir: str) -> UploadManager:
+    """
+    Obtiene (o crea) el gestor de subidas asociado a un directorio
+    """
+    key = os.path.abspath(upload_dir)
+    with _upload_managers_lock:
+        if key not in _upload_managers:
+            _upload_managers[key] = UploadManager(upload_dir)
+        return _upload_managers[key]
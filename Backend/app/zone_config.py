@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Backend.app.zone_geometry import CompiledZones, default_zone_polygons
+
+# Límites de una configuración (el raster compilado no depende del número de zonas)
+MAX_ZONES = 1024
+MAX_LINES = 256
+
+
+def normalize_zone_config(raw: Dict) -> Dict:
+    """
+    Valida y normaliza la configuración de zonas de una cámara:
+    {"zones": [{"name", "polygon": [[x, y], ...]}], "lines": [{"name", "start": [x, y], "end": [x, y]}],
+     "reference_size": [ancho, alto] | None, "min_frames_in": int | None, "min_frames_out": int | None}
+    Coordenadas en píxeles de `reference_size` (si se indica, se escalan a la
+    resolución de cada video). min_frames_in/min_frames_out son los umbrales
+    de histéresis de la cámara (None = los del procesamiento). ValueError si
+    no es válida.
+    """
+    zones = raw.get("zones") or []
+    lines = raw.get("lines") or []
+    if not zones and not lines:
+        raise ValueError("La configuración debe tener al menos una zona o una línea")
+    if len(zones) > MAX_ZONES or len(lines) > MAX_LINES:
+        raise ValueError(f"Como máximo {MAX_ZONES} zonas y {MAX_LINES} líneas")
+
+    reference_size = raw.get("reference_size")
+    if reference_size is not None:
+        if len(reference_size) != 2 or min(reference_size) <= 0:
+            raise ValueError("reference_size debe ser [ancho, alto] positivos")
+        reference_size = [int(reference_size[0]), int(reference_size[1])]
+
+    normalized_zones = []
+    for i, zone in enumerate(zones):
+        polygon = np.asarray(zone.get("polygon"), dtype=np.float64)
+        if polygon.ndim != 2 or polygon.shape[1] != 2 or len(polygon) < 3:
+            raise ValueError(f"La zona {i} debe ser un polígono de al menos 3 puntos [x, y]")
+        if (polygon < 0).any() or not np.isfinite(polygon).all():
+            raise ValueError(f"La zona {i} tiene coordenadas negativas o no numéricas")
+        normalized_zones.append({"name": zone.get("name") or f"Zona {i}", "polygon": polygon.tolist()})
+
+    normalized_lines = []
+    for i, line in enumerate(lines):
+        points = np.asarray([line.get("start"), line.get("end")], dtype=np.float64)
+        if points.shape != (2, 2) or not np.isfinite(points).all():
+            raise ValueError(f"La línea {i} debe tener start y end [x, y]")
+        if (points[0] == points[1]).all():
+            raise ValueError(f"La línea {i} tiene start y end iguales")
+        normalized_lines.append({"name": line.get("name") or f"Línea {i}",
+                                 "start": points[0].tolist(), "end": points[1].tolist()})
+
+    hysteresis = {}
+    for key in ("min_frames_in", "min_frames_out"):
+        value = raw.get(key)
+        if value is not None and (int(value) != value or value < 1):
+            raise ValueError(f"{key} debe ser un entero mayor o igual que 1")
+        hysteresis[key] = int(value) if value is not None else None
+
+    return {"zones": normalized_zones, "lines": normalized_lines, "reference_size": reference_size, **hysteresis}
+
+
+def polygons_zone_config(polygons: List[List[List[float]]]) -> Dict:
+    """Configuración con solo polígonos (formato abreviado de la API de reevaluación)"""
+    return normalize_zone_config({"zones": [{"polygon": polygon} for polygon in polygons]})
+
+
+def default_zone_config(width: int, height: int) -> Dict:
+    """Los cuatro cuadrantes del frame (zonas por defecto sin cámara configurada)"""
+    return {
+        "zones": [{"name": f"Zona {i}", "polygon": polygon.tolist()}
+                  for i, polygon in enumerate(default_zone_polygons(width, height))],
+        "lines": [],
+        "reference_size": None
+    }
+
+
+def scale_points(points, config: Dict, width: int, height: int) -> np.ndarray:
+    """Coordenadas de la configuración en píxeles del video"""
+    points = np.asarray(points, dtype=np.float64)
+    if config.get("reference_size"):
+        ref_width, ref_height = config["reference_size"]
+        points = points * [width / ref_width, height / ref_height]
+    return points
+
+
+def compile_zone_config(config: Optional[Dict], width: int, height: int) -> CompiledZones:
+    """Compila las zonas de la configuración (cuadrantes si no hay) para la resolución del video"""
+    config = config or default_zone_config(width, height)
+    polygons = [np.round(scale_points(zone["polygon"], config, width, height)).astype(np.int32)
+                for zone in config["zones"]]
+    return CompiledZones(polygons, width, height)
+
+
+def line_segments(config: Optional[Dict], width: int, height: int) -> np.ndarray:
+    """Líneas de conteo de la configuración (líneas x [start, end] x [x, y]) en píxeles del video"""
+    lines = (config or {}).get("lines") or []
+    if not lines:
+        return np.empty((0, 2, 2), dtype=np.float64)
+    points = [[line["start"], line["end"]] for line in lines]
+    return scale_points(points, config, width, height).reshape(-1, 2, 2)
+
+
+class ZoneConfigStore:
+    """
+    Configuración persistente (SQLite) de zonas y líneas de conteo por cámara.
+    Cada video se procesa con la configuración de su cámara en el momento de
+    encolarlo (queda registrada en su log de tracks).
+    """
+
+    DB_DIRNAME = ".index"
+    DB_FILENAME = "zone_config_v1.sqlite3"
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.db_path = os.path.join(output_dir, self.DB_DIRNAME, self.DB_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Conexión de corta duración: commit al salir sin error y cierre siempre"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS camera_zones (
+                    camera_id TEXT PRIMARY KEY,
+                    config TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def put(self, camera_id: str, config: Dict) -> Dict:
+        """Valida y guarda (reemplaza) la configuración de una cámara"""
+        config = normalize_zone_config(config)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO camera_zones (camera_id, config, updated_at) VALUES (?, ?, ?)",
+                (camera_id, json.dumps(config), time.time())
+            )
+        return config
+
+    def get(self, camera_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT config FROM camera_zones WHERE camera_id = ?", (camera_id,)).fetchone()
+        return json.loads(row["config"]) if row is not None else None
+
+    def delete(self, camera_id: str) -> bool:
+        with self._lock, self._connect() as conn:
+            return conn.execute("DELETE FROM camera_zones WHERE camera_id = ?", (camera_id,)).rowcount > 0
+
+    def list(self) -> List[Dict]:
+        """Cámaras configuradas con su número de zonas y líneas"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT camera_id, config, updated_at FROM camera_zones ORDER BY camera_id").fetchall()
+        cameras = []
+        for row in rows:
+            config = json.loads(row["config"])
+            cameras.append({"camera_id": row["camera_id"], "zones": len(config["zones"]),
+                            "lines": len(config["lines"]), "updated_at": row["updated_at"]})
+        return cameras
+
+
+_zone_config_stores: Dict[str, ZoneConfigStore] = {}
+_zone_config_stores_lock = threading.Lock()
+
+
+def get_zone_config_store(output_dir: str) -> ZoneConfigStore:
+    """
+    Obtiene (o crea) el almacén de configuraciones de zonas de un directorio de salida
+    """
+    key = os.path.abspath(output_dir)
+    with _zone_config_stores_lock:
+        if key not in _zone_config_stores:
+            _zone_config_stores[key] = ZoneConfigStore(output_dir)
+        return _zone_config_stores[key]
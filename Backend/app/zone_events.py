@@ -0,0 +1,240 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Backend.app.events_io import NO_LINE, NO_ZONE
+from Backend.app.zone_geometry import CompiledZones, anchor_points
+
+
+def zone_event(timestamp: float, frame: int, zone_id: int, tracker_id: int, event: str,
+               demo_attrs: Dict, line_id: int = NO_LINE) -> Dict:
+    """Fila de la tabla de eventos con los atributos demográficos conocidos del track"""
+    return {
+        'timestamp_seconds': timestamp,
+        'frame': frame,
+        'zone_id': zone_id,
+        'line_id': line_id,
+        'person_tracker_id': tracker_id,
+        'event': event,
+        'gender': demo_attrs.get('gender', 'Desconocido'),
+        'gender_confidence': demo_attrs.get('gender_confidence', 0.0),
+        'age': demo_attrs.get('age', 'Desconocido'),
+        'age_confidence': demo_attrs.get('age_confidence', 0.0)
+    }
+
+
+class ZoneEventTracker:
+    """
+    Entradas y salidas de personas por zona a partir de los tracks de cada
+    frame. Lo usan el pipeline (detecciones de YOLO) y la reevaluación desde
+    el log de tracks, así ambos producen exactamente los mismos eventos.
+
+    La ocupación se guarda como un arreglo ordenado de claves
+    track_id * n_zonas + zona: entradas y salidas de todas las zonas salen de
+    dos búsquedas vectorizadas por frame y solo los eventos se recorren en Python.
+
+    Histéresis: una entrada se confirma cuando la persona lleva
+    `min_frames_in` frames seguidos en la zona y una salida cuando lleva
+    `min_frames_out` frames seguidos fuera; así un track que oscila sobre el
+    borde de una zona no genera ráfagas de entradas y salidas. Los eventos se
+    emiten al confirmarse pero con el frame y timestamp del inicio de la racha
+    (el primer frame dentro o fuera), así los tiempos de permanencia y las
+    series temporales no quedan desplazados por los umbrales; por eso llegan
+    hasta `min_frames_* - 1` frames tarde y quien los guarda los ordena por
+    timestamp. Con 1 y 1 cada cambio de pertenencia es un evento.
+
+    Solo se llama con frames que tienen tracks: un frame sin ids no cambia el
+    estado de las zonas (no genera salidas ni cuenta para la histéresis).
+    """
+
+    def __init__(self, geometry: CompiledZones, min_frames_in: int = 1, min_frames_out: int = 1):
+        self.geometry = geometry
+        self.n_zones = geometry.n_zones
+        self.min_frames_in = int(min_frames_in)
+        self.min_frames_out = int(min_frames_out)
+        self.total_counts = np.zeros(self.n_zones, dtype=np.int64)
+        # Claves (track, zona) de las personas actualmente en cada zona y de las que alguna vez entraron
+        self._current_keys = np.empty(0, dtype=np.int64)
+        self._entered_keys = set()
+        # Rachas pendientes de confirmar: claves dentro sin entrada confirmada y
+        # claves confirmadas ausentes sin salida confirmada (ordenadas), con su
+        # longitud y el frame y timestamp en que empezaron
+        self._pending = self._empty_streaks()
+        self._absent = self._empty_streaks()
+        # Pertenencia sin histéresis del frame anterior y conteos para el reporte
+        self._raw_keys = np.empty(0, dtype=np.int64)
+        self.raw_events = 0
+        self.events = 0
+
+    @staticmethod
+    def _empty_streaks() -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Rachas (claves, longitudes, frames de inicio, timestamps de inicio) vacías"""
+        return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+    @staticmethod
+    def _streaks(keys: np.ndarray, previous: Tuple, frame: int,
+                 timestamp: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Racha de cada clave: la anterior (si seguía pendiente) más este frame,
+        con su inicio (el de la anterior o este frame)
+        """
+        previous_keys, previous_streaks, previous_frames, previous_times = previous
+        streaks = np.ones(len(keys), dtype=np.int64)
+        frames = np.full(len(keys), frame, dtype=np.int64)
+        times = np.full(len(keys), timestamp, dtype=np.float64)
+        if len(previous_keys) and len(keys):
+            position = np.searchsorted(previous_keys, keys).clip(max=len(previous_keys) - 1)
+            found = previous_keys[position] == keys
+            streaks[found] += previous_streaks[position[found]]
+            frames[found] = previous_frames[position[found]]
+            times[found] = previous_times[position[found]]
+        return streaks, frames, times
+
+    def update(self, frame: int, timestamp: float, xyxy: np.ndarray, tracker_ids: np.ndarray,
+               demographic_cache: Dict) -> List[Dict]:
+        """Actualiza la ocupación con los tracks del frame y retorna sus eventos"""
+        events = []
+        n_zones = self.n_zones
+        # Pares (zona, detección) en orden de zona y luego de detección
+        zone_idx, det_idx = self.geometry.pairs(xyxy)
+        ids = tracker_ids[det_idx]
+        keys = ids.astype(np.int64) * n_zones + zone_idx
+        present_keys = np.unique(keys)
+        self.raw_events += int((~np.isin(present_keys, self._raw_keys)).sum()
+                               + (~np.isin(self._raw_keys, present_keys)).sum())
+        self._raw_keys = present_keys
+
+        # ENTRADA: la persona no estaba confirmada en la zona y completa min_frames_in frames dentro
+        outside = ~np.isin(keys, self._current_keys)
+        streaks, start_frames, start_times = self._streaks(keys, self._pending, frame, timestamp)
+        entered = outside & (streaks >= self.min_frames_in)
+        waiting = np.flatnonzero(outside & ~entered)
+        waiting = waiting[np.argsort(keys[waiting], kind='stable')]
+        self._pending = (keys[waiting], streaks[waiting], start_frames[waiting], start_times[waiting])
+        for k in np.flatnonzero(entered).tolist():
+            zone_id, tracker_id, key = int(zone_idx[k]), ids[k], int(keys[k])
+            if key not in self._entered_keys:
+                self._entered_keys.add(key)
+                self.total_counts[zone_id] += 1
+            events.append(zone_event(float(start_times[k]), int(start_frames[k]), zone_id, tracker_id, 'entry',
+                                     demographic_cache.get(tracker_id, {})))
+
+        # SALIDAS: personas confirmadas que completan min_frames_out frames fuera (por zona y track)
+        absent = self._current_keys[~np.isin(self._current_keys, present_keys)]
+        absent_streaks, absent_frames, absent_times = self._streaks(absent, self._absent, frame, timestamp)
+        left = absent_streaks >= self.min_frames_out
+        self._absent = (absent[~left], absent_streaks[~left], absent_frames[~left], absent_times[~left])
+        order = np.lexsort((absent[left] // n_zones, absent[left] % n_zones))
+        exited = absent[left][order]
+        for key, exit_frame, exit_time in zip(exited.tolist(), absent_frames[left][order].tolist(),
+                                              absent_times[left][order].tolist()):
+            tracker_id = key // n_zones
+            events.append(zone_event(exit_time, exit_frame, key % n_zones, tracker_id, 'exit',
+                                     demographic_cache.get(tracker_id, {})))
+
+        self._current_keys = np.union1d(self._current_keys[~np.isin(self._current_keys, exited)], keys[entered])
+        self.events += len(events)
+        return events
+
+    def occupancy(self) -> Dict[int, int]:
+        counts = np.bincount(self._current_keys % self.n_zones, minlength=self.n_zones) if self.n_zones else []
+        return {i: int(count) for i, count in enumerate(counts)}
+
+    def event_stats(self, duration_seconds: float) -> Dict:
+        """
+        Eventos de zona emitidos frente a los que habría sin histéresis, en
+        total y por hora de video
+        """
+        hours = duration_seconds / 3600 if duration_seconds > 0 else None
+        return {
+            "min_frames_in": self.min_frames_in,
+            "min_frames_out": self.min_frames_out,
+            "events": self.events,
+            "raw_events": self.raw_events,
+            "suppressed_events": self.raw_events - self.events,
+            "events_per_hour": round(self.events / hours, 1) if hours else None,
+            "raw_events_per_hour": round(self.raw_events / hours, 1) if hours else None,
+            "reduction_percent": round((1 - self.events / self.raw_events) * 100, 2) if self.raw_events else 0.0
+        }
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Producto cruz 2D (componente z) sobre el último eje"""
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+class LineCrossingCounter:
+    """
+    Conteo direccional de cruces de líneas (puertas, pasillos) a partir de
+    los tracks de cada frame, junto a las zonas de ZoneEventTracker.
+
+    El último punto de apoyo de cada track se guarda en un arreglo indexado
+    por track id; en cada frame el desplazamiento de todos los tracks se
+    interseca con todas las líneas en una sola operación vectorizada
+    (matrices tracks x líneas de productos cruz). Un cruce cuenta como
+    'line_in' si el track pasa al lado derecho de la línea recorrida de
+    start a end (en coordenadas de imagen, con y hacia abajo) y 'line_out'
+    si pasa al izquierdo. Un track que desaparece conserva su último punto.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, segments: np.ndarray, width: int, height: int):
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+        self.starts = segments[:, 0]
+        self.ends = segments[:, 1]
+        self.n_lines = len(segments)
+        self.width = int(width)
+        self.height = int(height)
+        # Cruces por línea: columna 0 = line_in, 1 = line_out
+        self.counts = np.zeros((self.n_lines, 2), dtype=np.int64)
+        self._previous = np.zeros((self.INITIAL_CAPACITY, 2), dtype=np.float64)
+        self._has_previous = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+
+    def _reserve(self, size: int):
+        if size <= len(self._has_previous):
+            return
+        capacity = max(size, 2 * len(self._has_previous))
+        previous = np.zeros((capacity, 2), dtype=np.float64)
+        previous[:len(self._previous)] = self._previous
+        has_previous = np.zeros(capacity, dtype=bool)
+        has_previous[:len(self._has_previous)] = self._has_previous
+        self._previous, self._has_previous = previous, has_previous
+
+    def update(self, frame: int, timestamp: float, xyxy: np.ndarray, tracker_ids: np.ndarray,
+               demographic_cache: Dict) -> List[Dict]:
+        """Actualiza la posición de los tracks del frame y retorna sus cruces"""
+        ids = np.asarray(tracker_ids, dtype=np.int64)
+        if not len(ids):
+            return []
+        anchors = anchor_points(xyxy, self.width, self.height)
+        self._reserve(int(ids.max()) + 1)
+
+        events = []
+        moved = self._has_previous[ids]
+        if self.n_lines and moved.any():
+            p = self._previous[ids[moved]][:, None]   # (tracks, 1, 2)
+            q = anchors[moved][:, None]
+            direction = self.ends - self.starts       # (líneas, 2)
+            # Lado de los extremos del desplazamiento respecto de cada línea, y de
+            # los extremos de cada línea respecto del desplazamiento (tracks x líneas)
+            side_p = _cross(direction, p - self.starts)
+            side_q = _cross(direction, q - self.starts)
+            step = q - p
+            side_start = _cross(step, self.starts - p)
+            side_end = _cross(step, self.ends - p)
+            crossed = ((side_p > 0) != (side_q > 0)) & (side_start * side_end <= 0)
+
+            # Cruces en orden de línea y luego de detección
+            line_idx, track_idx = np.nonzero(crossed.T)
+            inbound = side_q[track_idx, line_idx] > 0
+            np.add.at(self.counts, (line_idx, np.where(inbound, 0, 1)), 1)
+            moved_ids = ids[moved]
+            for line_id, tracker_id, is_in in zip(line_idx.tolist(), moved_ids[track_idx].tolist(), inbound.tolist()):
+                events.append(zone_event(timestamp, frame, NO_ZONE, tracker_id, 'line_in' if is_in else 'line_out',
+                                         demographic_cache.get(tracker_id, {}), line_id=line_id))
+
+        self._previous[ids] = anchors
+        self._has_previous[ids] = True
+        return events
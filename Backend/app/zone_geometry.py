@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+def default_zone_polygons(width: int, height: int) -> List[np.ndarray]:
+    """Zonas por defecto: los cuatro cuadrantes del frame"""
+    return [
+        np.array([[0, 0], [width // 2, 0], [width // 2, height // 2], [0, height // 2]], np.int32),
+        np.array([[width // 2, 0], [width, 0], [width, height // 2], [width // 2, height // 2]], np.int32),
+        np.array([[0, height // 2], [width // 2, height // 2], [width // 2, height], [0, height]], np.int32),
+        np.array([[width // 2, height // 2], [width, height // 2], [width, height], [width // 2, height]], np.int32)
+    ]
+
+
+def anchor_points(xyxy: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Punto de apoyo (centro inferior) de cada caja recortada al frame, en coordenadas reales (N x 2)"""
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    x = (np.clip(xyxy[:, 0], 0, width) + np.clip(xyxy[:, 2], 0, width)) / 2
+    y = np.clip(xyxy[:, 3], 0, height)
+    return np.stack([x, y], axis=1)
+
+
+def bottom_center_anchors(xyxy: np.ndarray, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Punto de apoyo (centro inferior) de cada caja, con la caja recortada al
+    frame y redondeado hacia arriba a píxeles enteros (como sv.PolygonZone)
+    """
+    anchors = np.ceil(anchor_points(xyxy, width, height)).astype(np.intp)
+    return anchors[:, 0], anchors[:, 1]
+
+
+def roi_bounds(polygons: Sequence[np.ndarray], segments: np.ndarray, width: int, height: int,
+               padding: float) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Rectángulo (x0, y0, x1, y1) que cubre todas las zonas y líneas con un
+    margen de `padding` (fracción del ancho y alto del frame), recortado al
+    frame. None si no hay zonas ni líneas o si el rectángulo es el frame entero
+    """
+    points = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polygons]
+    points.append(np.asarray(segments, dtype=np.float64).reshape(-1, 2))
+    points = np.concatenate(points)
+    if not len(points):
+        return None
+    margin = np.array([padding * width, padding * height])
+    x0, y0 = np.clip(np.floor(points.min(axis=0) - margin), 0, [width, height]).astype(int)
+    x1, y1 = np.clip(np.ceil(points.max(axis=0) + margin), 0, [width, height]).astype(int)
+    if x1 <= x0 or y1 <= y0 or (x0, y0, x1, y1) == (0, 0, width, height):
+        return None
+    return int(x0), int(y0), int(x1), int(y1)
+
+
+def roi_to_frame(xyxy: np.ndarray, roi_box: Tuple[int, int, int, int]) -> np.ndarray:
+    """Cajas detectadas en el recorte del ROI a coordenadas del frame completo"""
+    x0, y0 = roi_box[:2]
+    return xyxy + np.array([x0, y0, x0, y0], dtype=xyxy.dtype)
+
+
+class CompiledZones:
+    """
+    Geometría de zonas compilada una vez por resolución en un raster de
+    etiquetas: cada píxel guarda el id de la combinación de zonas que lo
+    cubren (las zonas pueden solaparse) y una tabla dispersa combinación ->
+    zonas (CSR) da la pertenencia. La consulta para todas las detecciones de
+    un frame es una indexación del raster más una de la tabla, independiente
+    del número de zonas, así escala a cientos de zonas.
+
+    Los polígonos se rasterizan con cv2.fillPoly (bordes incluidos), igual
+    que sv.PolygonZone, y se evalúa el centro inferior de cada caja.
+    """
+
+    def __init__(self, polygons: Sequence[np.ndarray], width: int, height: int):
+        self.polygons = [np.asarray(p, dtype=np.int32).reshape(-1, 2) for p in polygons]
+        self.n_zones = len(self.polygons)
+        self.width = int(width)
+        self.height = int(height)
+
+        extent_x = max([self.width] + [int(p[:, 0].max()) for p in self.polygons])
+        extent_y = max([self.height] + [int(p[:, 1].max()) for p in self.polygons])
+        labels = np.zeros((extent_y + 2, extent_x + 2), dtype=np.int32)
+
+        # Combinaciones de zonas (tuplas ordenadas) -> id; 0 = ninguna zona
+        combo_ids: Dict[Tuple[int, ...], int] = {(): 0}
+        combos: List[Tuple[int, ...]] = [()]
+        for zone_id, polygon in enumerate(self.polygons):
+            x0, y0 = polygon.min(axis=0)
+            x1, y1 = polygon.max(axis=0)
+            mask = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=np.uint8)
+            cv2.fillPoly(mask, [polygon - [x0, y0]], color=1)
+            inside = mask.astype(bool)
+            region = labels[y0:y1 + 1, x0:x1 + 1]
+
+            # Solo se reetiqueta el rectángulo de la zona: cada combinación
+            # presente bajo el polígono pasa a la misma combinación más esta zona
+            previous, inverse = np.unique(region[inside], return_inverse=True)
+            updated = np.empty_like(previous)
+            for k, combo_id in enumerate(previous.tolist()):
+                combo = combos[combo_id] + (zone_id,)
+                if combo not in combo_ids:
+                    combo_ids[combo] = len(combos)
+                    combos.append(combo)
+                updated[k] = combo_ids[combo]
+            region[inside] = updated[inverse]
+
+        self.labels = labels.astype(np.uint16) if len(combos) <= np.iinfo(np.uint16).max else labels
+        self.combo_offsets = np.zeros(len(combos) + 1, dtype=np.int64)
+        self.combo_offsets[1:] = np.cumsum([len(combo) for combo in combos])
+        self.combo_zones = np.fromiter((z for combo in combos for z in combo), dtype=np.int64,
+                                       count=int(self.combo_offsets[-1]))
+
+    @property
+    def n_combinations(self) -> int:
+        return len(self.combo_offsets) - 1
+
+    def pairs(self, xyxy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pares (zona, detección) con el centro inferior de la caja dentro de la
+        zona, ordenados por zona y luego por detección
+        """
+        x, y = bottom_center_anchors(xyxy, self.width, self.height)
+        combos = self.labels[y, x].astype(np.int64)
+        starts = self.combo_offsets[combos]
+        lengths = self.combo_offsets[combos + 1] - starts
+        total = int(lengths.sum())
+        det_idx = np.repeat(np.arange(len(combos)), lengths)
+        # Posición de cada par dentro de la tabla: inicio de su combinación + índice dentro de ella
+        within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        zone_idx = self.combo_zones[np.repeat(starts, lengths) + within]
+        order = np.lexsort((det_idx, zone_idx))
+        return zone_idx[order], det_idx[order]
+
+    def membership(self, xyxy: np.ndarray) -> np.ndarray:
+        """Matriz (detecciones x zonas) de pertenencia del centro inferior de cada caja"""
+        zone_idx, det_idx = self.pairs(xyxy)
+        inside = np.zeros((len(np.asarray(xyxy).reshape(-1, 4)), self.n_zones), dtype=bool)
+        inside[det_idx, zone_idx] = True
+        return inside
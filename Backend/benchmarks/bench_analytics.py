@@ -0,0 +1,103 @@
+"""
+Benchmarks del motor de analytics sobre tablas de eventos sintéticas
+
+Genera eventos entry/exit con el mismo esquema que el CSV del pipeline y mide
+cada etapa de AnalyticsProcessor para distintos tamaños de tabla.
+
+Uso (desde la raíz del repositorio):
+    python -m Backend.benchmarks.bench_analytics --rows 10000 100000 1000000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.events_io import apply_event_dtypes
+
+
+def make_events(n_rows: int, n_persons: int = None, n_zones: int = 4,
+                duration_seconds: float = 3600.0, fps: float = 30.0, seed: int = 0) -> pd.DataFrame:
+    """
+    Genera una tabla de eventos sintética: cada visita produce un par entry/exit
+    de la misma persona en la misma zona.
+    """
+    rng = np.random.default_rng(seed)
+    n_visits = max(n_rows // 2, 1)
+    n_persons = n_persons or max(n_visits // 20, 1)
+
+    person = rng.integers(1, n_persons + 1, n_visits)
+    zone = rng.integers(0, n_zones, n_visits)
+    entry_frame = rng.integers(1, int(duration_seconds * fps), n_visits)
+    exit_frame = entry_frame + rng.exponential(20 * fps, n_visits).astype(np.int64) + 1
+
+    genders = np.array(['M', 'F', 'Desconocido'])[rng.integers(0, 3, n_persons + 1)]
+    ages = np.array(['0-18', '19-35', '36-60', '60+', 'Desconocido'])[rng.integers(0, 5, n_persons + 1)]
+
+    frames = np.concatenate([entry_frame, exit_frame])
+    persons = np.concatenate([person, person])
+    df = pd.DataFrame({
+        'timestamp_seconds': frames / fps,
+        'frame': frames,
+        'zone_id': np.concatenate([zone, zone]),
+        'person_tracker_id': persons,
+        'event': np.repeat(['entry', 'exit'], n_visits),
+        'gender': genders[persons],
+        'gender_confidence': rng.random(2 * n_visits).round(3),
+        'age': ages[persons],
+        'age_confidence': rng.random(2 * n_visits).round(3),
+    })
+    return apply_event_dtypes(df.sort_values('frame', kind='mergesort').reset_index(drop=True))
+
+
+def _time(fn, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(rows, repeat: int = 3, stages=None):
+    processor = AnalyticsProcessor()
+    stages = stages or {
+        'flow': processor._analyze_flow_patterns,
+        'dwell': processor._analyze_dwell_times,
+        'temporal': processor._analyze_temporal_patterns,
+        'zones': processor._analyze_zones,
+    }
+
+    results = []
+    for n_rows in rows:
+        df = make_events(n_rows)
+        for name, fn in stages.items():
+            elapsed = _time(lambda: fn(df), repeat)
+            results.append({
+                'stage': name,
+                'rows': len(df),
+                'seconds': round(elapsed, 4),
+                'rows_per_second': round(len(df) / elapsed) if elapsed > 0 else None
+            })
+            print(f"{name:>12} | {len(df):>9} filas | {elapsed * 1000:9.1f} ms")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de AnalyticsProcessor")
+    parser.add_argument("--rows", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Ruta del reporte JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, repeat=args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
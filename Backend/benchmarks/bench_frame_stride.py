@@ -0,0 +1,74 @@
+"""
+Benchmark de frame_stride: velocidad frente a error de conteo
+
+Procesa cada video con el pipeline completo (requiere ultralytics y el
+modelo YOLO) con frame_stride 1 como referencia y con cada stride pedido, y
+reporta tiempo, throughput, aceleración y el error relativo de los conteos
+(entradas y salidas por zona, cruces de línea, personas únicas) respecto de
+la referencia. La compuerta de movimiento se desactiva salvo --motion-gate,
+para medir solo el efecto del stride.
+
+Uso (desde la raíz del repositorio):
+    python -m Backend.benchmarks.bench_frame_stride videos/tienda.mp4 --strides 2 3 5 10
+    python -m Backend.benchmarks.bench_frame_stride videos/*.mp4 --output stride.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from Backend.benchmarks.bench_motion_gate import relative_error, run_pipeline
+
+COUNT_KEYS = ("entries", "exits", "line_in", "line_out", "unique_persons")
+
+
+def run(videos, strides, motion_gate: bool = False):
+    results = []
+    for video_path in videos:
+        with tempfile.TemporaryDirectory() as output_dir:
+            reference = run_pipeline(video_path, output_dir, "stride_1", frame_stride=1, motion_gate=motion_gate)
+            print(f"{os.path.basename(video_path)} | stride  1 | {reference['seconds']:8.2f}s | "
+                  f"{reference['fps']} fps | conteos {reference['counts']}")
+            rows = []
+            for stride in strides:
+                result = run_pipeline(video_path, output_dir, f"stride_{stride}", frame_stride=stride,
+                                      motion_gate=motion_gate)
+                row = {
+                    "stride": stride,
+                    "seconds": result["seconds"],
+                    "fps": result["fps"],
+                    "speedup": round(reference["seconds"] / result["seconds"], 2) if result["seconds"] else None,
+                    "counts": result["counts"],
+                    "count_error": {key: relative_error(result["counts"][key], reference["counts"][key])
+                                    for key in COUNT_KEYS}
+                }
+                rows.append(row)
+                print(f"{os.path.basename(video_path)} | stride {stride:>2} | {row['seconds']:8.2f}s | "
+                      f"x{row['speedup']} | error de conteo {row['count_error']}")
+        results.append({
+            "video": video_path,
+            "reference": {key: reference[key] for key in ("seconds", "fps", "counts")},
+            "strides": rows
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de frame_stride (velocidad frente a error de conteo)")
+    parser.add_argument("videos", nargs="+", help="Videos de muestra")
+    parser.add_argument("--strides", nargs="+", type=int, default=[2, 3, 5, 10])
+    parser.add_argument("--motion-gate", action="store_true", help="Procesar también con la compuerta de movimiento")
+    parser.add_argument("--output", default=None, help="Ruta del reporte JSON")
+    args = parser.parse_args(argv)
+
+    if any(stride < 1 for stride in args.strides):
+        parser.error("los strides deben ser mayores o iguales que 1")
+    results = run(args.videos, [stride for stride in args.strides if stride != 1], motion_gate=args.motion_gate)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark de la compuerta de movimiento sobre videos de muestra
+
+Mide por video el coste de MotionGate por frame y la fracción de frames en
+que se saltaría la detección. Con --compare-counts procesa además cada video
+con el pipeline completo con y sin compuerta (requiere ultralytics y el
+modelo YOLO) y reporta tiempo, throughput y la diferencia en los conteos
+(entradas por zona, cruces de línea, personas únicas).
+
+Uso (desde la raíz del repositorio):
+    python -m Backend.benchmarks.bench_motion_gate videos/tienda.mp4 --max-frames 3000
+    python -m Backend.benchmarks.bench_motion_gate videos/tienda.mp4 --compare-counts
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict
+
+import cv2
+
+from Backend.app.events_io import find_events_file, read_events, split_events
+from Backend.app.motion_gate import MotionGate
+
+
+def gate_stats(video_path: str, params: Dict, max_frames: int = None) -> Dict:
+    """Fracción de frames saltados y coste de la compuerta (sin detector)"""
+    gate = MotionGate(params["motion_min_changed_fraction"], params["motion_max_skip_frames"],
+                      params["motion_hold_frames"])
+    cap = cv2.VideoCapture(video_path)
+    gate_seconds = 0.0
+    while max_frames is None or gate.frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        start = time.perf_counter()
+        gate.should_detect(frame)
+        gate_seconds += time.perf_counter() - start
+    cap.release()
+    return {**gate.report(), "gate_ms_per_frame": round(gate_seconds / max(gate.frames, 1) * 1000, 3)}
+
+
+def event_counts(path: str) -> Dict:
+    """Conteos comparables de un archivo de eventos"""
+    zone_df, line_df = split_events(read_events(path))
+    entries = zone_df[zone_df['event'] == 'entry']
+    return {
+        "entries": len(entries),
+        "entries_by_zone": {int(zone): int(count) for zone, count in entries.groupby('zone_id', observed=True).size().items()},
+        "exits": int((zone_df['event'] == 'exit').sum()),
+        "line_in": int((line_df['event'] == 'line_in').sum()),
+        "line_out": int((line_df['event'] == 'line_out').sum()),
+        "unique_persons": int(zone_df['person_tracker_id'].nunique())
+    }
+
+
+def relative_error(value: int, reference: int) -> float:
+    return round(abs(value - reference) / reference, 4) if reference else float(value != 0)
+
+
+def run_pipeline(video_path: str, output_dir: str, task_id: str, **options) -> Dict:
+    """Procesa el video con el pipeline completo (sin PAR) y retorna tiempos y conteos"""
+    from Backend.app.events_io import events_path
+    from Backend.app.processing import process_video_task, task_status
+
+    start = time.perf_counter()
+    process_video_task(task_id, video_path, os.path.join(output_dir, f"{task_id}_processed.mp4"),
+                       events_path(output_dir, task_id), enable_par=False, **options)
+    seconds = time.perf_counter() - start
+    status = task_status[task_id]
+    if status.get("status") != "completed":
+        raise RuntimeError(f"{task_id}: {status.get('error')}")
+    return {
+        "seconds": round(seconds, 2),
+        "fps": round(status.get("total_frames", 0) / seconds, 2) if seconds > 0 else None,
+        "stages": status.get("stages"),
+        "counts": event_counts(find_events_file(output_dir, task_id))
+    }
+
+
+def run(videos, max_frames: int = None, compare_counts: bool = False):
+    from Backend.app.processing import PROCESSING_PARAMS
+
+    results = []
+    for video_path in videos:
+        row = {"video": video_path, "gate": gate_stats(video_path, PROCESSING_PARAMS, max_frames)}
+        print(f"{os.path.basename(video_path)} | saltados {row['gate']['skipped_fraction']:.1%} de "
+              f"{row['gate']['frames']} frames | compuerta {row['gate']['gate_ms_per_frame']:.2f} ms/frame")
+
+        if compare_counts:
+            with tempfile.TemporaryDirectory() as output_dir:
+                full = run_pipeline(video_path, output_dir, "full", motion_gate=False)
+                gated = run_pipeline(video_path, output_dir, "gated", motion_gate=True)
+            row["full"] = {key: full[key] for key in ("seconds", "fps", "counts")}
+            row["gated"] = {key: gated[key] for key in ("seconds", "fps", "counts")}
+            row["speedup"] = round(full["seconds"] / gated["seconds"], 2) if gated["seconds"] else None
+            row["count_error"] = {
+                key: relative_error(gated["counts"][key], full["counts"][key])
+                for key in ("entries", "exits", "line_in", "line_out", "unique_persons")
+            }
+            print(f"    completo {full['seconds']}s | con compuerta {gated['seconds']}s (x{row['speedup']}) | "
+                  f"error de conteo {row['count_error']}")
+        results.append(row)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la compuerta de movimiento")
+    parser.add_argument("videos", nargs="+", help="Videos de muestra")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--compare-counts", action="store_true",
+                        help="Procesar con y sin compuerta y comparar conteos (requiere el modelo YOLO)")
+    parser.add_argument("--output", default=None, help="Ruta del reporte JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.videos, max_frames=args.max_frames, compare_counts=args.compare_counts)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
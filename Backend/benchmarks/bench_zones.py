@@ -0,0 +1,113 @@
+"""
+Micro-benchmark de la geometría de zonas compilada
+
+Mide la pertenencia de detecciones a zonas con CompiledZones (raster de
+etiquetas, una consulta vectorizada por frame; pares zona-detección como los
+usa ZoneEventTracker) frente a un sv.PolygonZone por
+zona (si supervision está instalado), para muchas zonas y muchas personas.
+
+Uso (desde la raíz del repositorio):
+    python -m Backend.benchmarks.bench_zones --zones 4 64 256 1024 --people 10 100 1000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from Backend.app.zone_geometry import CompiledZones
+
+
+def make_zones(n_zones: int, width: int, height: int, seed: int = 0):
+    """Polígonos aleatorios (cuadriláteros convexos de tamaño variable, pueden solaparse)"""
+    rng = np.random.default_rng(seed)
+    polygons = []
+    for _ in range(n_zones):
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        radius = rng.uniform(20, min(width, height) / 4)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 4))
+        points = np.c_[cx + radius * np.cos(angles), cy + radius * np.sin(angles)]
+        polygons.append(np.clip(np.round(points), 0, [width, height]).astype(np.int32))
+    return polygons
+
+
+def make_boxes(n_people: int, width: int, height: int, rng) -> np.ndarray:
+    x = rng.uniform(0, width, n_people)
+    y = rng.uniform(0, height, n_people)
+    return np.c_[x - 20, y - 80, x + 20, y].astype(np.float32)
+
+
+def _time_per_frame(fn, frames) -> float:
+    start = time.perf_counter()
+    for boxes in frames:
+        fn(boxes)
+    return (time.perf_counter() - start) / len(frames)
+
+
+def run(zone_counts, people_counts, n_frames: int = 200, width: int = 1920, height: int = 1080):
+    try:
+        import supervision as sv
+    except ImportError:
+        sv = None
+        print("⚠️  supervision no instalado: se mide solo la geometría compilada")
+
+    rng = np.random.default_rng(1)
+    results = []
+    for n_zones in zone_counts:
+        polygons = make_zones(n_zones, width, height)
+        start = time.perf_counter()
+        compiled = CompiledZones(polygons, width, height)
+        compile_seconds = time.perf_counter() - start
+        print(f"{n_zones:>5} zonas | compilación {compile_seconds * 1000:8.1f} ms | "
+              f"{compiled.n_combinations} combinaciones | raster {compiled.labels.nbytes / 1e6:.1f} MB")
+
+        baseline_zones = [sv.PolygonZone(p) for p in polygons] if sv is not None else None
+        for n_people in people_counts:
+            frames = [make_boxes(n_people, width, height, rng) for _ in range(n_frames)]
+            compiled_seconds = _time_per_frame(compiled.pairs, frames)
+            row = {
+                "zones": n_zones,
+                "people": n_people,
+                "compile_ms": round(compile_seconds * 1000, 2),
+                "compiled_us_per_frame": round(compiled_seconds * 1e6, 1),
+            }
+
+            if baseline_zones is not None:
+                def per_zone(boxes):
+                    detections = sv.Detections(xyxy=boxes)
+                    return np.stack([zone.trigger(detections) for zone in baseline_zones], axis=1)
+
+                baseline_seconds = _time_per_frame(per_zone, frames[:max(1, n_frames // 10)])
+                # Coincidencia con sv.PolygonZone (difiere solo en cajas que cruzan el borde derecho
+                # o inferior de una zona: supervision recorta cada caja a la extensión del polígono)
+                agreement = np.mean([(compiled.membership(b) == per_zone(b)).mean() for b in frames[:10]])
+                row.update({
+                    "polygon_zone_us_per_frame": round(baseline_seconds * 1e6, 1),
+                    "speedup": round(baseline_seconds / compiled_seconds, 1),
+                    "agreement": round(float(agreement), 5),
+                })
+            results.append(row)
+            print(f"{n_zones:>5} zonas | {n_people:>5} personas | compilada {row['compiled_us_per_frame']:9.1f} µs/frame"
+                  + (f" | PolygonZone {row['polygon_zone_us_per_frame']:11.1f} µs/frame | x{row['speedup']}"
+                     f" | coincidencia {row['agreement']:.4%}"
+                     if "speedup" in row else ""))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de pertenencia a zonas")
+    parser.add_argument("--zones", nargs="+", type=int, default=[4, 64, 256, 1024])
+    parser.add_argument("--people", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Ruta del reporte JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.zones, args.people, n_frames=args.frames)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
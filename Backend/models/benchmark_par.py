@@ -0,0 +1,286 @@
+"""
+Benchmark de modelos PAR (Pedestrian Attribute Recognition)
+
+Evalúa cada backend (PAR baseline, NTQAI, ...) sobre el mismo conjunto de
+crops etiquetados en formato PETA (CSV con columnas: filename, gender, age_group,
+el mismo que espera PETADataset) y reporta:
+- Precisión de género y edad + matrices de confusión
+- Crops/segundo para varios tamaños de batch
+- Tiempo de carga del modelo y memoria pico
+
+Las edades se comparan en los rangos del pipeline (0-18, 19-35, 36-60, 60+),
+que es el denominador común entre el baseline (5 clases) y NTQAI.
+
+Uso:
+    python benchmark_par.py --csv data/PETA/val.csv --images data/PETA/images \\
+        --models par ntqai --batch-sizes 1 8 32 --output bench_par.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Etiquetas canónicas usadas para comparar backends
+GENDER_CLASSES = ['M', 'F']
+AGE_CLASSES = ['0-18', '19-35', '36-60', '60+']
+UNKNOWN = 'Desconocido'
+
+# Índices de PETADataset (Child, Teen, Young, Adult, Elder) -> rango del pipeline
+PETA_AGE_TO_GROUP = ['0-18', '0-18', '19-35', '36-60', '60+']
+PETA_GENDER_TO_LABEL = ['M', 'F']
+
+
+class PARBaselineBackend:
+    """ResNet50 PAR baseline (attribute_recognition.PARModel)"""
+
+    GENDER_MAP = {'Masculino': 'M', 'Femenino': 'F'}
+
+    def __init__(self, device: str = 'cpu'):
+        from models.attribute_recognition import PARModel
+        model_path = Path(__file__).parent / 'resnet50_peta.pth'
+        self.par = PARModel(model_path=str(model_path) if model_path.exists() else None, device=device)
+
+    def predict_crops(self, crops: List[np.ndarray]) -> List[Dict]:
+        import torch
+
+        batch = torch.stack([self.par.transform(crop) for crop in crops]).to(self.par.device)
+        with torch.no_grad():
+            features = self.par.model['backbone'](batch)
+            gender_idx = self.par.model['gender_head'](features).argmax(dim=1).tolist()
+            age_idx = self.par.model['age_head'](features).argmax(dim=1).tolist()
+
+        return [
+            {
+                'gender': self.GENDER_MAP.get(self.par.GENDER_LABELS[g], UNKNOWN),
+                'age': PETA_AGE_TO_GROUP[a]
+            }
+            for g, a in zip(gender_idx, age_idx)
+        ]
+
+
+class NTQAIBackend:
+    """Modelos BEiT de NTQAI (ntqai_adapter.NTQAIModelsAdapter)"""
+
+    def __init__(self, device: str = 'cpu'):
+        from models.ntqai_adapter import create_ntqai_model
+        self.adapter = create_ntqai_model()
+        if self.adapter is None:
+            raise RuntimeError("No se encontraron los modelos NTQAI (ejecuta download_ntoai_models.py)")
+
+    def predict_crops(self, crops: List[np.ndarray]) -> List[Dict]:
+        from PIL import Image
+
+        results = self.adapter.predict_batch([Image.fromarray(crop) for crop in crops])
+        return [
+            {
+                'gender': r['gender'] if r['gender'] in GENDER_CLASSES else UNKNOWN,
+                'age': r['age_group'] if r['age_group'] in AGE_CLASSES else UNKNOWN
+            }
+            for r in results
+        ]
+
+
+# Registro de backends disponibles: agregar aquí los nuevos modelos
+BACKENDS: Dict[str, Callable] = {
+    'par': PARBaselineBackend,
+    'ntqai': NTQAIBackend,
+}
+
+
+def load_crops(csv_path: str, images_dir: str, limit: int = None):
+    """
+    Carga los crops (RGB, uint8) y sus etiquetas canónicas usando PETADataset
+    """
+    from models.finetune_par import PETADataset
+
+    dataset = PETADataset(csv_path, images_dir, transform=None)
+    total = len(dataset) if limit is None else min(limit, len(dataset))
+
+    crops, genders, ages = [], [], []
+    for idx in range(total):
+        image, gender_label, age_label = dataset[idx]
+        crops.append(np.asarray(image))
+        genders.append(PETA_GENDER_TO_LABEL[gender_label])
+        ages.append(PETA_AGE_TO_GROUP[age_label])
+
+    return crops, genders, ages
+
+
+def confusion_matrix(y_true: List[str], y_pred: List[str], classes: List[str]) -> Dict:
+    """
+    Matriz de confusión (filas = etiqueta real, columnas = predicción).
+    Las predicciones fuera de `classes` se cuentan en la columna 'Desconocido'.
+    """
+    columns = classes + [UNKNOWN]
+    col_index = {label: i for i, label in enumerate(columns)}
+    row_index = {label: i for i, label in enumerate(classes)}
+
+    matrix = np.zeros((len(classes), len(columns)), dtype=np.int64)
+    for true, pred in zip(y_true, y_pred):
+        if true in row_index:
+            matrix[row_index[true], col_index.get(pred, len(classes))] += 1
+
+    return {"labels": classes, "predicted_labels": columns, "matrix": matrix.tolist()}
+
+
+def _accuracy(y_true: List[str], y_pred: List[str]) -> float:
+    if not y_true:
+        return 0.0
+    return round(sum(t == p for t, p in zip(y_true, y_pred)) / len(y_true), 4)
+
+
+def _peak_rss_mb():
+    """Memoria residente pico del proceso (ru_maxrss es KB en Linux, bytes en macOS)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def run_backend(name: str, csv_path: str, images_dir: str, batch_sizes: List[int],
+                limit: int = None, throughput_samples: int = 256, warmup: int = 2,
+                device: str = 'cpu') -> Dict:
+    """
+    Ejecuta el benchmark completo de un backend y retorna un dict serializable
+    """
+    import torch
+
+    crops, true_genders, true_ages = load_crops(csv_path, images_dir, limit)
+    if not crops:
+        return {"model": name, "error": "Dataset vacío"}
+
+    if torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats()
+
+    # 1. Tiempo de carga
+    start = time.perf_counter()
+    backend = BACKENDS[name](device=device)
+    load_time = time.perf_counter() - start
+
+    # 2. Precisión (batch más grande solicitado)
+    eval_batch = max(batch_sizes)
+    predictions = []
+    for i in range(0, len(crops), eval_batch):
+        predictions.extend(backend.predict_crops(crops[i:i + eval_batch]))
+
+    pred_genders = [p['gender'] for p in predictions]
+    pred_ages = [p['age'] for p in predictions]
+
+    # 3. Throughput por tamaño de batch
+    sample = (crops * (throughput_samples // len(crops) + 1))[:throughput_samples]
+    throughput = {}
+    for batch_size in batch_sizes:
+        batches = [sample[i:i + batch_size] for i in range(0, len(sample), batch_size)]
+        for batch in batches[:warmup]:
+            backend.predict_crops(batch)
+
+        start = time.perf_counter()
+        for batch in batches:
+            backend.predict_crops(batch)
+        elapsed = time.perf_counter() - start
+
+        throughput[str(batch_size)] = {
+            "crops_per_second": round(len(sample) / elapsed, 2) if elapsed > 0 else None,
+            "ms_per_batch": round(1000 * elapsed / len(batches), 3)
+        }
+
+    return {
+        "model": name,
+        "samples": len(crops),
+        "load_time_seconds": round(load_time, 3),
+        "gender": {
+            "accuracy": _accuracy(true_genders, pred_genders),
+            "confusion_matrix": confusion_matrix(true_genders, pred_genders, GENDER_CLASSES)
+        },
+        "age": {
+            "accuracy": _accuracy(true_ages, pred_ages),
+            "confusion_matrix": confusion_matrix(true_ages, pred_ages, AGE_CLASSES)
+        },
+        "throughput": throughput,
+        "memory": {
+            "peak_rss_mb": _peak_rss_mb(),
+            "peak_cuda_mb": round(torch.cuda.max_memory_allocated() / 2**20, 1) if torch.cuda.is_available() else None
+        }
+    }
+
+
+def _print_report(report: Dict):
+    print("\n" + "=" * 60)
+    print("BENCHMARK PAR")
+    print("=" * 60)
+    for result in report["results"]:
+        if "error" in result:
+            print(f"\n❌ {result['model']}: {result['error']}")
+            continue
+        print(f"\n🔧 {result['model']} ({result['samples']} crops)")
+        print(f"   Carga: {result['load_time_seconds']:.2f}s | RSS pico: {result['memory']['peak_rss_mb']} MB")
+        print(f"   Género: {result['gender']['accuracy'] * 100:.2f}% | Edad: {result['age']['accuracy'] * 100:.2f}%")
+        for batch_size, stats in result["throughput"].items():
+            print(f"   batch={batch_size:>4}: {stats['crops_per_second']} crops/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de precisión y throughput de modelos PAR")
+    parser.add_argument("--csv", required=True, help="CSV estilo PETA (filename, gender, age_group)")
+    parser.add_argument("--images", required=True, help="Directorio de imágenes")
+    parser.add_argument("--models", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de crops a evaluar")
+    parser.add_argument("--throughput-samples", type=int, default=256)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="Ejecutar todos los modelos en este proceso (la memoria pico deja de ser por modelo)")
+    parser.add_argument("--output", default=None, help="Ruta del reporte JSON")
+    args = parser.parse_args(argv)
+
+    kwargs = dict(csv_path=args.csv, images_dir=args.images, batch_sizes=args.batch_sizes,
+                  limit=args.limit, throughput_samples=args.throughput_samples, device=args.device)
+
+    results = []
+    for name in args.models:
+        try:
+            if args.no_isolate:
+                results.append(run_backend(name, **kwargs))
+            else:
+                # Un proceso nuevo por modelo para medir carga y memoria de forma aislada
+                ctx = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                    results.append(executor.submit(run_backend, name, **kwargs).result())
+        except Exception as e:
+            results.append({"model": name, "error": str(e)})
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "dataset": {"csv": args.csv, "images": args.images, "limit": args.limit},
+        "device": args.device,
+        "results": results
+    }
+
+    _print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Reporte guardado en: {args.output}")
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
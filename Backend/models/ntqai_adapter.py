@@ -178,6 +178,54 @@ class NTQAIModelsAdapter:
         
         return result
 
+    def predict_batch(self, images):
+        """
+        Predicción por lotes: una sola pasada de cada modelo para todas las imágenes
+
+        Args:
+            images: Lista de PIL Images
+
+        Returns:
+            list: Un dict por imagen con el mismo formato que predict()
+        """
+        results = [
+            {'gender': 'Unknown', 'age_group': 'Unknown', 'gender_conf': 0.0, 'age_conf': 0.0}
+            for _ in images
+        ]
+        if not images:
+            return results
+
+        with torch.no_grad():
+            if self.gender_model is not None and self.gender_processor is not None:
+                try:
+                    inputs = self.gender_processor(images=images, return_tensors="pt")
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                    probs = torch.softmax(self.gender_model(**inputs).logits, dim=-1)
+                    confs, idxs = probs.max(dim=-1)
+
+                    for result, conf, idx in zip(results, confs.tolist(), idxs.tolist()):
+                        gender_label = self.gender_labels.get(str(idx), "Unknown")
+                        result['gender'] = 'M' if gender_label == 'Male' else 'F'
+                        result['gender_conf'] = conf
+                except Exception as e:
+                    print(f"⚠️  Error en predicción de género (batch): {e}")
+
+            if self.age_model is not None and self.age_processor is not None:
+                try:
+                    inputs = self.age_processor(images=images, return_tensors="pt")
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                    probs = torch.softmax(self.age_model(**inputs).logits, dim=-1)
+                    confs, idxs = probs.max(dim=-1)
+
+                    for result, conf, idx in zip(results, confs.tolist(), idxs.tolist()):
+                        age_label = self.age_labels.get(str(idx), "Unknown")
+                        result['age_group'] = self._map_age_to_group(age_label)
+                        result['age_conf'] = conf
+                except Exception as e:
+                    print(f"⚠️  Error en predicción de edad (batch): {e}")
+
+        return results
+
 # Función de compatibilidad con la interfaz anterior
 def create_ntqai_model():
     """Crea y carga los modelos NTQAI"""
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from Backend.app.analysis_cache import AnalysisCache
+from Backend.app.events_io import write_events
+
+
+@pytest.fixture
+def events_file(tmp_path, make_events):
+    return write_events(make_events(rows=800, seed=3), str(tmp_path / "task_events.parquet"))
+
+
+def counting(result):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return result
+    return compute, calls
+
+
+def test_memory_and_sidecar_hits(events_file):
+    compute, calls = counting({"value": 1})
+    cache = AnalysisCache()
+    assert cache.get_or_compute(events_file, "kind", compute) == {"value": 1}
+    assert cache.get_or_compute(events_file, "kind", compute) == {"value": 1}
+    # Otra instancia (otro proceso) lo encuentra en el sidecar
+    other = AnalysisCache()
+    assert other.get_or_compute(events_file, "kind", compute) == {"value": 1}
+
+    assert len(calls) == 1
+    assert (cache.stats["misses"], cache.stats["memory_hits"]) == (1, 1)
+    assert (other.stats["misses"], other.stats["disk_hits"]) == (0, 1)
+
+
+def test_fingerprint_change_invalidates(events_file, make_events):
+    cache = AnalysisCache()
+    cache.get_or_compute(events_file, "kind", lambda: {"value": 1})
+    write_events(make_events(rows=900, seed=4), events_file)
+    stat = os.stat(events_file)
+    os.utime(events_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert cache.get_or_compute(events_file, "kind", lambda: {"value": 2}) == {"value": 2}
+    assert AnalysisCache().find(events_file, "kind") == {"value": 2}
+
+
+def test_errors_are_not_cached(events_file):
+    cache = AnalysisCache()
+    assert cache.get_or_compute(events_file, "kind", lambda: {"error": "x"}) == {"error": "x"}
+    assert cache.find(events_file, "kind") is None
+
+
+def test_results_are_normalized_copies(events_file):
+    cache = AnalysisCache()
+    computed = cache.get_or_compute(events_file, "kind", lambda: {"counts": {3: np.float64(0.5)},
+                                                                   "items": [np.int64(0), np.int64(1)]})
+    # Igual que si viniera del sidecar: claves str y tipos nativos
+    assert computed == {"counts": {"3": 0.5}, "items": [0, 1]}
+    assert type(computed["counts"]["3"]) is float
+
+    computed["counts"]["3"] = -1
+    again = cache.get_or_compute(events_file, "kind", lambda: {})
+    again["items"].append(2)
+    assert cache.find(events_file, "kind") == {"counts": {"3": 0.5}, "items": [0, 1]}
+
+
+def test_concurrent_writers_keep_every_entry(events_file):
+    # Instancias distintas: cada una con sus propios candados, como los procesos del pool
+    caches = [AnalysisCache() for _ in range(4)]
+    barrier = threading.Barrier(len(caches))
+
+    def write(index, cache):
+        barrier.wait()
+        for n in range(5):
+            cache.get_or_compute(events_file, f"kind{index}_{n}", lambda: {"n": n})
+
+    threads = [threading.Thread(target=write, args=item) for item in enumerate(caches)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(AnalysisCache().sidecar_path(events_file)) as f:
+        entries = json.load(f)["entries"]
+    assert len(entries) == 20
+
+
+def test_sidecar_keeps_a_bounded_number_of_variants(events_file):
+    path = events_file
+    cache = AnalysisCache()
+    cache.precompute(path, "task")
+    for offset in range(AnalysisCache.MAX_SIDECAR_VARIANTS + 5):
+        cache.get_analysis(path, ["zone_analysis"], bucket_seconds=100 + offset)
+        cache.get_visualization(path, max_points=10 + offset)
+
+    with open(cache.sidecar_path(path)) as f:
+        entries = json.load(f)["entries"]
+    assert AnalysisCache._default_kinds() <= set(entries)
+    for family in ("section:zone_analysis", "visualization"):
+        variants = [kind for kind in entries
+                    if kind.split("@", 1)[0] == family and kind not in AnalysisCache._default_kinds()]
+        assert len(variants) == AnalysisCache.MAX_SIDECAR_VARIANTS
+    # Se descartan las variantes más antiguas
+    assert "section:zone_analysis@100s" not in entries
+    assert f"section:zone_analysis@{100 + AnalysisCache.MAX_SIDECAR_VARIANTS + 4}s" in entries
+
+
+def test_precompute_writes_the_task_artifact(events_file):
+    artifact = AnalysisCache().precompute(events_file, "task")
+    assert artifact["artifact"] == AnalysisCache().sidecar_path(events_file)
+    with open(artifact["artifact"]) as f:
+        assert AnalysisCache._default_kinds() <= set(json.load(f)["entries"])
+
+    # Otro proceso sirve análisis, visualización y sketches desde el artefacto sin recalcular
+    cache = AnalysisCache()
+    cache.get_analysis(events_file)
+    cache.get_visualization(events_file)
+    cache.get_sketches(events_file, "task")
+    assert cache.stats["misses"] == 0
+    assert cache.stats["disk_hits"] == len(AnalysisCache._default_kinds())
+
+
+def test_analytics_version_invalidates_the_artifact(events_file, monkeypatch):
+    AnalysisCache().precompute(events_file, "task")
+    monkeypatch.setattr("Backend.app.analysis_cache.ANALYTICS_VERSION", "next")
+
+    cache = AnalysisCache()
+    cache.get_analysis(events_file, ["summary"])
+    assert (cache.stats["misses"], cache.stats["disk_hits"]) == (1, 0)
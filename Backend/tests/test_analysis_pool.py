@@ -0,0 +1,51 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from Backend.app.analysis_cache import analysis_cache
+from Backend.app.analysis_pool import AnalysisPool, cached_summary
+from Backend.app.events_io import write_events
+
+
+@pytest.fixture
+def pool():
+    pool = AnalysisPool(max_workers=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_results_and_errors_per_key(pool):
+    # Funciones de la biblioteca estándar: se importan sin problema en los procesos 'spawn'
+    results, errors = asyncio.run(pool.run_many(math.sqrt, {"a": (4,), "b": (9,), "bad": (-1,)}))
+
+    assert results == {"a": 2.0, "b": 3.0}
+    assert list(errors) == ["bad"] and "math domain error" in errors["bad"]
+
+
+def test_timeout_is_reported_as_error(pool):
+    results, errors = asyncio.run(pool.run_many(time.sleep, {"slow": (5,), "fast": (0,)}, timeout=0.5))
+
+    assert results == {"fast": None}
+    assert errors == {"slow": "timeout after 0.5s"}
+
+
+def test_empty_calls(pool):
+    assert asyncio.run(pool.run_many(math.sqrt, {})) == ({}, {})
+    assert pool._executor is None
+
+
+def test_cached_summary_matches_the_cache(tmp_path, make_events, pool):
+    paths = {
+        f"task_{seed}": write_events(make_events(rows=300, seed=seed), str(tmp_path / f"task_{seed}_events.parquet"))
+        for seed in (20, 21)
+    }
+    calls = {key: (path,) for key, path in paths.items()}
+    calls["missing"] = (str(tmp_path / "missing_events.parquet"),)
+    summaries, errors = asyncio.run(pool.run_many(cached_summary, calls))
+
+    # Una excepción en el proceso llega como error de su tarea sin afectar al resto
+    assert list(errors) == ["missing"] and "No such file" in errors["missing"]
+    for key, path in paths.items():
+        assert summaries[key] == analysis_cache.get_analysis(path, ["summary"])["summary"]
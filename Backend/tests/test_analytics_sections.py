@@ -0,0 +1,55 @@
+import pytest
+
+from Backend.app.analysis_cache import AnalysisCache
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.events_io import write_events
+
+
+@pytest.fixture
+def events_file(tmp_path, make_events):
+    return write_events(make_events(rows=1500, seed=11), str(tmp_path / "task_events.parquet"))
+
+
+@pytest.mark.parametrize("chunk_rows", [0, 400])
+@pytest.mark.parametrize("section", list(AnalyticsProcessor.SECTIONS))
+def test_each_section_alone_matches_full_analysis(events_file, section, chunk_rows):
+    processor = AnalyticsProcessor()
+    full = processor.process_events_file(events_file, chunk_rows=chunk_rows)
+    alone = processor.process_events_file(events_file, sections=[section], chunk_rows=chunk_rows)
+
+    assert list(alone) == [section]
+    assert alone[section] == full[section]
+
+
+def test_unknown_section_is_an_error(events_file):
+    result = AnalyticsProcessor().process_events_file(events_file, sections=["summary", "nope"])
+    assert result == {"error": "Unknown analytics sections: nope"}
+
+
+def test_section_cache_keys():
+    assert AnalyticsProcessor.section_cache_key("summary", 60) == "section:summary"
+    assert AnalyticsProcessor.section_cache_key("temporal_analysis") == "section:temporal_analysis@auto"
+    assert AnalyticsProcessor.section_cache_key("temporal_analysis", 60) == "section:temporal_analysis@60s"
+
+
+def test_only_missing_sections_are_computed(events_file):
+    processor = AnalyticsProcessor()
+    cache = AnalysisCache()
+    requested = []
+
+    def compute(missing):
+        requested.append(list(missing))
+        return processor.process_events_file(events_file, sections=missing)
+
+    def key_for(section):
+        return AnalyticsProcessor.section_cache_key(section, 60)
+
+    first = cache.get_or_compute_sections(events_file, ["summary", "temporal_analysis"], compute, key_for)
+    second = cache.get_or_compute_sections(events_file, ["temporal_analysis", "flow_analysis"], compute, key_for)
+
+    assert requested == [["summary", "temporal_analysis"], ["flow_analysis"]]
+    assert second["temporal_analysis"] == first["temporal_analysis"]
+    # Otro bucket es otra clave: solo se recalcula la sección con series temporales
+    cache.get_or_compute_sections(events_file, ["summary", "temporal_analysis"], compute,
+                                  lambda section: AnalyticsProcessor.section_cache_key(section, 10))
+    assert requested[-1] == ["temporal_analysis"]
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.chunked_analytics import DWELL_RELATIVE_ACCURACY
+from Backend.app.events_io import write_events
+
+# Claves que solo existen en uno de los modos (el modo por bloques omite raw_times)
+MODE_ONLY_KEYS = {"note", "raw_times"}
+# Medianas de permanencia: aproximadas en el modo por bloques (ver assert_dwell_medians)
+MEDIAN_KEYS = {"median_dwell_time", "overall_median"}
+
+
+def assert_same_analysis(chunked, in_memory, path="analysis"):
+    """Compara recursivamente ambos resultados (salvo las medianas de permanencia)"""
+    if isinstance(in_memory, dict):
+        assert isinstance(chunked, dict), path
+        assert set(chunked) - MODE_ONLY_KEYS == set(in_memory) - MODE_ONLY_KEYS, path
+        for key in set(in_memory) - MODE_ONLY_KEYS - MEDIAN_KEYS:
+            assert_same_analysis(chunked[key], in_memory[key], f"{path}.{key}")
+    elif isinstance(in_memory, (list, tuple)):
+        assert len(chunked) == len(in_memory), path
+        for i, (a, b) in enumerate(zip(chunked, in_memory)):
+            assert_same_analysis(a, b, f"{path}[{i}]")
+    elif isinstance(in_memory, (float, np.floating)):
+        assert chunked == pytest.approx(in_memory, rel=1e-6, abs=1e-9), path
+    else:
+        assert chunked == in_memory, path
+
+
+def assert_median_within_sketch_error(estimate, times):
+    """
+    El sketch estima el valor de rango (n - 1) / 2: con n par queda entre los
+    dos valores centrales (np.median los promedia), con su error relativo
+    """
+    ordered = np.sort(times)
+    low, high = ordered[(len(ordered) - 1) // 2], ordered[len(ordered) // 2]
+    assert low * (1 - DWELL_RELATIVE_ACCURACY) <= estimate <= high * (1 + DWELL_RELATIVE_ACCURACY)
+
+
+def assert_dwell_medians(chunked, in_memory):
+    for zone_key, zone in in_memory["by_zone"].items():
+        assert_median_within_sketch_error(chunked["by_zone"][zone_key]["median_dwell_time"], zone["raw_times"])
+    all_times = np.concatenate([zone["raw_times"] for zone in in_memory["by_zone"].values()])
+    assert_median_within_sketch_error(chunked["summary"]["overall_median"], all_times)
+
+
+def line_events(rows: int, duration: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    timestamps = np.sort(rng.uniform(0, duration, rows))
+    return pd.DataFrame({
+        'timestamp_seconds': timestamps,
+        'frame': np.round(timestamps * 30).astype(np.int64),
+        'zone_id': -1,
+        'line_id': rng.integers(0, 2, rows),
+        'person_tracker_id': rng.integers(1, 30, rows),
+        'event': rng.choice(['line_in', 'line_out'], rows),
+        'gender': 'Desconocido',
+        'gender_confidence': 0.0,
+        'age': 'Desconocido',
+        'age_confidence': 0.0
+    })
+
+
+@pytest.fixture
+def events_file(tmp_path, make_events):
+    zones = make_events(rows=6000, persons=80, zones=4, duration=1800, seed=5)
+    df = pd.concat([zones, line_events(500, 1800)]).sort_values('timestamp_seconds', kind='mergesort')
+    return write_events(df, str(tmp_path / "task_events.parquet"))
+
+
+@pytest.mark.parametrize("chunk_rows", [700, 2500])
+def test_chunked_matches_in_memory(events_file, chunk_rows):
+    processor = AnalyticsProcessor()
+    in_memory = processor.process_events_file(events_file, chunk_rows=0)
+    chunked = processor.process_events_file(events_file, chunk_rows=chunk_rows)
+
+    assert "error" not in in_memory
+    assert_same_analysis(chunked, in_memory)
+    assert_dwell_medians(chunked["dwell_time_analysis"], in_memory["dwell_time_analysis"])
+
+
+def test_chunked_matches_in_memory_with_bucket(events_file):
+    processor = AnalyticsProcessor()
+    sections = list(processor.BUCKETED_SECTIONS)
+    in_memory = processor.process_events_file(events_file, sections=sections, bucket_seconds=60, chunk_rows=0)
+    chunked = processor.process_events_file(events_file, sections=sections, bucket_seconds=60, chunk_rows=1000)
+
+    assert_same_analysis(chunked, in_memory)
+
+
+def test_chunked_line_analysis_without_lines(tmp_path, make_events):
+    # Sin cruces de línea ambos modos reportan el intervalo resuelto del archivo completo
+    path = write_events(make_events(rows=3000, duration=7200, seed=6), str(tmp_path / "zones_events.parquet"))
+    processor = AnalyticsProcessor()
+    in_memory = processor.process_events_file(path, sections=["line_analysis"], chunk_rows=0)
+    chunked = processor.process_events_file(path, sections=["line_analysis"], chunk_rows=1000)
+
+    assert in_memory["line_analysis"]["bucket_seconds"] == 10.0
+    assert chunked == in_memory
+
+
+def test_explicit_bucket_is_capped_at_max_timeline_buckets(tmp_path, make_events):
+    # 10 horas con bucket de 1 s serían 36000 intervalos: se usa el paso que deja menos de MAX_TIMELINE_BUCKETS
+    df = pd.concat([make_events(rows=4000, duration=36000, seed=9), line_events(400, 36000, seed=9)])
+    path = write_events(df.sort_values('timestamp_seconds', kind='mergesort'), str(tmp_path / "long_events.parquet"))
+    processor = AnalyticsProcessor()
+    sections = list(processor.BUCKETED_SECTIONS)
+    in_memory = processor.process_events_file(path, sections=sections, bucket_seconds=1, chunk_rows=0)
+    chunked = processor.process_events_file(path, sections=sections, bucket_seconds=1, chunk_rows=900)
+
+    for result in (in_memory, chunked):
+        assert result["temporal_analysis"]["bucket_seconds"] == 60.0
+        assert result["line_analysis"]["bucket_seconds"] == 60.0
+        assert len(result["temporal_analysis"]["timeline"]) <= processor.MAX_TIMELINE_BUCKETS
+    assert_same_analysis(chunked, in_memory)
+    # Un bucket que ya cabe se respeta
+    assert processor.bucket_for_duration(36000, 100) == 100.0
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from Backend.app.dedup import DedupIndex, processing_fingerprint
+from Backend.app.events_io import EVENT_DTYPES, events_path, find_events_file, write_events
+
+SHA = "AB" * 32
+PARAMS = {"model": "yolov8s.pt", "frame_stride": 1}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return DedupIndex(str(tmp_path))
+
+
+def test_fingerprint_depends_on_content_and_params():
+    assert processing_fingerprint(SHA, PARAMS) == processing_fingerprint(SHA.lower(), dict(reversed(PARAMS.items())))
+    assert processing_fingerprint(SHA, PARAMS) != processing_fingerprint(SHA, {**PARAMS, "frame_stride": 2})
+    assert processing_fingerprint(SHA, PARAMS) != processing_fingerprint("cd" * 32, PARAMS)
+
+
+@pytest.mark.parametrize("state", ["completed", "in_progress"])
+def test_claim_reuses_a_live_task(index, state):
+    first = index.claim(SHA, PARAMS, "task_1", lambda task_id: state)
+    second = index.claim(SHA, PARAMS, "task_2", lambda task_id: state)
+
+    assert first["deduplicated"] is False
+    assert (second["deduplicated"], second["task_id"], second["state"]) == (True, "task_1", state)
+    assert index.find(SHA, PARAMS, lambda task_id: state)["task_id"] == "task_1"
+    assert index.find(SHA, {**PARAMS, "frame_stride": 2}, lambda task_id: state) is None
+
+
+def test_failed_task_is_replaced(index):
+    index.claim(SHA, PARAMS, "task_1", lambda task_id: None)
+    claim = index.claim(SHA, PARAMS, "task_2", lambda task_id: None)
+
+    assert (claim["deduplicated"], claim["task_id"]) == (False, "task_2")
+    assert index.find(SHA, PARAMS, lambda task_id: None) is None
+    assert index.find(SHA, PARAMS, lambda task_id: "completed")["task_id"] == "task_2"
+
+
+def test_force_reprocesses_and_takes_over(index):
+    index.claim(SHA, PARAMS, "task_1", lambda task_id: "completed")
+    claim = index.claim(SHA, PARAMS, "task_2", lambda task_id: "completed", force=True)
+
+    assert (claim["deduplicated"], claim["task_id"]) == (False, "task_2")
+    assert index.find(SHA, PARAMS, lambda task_id: "completed")["task_id"] == "task_2"
+
+
+def test_task_without_detections_is_reused(index, tmp_path):
+    # Como task_state: completada si su archivo de eventos existe, aunque no tenga filas
+    def state_of(task_id):
+        return "completed" if find_events_file(str(tmp_path), task_id) is not None else None
+
+    index.claim(SHA, PARAMS, "empty_task", state_of)
+    write_events(pd.DataFrame([], columns=list(EVENT_DTYPES)), events_path(str(tmp_path), "empty_task"))
+    claim = index.claim(SHA, PARAMS, "task_2", state_of)
+
+    assert (claim["deduplicated"], claim["task_id"], claim["state"]) == (True, "empty_task", "completed")
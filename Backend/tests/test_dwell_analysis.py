@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backend.app.analytics import AnalyticsProcessor
+
+
+def reference_dwell_times(df: pd.DataFrame) -> dict:
+    """
+    Emparejamiento original de _analyze_dwell_times (antes de vectorizar):
+    cada entrada toma la salida libre más próxima estrictamente posterior
+    """
+    by_zone, by_person = {}, {}
+    for person_id in df['person_tracker_id'].unique():
+        person_data = df[df['person_tracker_id'] == person_id].sort_values('timestamp_seconds')
+        person_dwell_times = []
+        for zone_id in person_data['zone_id'].unique():
+            zone_events = person_data[person_data['zone_id'] == zone_id].sort_values('timestamp_seconds')
+            entry_times = zone_events[zone_events['event'] == 'entry']['timestamp_seconds'].tolist()
+            exit_times = zone_events[zone_events['event'] == 'exit']['timestamp_seconds'].tolist()
+            zone_dwell_times = []
+            for entry_time in entry_times:
+                matching_exits = [exit_time for exit_time in exit_times if exit_time > entry_time]
+                if matching_exits:
+                    exit_time = min(matching_exits)
+                    zone_dwell_times.append(exit_time - entry_time)
+                    person_dwell_times.append(exit_time - entry_time)
+                    exit_times.remove(exit_time)
+            if zone_dwell_times:
+                by_zone.setdefault(f"zone_{zone_id}", []).extend(zone_dwell_times)
+        if person_dwell_times:
+            by_person[f"person_{person_id}"] = person_dwell_times
+    return {"by_zone": by_zone, "by_person": by_person}
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_dwell_matches_reference(make_events, seed):
+    df = make_events(rows=3000, persons=50, zones=4, seed=seed)
+    result = AnalyticsProcessor()._analyze_dwell_times(df)
+    expected = reference_dwell_times(df)
+
+    assert list(result["by_zone"]) == list(expected["by_zone"])
+    for zone_key, times in expected["by_zone"].items():
+        zone = result["by_zone"][zone_key]
+        np.testing.assert_allclose(zone["raw_times"], times)
+        assert zone["total_visits"] == len(times)
+        assert zone["average_dwell_time"] == pytest.approx(np.mean(times))
+        assert zone["median_dwell_time"] == pytest.approx(np.median(times))
+        assert zone["std_dwell_time"] == pytest.approx(np.std(times))
+
+    assert list(result["by_person"]) == list(expected["by_person"])
+    for person_key, times in expected["by_person"].items():
+        person = result["by_person"][person_key]
+        assert person["visits_count"] == len(times)
+        assert person["total_dwell_time"] == pytest.approx(sum(times))
+        assert person["max_dwell_time"] == pytest.approx(max(times))
+        assert person["min_dwell_time"] == pytest.approx(min(times))
+
+    all_times = np.concatenate(list(expected["by_zone"].values()))
+    summary = result["summary"]
+    assert summary["total_measured_visits"] == len(all_times)
+    assert summary["overall_average"] == pytest.approx(all_times.mean())
+    assert summary["distribution"] == {
+        "under_10s": int((all_times < 10).sum()),
+        "10_30s": int(((all_times >= 10) & (all_times < 30)).sum()),
+        "30_60s": int(((all_times >= 30) & (all_times < 60)).sum()),
+        "over_60s": int((all_times >= 60).sum())
+    }
+
+
+def test_fifo_pairing_with_repeated_visits():
+    # Dos entradas seguidas antes de dos salidas: FIFO empareja 0-5 y 1-7;
+    # la salida en 0 (anterior a toda entrada) y la entrada en 9 quedan sin par
+    df = pd.DataFrame({
+        'timestamp_seconds': [0.0, 0.5, 1.0, 5.0, 7.0, 9.0],
+        'zone_id': [1, 1, 1, 1, 1, 1],
+        'person_tracker_id': [3, 3, 3, 3, 3, 3],
+        'event': ['exit', 'entry', 'entry', 'exit', 'exit', 'entry']
+    })
+    persons, zones, dwell_times, pending = AnalyticsProcessor()._pair_entry_exit(df, return_pending=True)
+
+    np.testing.assert_allclose(dwell_times, [4.5, 6.0])
+    assert persons.tolist() == [3, 3]
+    assert zones.tolist() == [1, 1]
+    assert pending['timestamp_seconds'].tolist() == [9.0]
+
+
+def test_exit_at_entry_time_is_not_paired():
+    df = pd.DataFrame({
+        'timestamp_seconds': [2.0, 2.0, 4.0],
+        'zone_id': [0, 0, 0],
+        'person_tracker_id': [1, 1, 1],
+        'event': ['entry', 'exit', 'exit']
+    })
+    _, _, dwell_times = AnalyticsProcessor()._pair_entry_exit(df)
+
+    np.testing.assert_allclose(dwell_times, [2.0])
+
+
+def test_dwell_without_exits_uses_fallback(make_events):
+    df = make_events(rows=200, seed=4).assign(event='entry')
+    result = AnalyticsProcessor()._analyze_dwell_times(df)
+
+    assert "note" in result
+    for zone_key, zone in result["by_zone"].items():
+        zone_df = df[df['zone_id'] == int(zone_key.split("_")[1])]
+        spans = zone_df.groupby('person_tracker_id')['timestamp_seconds'].agg(['size', 'min', 'max'])
+        spans = spans[spans['size'] > 1]
+        assert sorted(zone["raw_times"]) == pytest.approx(sorted(spans['max'] - spans['min']))
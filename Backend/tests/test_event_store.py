@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import pytest
+
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.event_store import EventStore
+from Backend.app.events_io import events_path, write_events
+
+
+@pytest.fixture
+def tasks(make_events):
+    return {
+        task_id: make_events(rows=1200, persons=30, zones=3, seed=seed)
+        for seed, task_id in enumerate(["task_a", "task_b"])
+    }
+
+
+@pytest.fixture
+def store(tmp_path, tasks):
+    for task_id, df in tasks.items():
+        write_events(df, events_path(str(tmp_path), task_id))
+    store = EventStore(str(tmp_path))
+    store.refresh()
+    return store
+
+
+def test_refresh_ingests_every_task(store, tasks):
+    assert store.stats()["tasks"] == 2
+    assert store.stats()["events"] == sum(len(df) for df in tasks.values())
+    # Sin cambios en el directorio no se re-ingiere nada
+    assert store.refresh() == {"added_or_updated": 0, "removed": 0}
+
+
+def test_query_group_by_matches_pandas(store, tasks):
+    result = store.query(group_by=["task_id", "zone_id"], event="entry")
+
+    expected = []
+    for task_id, df in tasks.items():
+        entries = df[df["event"] == "entry"]
+        for zone_id, group in entries.groupby("zone_id"):
+            expected.append((task_id, zone_id, len(group), group["person_tracker_id"].nunique()))
+    assert [(row["task_id"], row["zone_id"], row["detections"], row["unique_persons"])
+            for row in result["rows"]] == expected
+    assert result["filters"] == {"event": "entry"}
+
+
+def test_query_bucket_and_filters(store, tasks):
+    result = store.query(group_by=["gender"], bucket_seconds=60, task_ids=["task_b"], zone_ids=[1], start=120, end=480)
+
+    df = tasks["task_b"]
+    df = df[(df["zone_id"] == 1) & (df["timestamp_seconds"] >= 120) & (df["timestamp_seconds"] < 480)]
+    counts = df.groupby(["gender", (df["timestamp_seconds"] // 60) * 60]).size()
+    assert [((row["gender"], row["bucket"]), row["detections"]) for row in result["rows"]] == [
+        ((gender, float(bucket)), int(n)) for (gender, bucket), n in counts.items()
+    ]
+    assert result["group_by"] == ["gender", "bucket"]
+    with pytest.raises(ValueError):
+        store.query(group_by=["person_tracker_id"])
+
+
+def test_task_summaries_match_analysis(store, tmp_path):
+    summaries = store.task_summaries(store.fresh_tasks({"task_a": events_path(str(tmp_path), "task_a")}))
+    expected = AnalyticsProcessor().process_events_file(events_path(str(tmp_path), "task_a"),
+                                                        sections=["summary"])["summary"]
+
+    assert summaries["task_a"]["total_detections"] == expected["total_detections"]
+    assert summaries["task_a"]["unique_persons"] == expected["unique_persons"]
+
+
+def test_refresh_removes_deleted_tasks(store, tmp_path):
+    os.remove(events_path(str(tmp_path), "task_a"))
+
+    assert store.refresh() == {"added_or_updated": 0, "removed": 1}
+    assert store.query(group_by=["task_id"])["rows"][0]["task_id"] == "task_b"
+    assert store.stats()["tasks"] == 1
+
+
+def test_refresh_sees_files_rewritten_in_place(store, tmp_path, make_events):
+    # Reescritura sobre el mismo archivo: el mtime del directorio no cambia
+    dir_mtime = os.stat(tmp_path).st_mtime_ns
+    other = write_events(make_events(rows=300, seed=7), str(tmp_path.parent / "other_events.parquet"))
+    shutil.copyfile(other, events_path(str(tmp_path), "task_a"))
+    os.utime(tmp_path, ns=(dir_mtime, dir_mtime))
+
+    assert store.refresh() == {"added_or_updated": 1, "removed": 0}
+    assert store.query(task_ids=["task_a"])["rows"][0]["detections"] == 300
+    assert store.refresh(force=True) == {"added_or_updated": 2, "removed": 0}
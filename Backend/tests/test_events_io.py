@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+import pytest
+
+from Backend.app import events_io
+from Backend.app.events_io import (
+    EVENT_DTYPES, csv_path, estimate_rows, events_path, export_csv, find_events_file, iter_events,
+    list_events_files, read_events, split_events, write_events
+)
+
+
+def test_parquet_round_trip_keeps_types(tmp_path, make_events):
+    df = make_events(rows=500, seed=1)
+    path = write_events(df, events_path(str(tmp_path), "task"))
+    read = read_events(path)
+
+    assert path.endswith(".parquet")
+    assert read.dtypes.astype(str).to_dict() == EVENT_DTYPES
+    pd.testing.assert_frame_equal(read, df.astype(EVENT_DTYPES))
+    assert estimate_rows(path) == 500
+    assert list(read_events(path, columns=["zone_id", "missing"]).columns) == ["zone_id"]
+
+
+def test_csv_fallback_without_pyarrow(tmp_path, make_events, monkeypatch):
+    monkeypatch.setattr(events_io, "PARQUET_AVAILABLE", False)
+    df = make_events(rows=300, seed=2)
+    path = write_events(df, events_path(str(tmp_path), "task"))
+
+    assert path == csv_path(str(tmp_path), "task")
+    assert find_events_file(str(tmp_path), "task") == path
+    read = read_events(path)
+    assert read.dtypes.astype(str).to_dict() == EVENT_DTYPES
+    pd.testing.assert_frame_equal(read, df.astype(EVENT_DTYPES))
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 100])
+def test_iter_events_does_not_split_frames(tmp_path, make_events, chunk_rows):
+    # Varias filas por frame
+    df = make_events(rows=400, seed=3).assign(frame=lambda d: d["frame"] // 300)
+    path = write_events(df, events_path(str(tmp_path), "task"))
+    chunks = list(iter_events(path, columns=["zone_id"], chunk_rows=chunk_rows))
+
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), read_events(path, ["zone_id", "frame"]))
+    last_frames = [chunk["frame"].iloc[-1] for chunk in chunks]
+    first_frames = [chunk["frame"].iloc[0] for chunk in chunks]
+    assert all(last < first for last, first in zip(last_frames, first_frames[1:]))
+
+
+def test_split_events_separates_line_crossings(make_events):
+    df = make_events(rows=50, seed=4)
+    df.loc[::5, "event"] = "line_in"
+    zones, lines = split_events(df)
+
+    assert len(lines) == 10 and set(lines["event"]) == {"line_in"}
+    assert len(zones) == 40
+    zones, lines = split_events(df.drop(columns="event"))
+    assert (len(zones), len(lines)) == (50, 0)
+
+
+def test_listing_prefers_parquet_and_export_is_regenerated(tmp_path, make_events):
+    write_events(make_events(rows=100, seed=5), events_path(str(tmp_path), "both"))
+    make_events(rows=80, seed=6).to_csv(csv_path(str(tmp_path), "both"), index=False)
+    make_events(rows=60, seed=7).to_csv(csv_path(str(tmp_path), "legacy"), index=False)
+
+    files = list_events_files(str(tmp_path))
+    assert files == {"both": events_path(str(tmp_path), "both"), "legacy": csv_path(str(tmp_path), "legacy")}
+
+    # El CSV derivado está desactualizado respecto del Parquet: se regenera
+    source = events_path(str(tmp_path), "both")
+    os.utime(csv_path(str(tmp_path), "both"), ns=(0, os.stat(source).st_mtime_ns - 10**9))
+    exported = export_csv(str(tmp_path), "both")
+    assert export_csv(str(tmp_path), "legacy") == csv_path(str(tmp_path), "legacy")
+    assert export_csv(str(tmp_path), "missing") is None
+    pd.testing.assert_frame_equal(read_events(exported), read_events(source))
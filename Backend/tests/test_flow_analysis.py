@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from Backend.app.analytics import AnalyticsProcessor
+
+
+def reference_flow_transitions(df: pd.DataFrame) -> dict:
+    """Recorrido original por persona de _analyze_flow_patterns (antes de vectorizar)"""
+    flow_data = {}
+    for person_id in df['person_tracker_id'].unique():
+        person_data = df[df['person_tracker_id'] == person_id].sort_values('timestamp_seconds')
+        zones_visited = person_data['zone_id'].tolist()
+        for i in range(len(zones_visited) - 1):
+            from_zone = f"zone_{zones_visited[i]}"
+            to_zone = f"zone_{zones_visited[i + 1]}"
+            if from_zone != to_zone:
+                transition_key = f"{from_zone}_to_{to_zone}"
+                flow_data[transition_key] = flow_data.get(transition_key, 0) + 1
+    return flow_data
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_flow_matches_reference(make_events, seed):
+    df = make_events(rows=3000, persons=60, zones=5, seed=seed)
+    result = AnalyticsProcessor()._analyze_flow_patterns(df)
+
+    expected = reference_flow_transitions(df)
+    assert result["zone_transitions"] == expected
+    assert result["total_transitions"] == sum(expected.values())
+    assert result["most_common_transition"][1] == max(expected.values())
+
+
+def test_flow_matrix_matches_transitions(make_events):
+    df = make_events(rows=1000, zones=3, seed=3)
+    result = AnalyticsProcessor()._analyze_flow_patterns(df)
+
+    zones = result["transition_matrix"]["zones"]
+    matrix = result["transition_matrix"]["matrix"]
+    from_matrix = {
+        f"{zones[i]}_to_{zones[j]}": count
+        for i, row in enumerate(matrix) for j, count in enumerate(row) if count
+    }
+    assert from_matrix == result["zone_transitions"]
+    assert all(matrix[i][i] == 0 for i in range(len(zones)))
+
+
+def test_flow_without_transitions():
+    df = pd.DataFrame({'timestamp_seconds': [0.0, 1.0, 2.0], 'zone_id': [2, 2, 2],
+                       'person_tracker_id': [7, 7, 8]})
+    result = AnalyticsProcessor()._analyze_flow_patterns(df)
+
+    assert result["zone_transitions"] == {}
+    assert result["total_transitions"] == 0
+    assert result["most_common_transition"] is None
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from Backend.app.track_log import interpolate_tracks
+from Backend.app.zone_events import LineCrossingCounter, ZoneEventTracker
+from Backend.app.zone_geometry import CompiledZones, default_zone_polygons
+
+WIDTH, HEIGHT = 640, 480
+
+
+def test_interpolates_tracks_present_in_both_frames():
+    start_xyxy = np.array([[0, 0, 10, 40], [100, 100, 110, 140], [300, 300, 310, 340]], dtype=np.float32)
+    end_xyxy = np.array([[50, 60, 60, 100], [30, 30, 40, 70]], dtype=np.float32)
+    # El track 2 desaparece y el 9 aparece: no se rellenan
+    frames = list(interpolate_tracks(10, start_xyxy, np.array([1, 2, 3]),
+                                     14, np.vstack([end_xyxy, [[0, 0, 5, 5]]]), np.array([3, 1, 9])))
+
+    assert [frame for frame, _, _ in frames] == [11, 12, 13]
+    for frame, xyxy, ids in frames:
+        t = (frame - 10) / 4
+        # Orden de detección del frame final
+        assert ids.tolist() == [3, 1]
+        assert xyxy.dtype == np.float32
+        np.testing.assert_allclose(xyxy[0], start_xyxy[2] + (end_xyxy[0] - start_xyxy[2]) * t, rtol=1e-6)
+        np.testing.assert_allclose(xyxy[1], start_xyxy[0] + (end_xyxy[1] - start_xyxy[0]) * t, rtol=1e-6)
+
+
+def test_adjacent_or_disjoint_frames_yield_nothing_to_fill():
+    xyxy = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    assert list(interpolate_tracks(4, xyxy, np.array([1]), 5, xyxy, np.array([1]))) == []
+    frames = list(interpolate_tracks(4, xyxy, np.array([1]), 7, xyxy, np.array([2])))
+    assert [(frame, len(ids)) for frame, _, ids in frames] == [(5, 0), (6, 0)]
+
+
+def linear_tracks(n_frames=120, seed=0, n_tracks=8):
+    """Tracks de velocidad constante (entera, en píxeles por frame) que cruzan las zonas y la línea"""
+    rng = np.random.default_rng(seed)
+    start = rng.integers([40, 40], [WIDTH - 40, HEIGHT - 40], (n_tracks, 2))
+    velocity = rng.integers(-4, 5, (n_tracks, 2))
+    for frame in range(n_frames):
+        # Sin recortar al frame: las cajas que salen se recortan igual en ambos recorridos
+        anchors = (start + velocity * frame).astype(np.float64)
+        yield frame, np.column_stack([anchors[:, 0] - 5, anchors[:, 1] - 40, anchors[:, 0] + 5, anchors[:, 1]]), \
+            np.arange(1, n_tracks + 1)
+
+
+def run_events(frames):
+    geometry = CompiledZones(default_zone_polygons(WIDTH, HEIGHT), WIDTH, HEIGHT)
+    zones = ZoneEventTracker(geometry)
+    lines = LineCrossingCounter(np.array([[[0, HEIGHT / 3], [WIDTH, HEIGHT / 3]]]), WIDTH, HEIGHT)
+    events = []
+    for frame, xyxy, ids in frames:
+        for event in zones.update(frame, frame / 30, xyxy, ids, {}) + lines.update(frame, frame / 30, xyxy, ids, {}):
+            events.append((event['frame'], event['event'], event['zone_id'], event['line_id'],
+                           int(event['person_tracker_id'])))
+    return events
+
+
+def strided(frames, stride):
+    """Frames que procesa el pipeline con frame_stride: los detectados más los interpolados entre ellos"""
+    keyframes = [(frame, xyxy.astype(np.float32), ids) for frame, xyxy, ids in frames if (frame + 1) % stride == 0]
+    processed = [keyframes[0]]
+    for (start_frame, start_xyxy, start_ids), (end_frame, end_xyxy, end_ids) in zip(keyframes, keyframes[1:]):
+        processed.extend(interpolate_tracks(start_frame, start_xyxy, start_ids, end_frame, end_xyxy, end_ids))
+        processed.append((end_frame, end_xyxy, end_ids))
+    return processed
+
+
+@pytest.mark.parametrize("stride", [2, 3, 5])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_stride_matches_every_frame_on_linear_motion(stride, seed):
+    frames = list(linear_tracks(seed=seed))
+    processed = strided(frames, stride)
+    first, last = processed[0][0], processed[-1][0]
+    # Con movimiento lineal la interpolación reproduce las cajas reales: mismos eventos que stride 1
+    reference = run_events((frame, xyxy.astype(np.float32), ids) for frame, xyxy, ids in frames
+                           if first <= frame <= last)
+
+    assert [frame for frame, _, _ in processed] == list(range(first, last + 1))
+    assert run_events(processed) == reference
+    assert len(reference) > 0
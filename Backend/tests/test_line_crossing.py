@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.events_io import write_events
+from Backend.app.zone_events import LineCrossingCounter
+
+WIDTH, HEIGHT = 640, 480
+# Línea horizontal recorrida de izquierda a derecha: su lado derecho es hacia abajo
+HORIZONTAL = [[[100, 200], [500, 200]]]
+
+
+def boxes(*anchors):
+    """Cajas de 10 x 40 con el centro inferior en cada punto (x, y)"""
+    return np.array([[x - 5, y - 40, x + 5, y] for x, y in anchors], dtype=np.float32).reshape(-1, 4)
+
+
+def crossings(counter, frame, anchors, ids):
+    events = counter.update(frame, frame / 30, boxes(*anchors), np.asarray(ids), {})
+    return [(event['line_id'], event['person_tracker_id'], event['event']) for event in events]
+
+
+def test_crossing_direction():
+    counter = LineCrossingCounter(np.array(HORIZONTAL), WIDTH, HEIGHT)
+    assert crossings(counter, 0, [(200, 150), (300, 250)], [1, 2]) == []
+    # El track 1 baja (pasa al lado derecho): line_in; el 2 sube: line_out
+    assert crossings(counter, 1, [(210, 260), (300, 150)], [1, 2]) == [(0, 1, 'line_in'), (0, 2, 'line_out')]
+    assert counter.counts.tolist() == [[1, 1]]
+
+
+def test_reversed_segment_flips_direction():
+    counter = LineCrossingCounter(np.array([[[500, 200], [100, 200]]]), WIDTH, HEIGHT)
+    crossings(counter, 0, [(200, 150)], [1])
+    assert crossings(counter, 1, [(200, 260)], [1]) == [(0, 1, 'line_out')]
+
+
+def test_no_crossing_beyond_segment_or_on_first_sighting():
+    counter = LineCrossingCounter(np.array(HORIZONTAL), WIDTH, HEIGHT)
+    # Primera aparición ya debajo de la línea: sin desplazamiento previo no hay cruce
+    assert crossings(counter, 0, [(550, 150), (200, 300)], [1, 2]) == []
+    # El track 1 pasa por fuera del segmento (x > 500)
+    assert crossings(counter, 1, [(560, 300), (200, 310)], [1, 2]) == []
+
+
+def test_touching_the_line_counts_once():
+    counter = LineCrossingCounter(np.array(HORIZONTAL), WIDTH, HEIGHT)
+    crossings(counter, 0, [(300, 150)], [1])
+    assert crossings(counter, 1, [(300, 200)], [1]) == []
+    assert crossings(counter, 2, [(300, 150)], [1]) == []
+    assert crossings(counter, 3, [(300, 200)], [1]) == []
+    assert crossings(counter, 4, [(300, 250)], [1]) == [(0, 1, 'line_in')]
+
+
+def test_missing_track_keeps_last_point():
+    counter = LineCrossingCounter(np.array(HORIZONTAL), WIDTH, HEIGHT)
+    crossings(counter, 0, [(300, 150)], [7])
+    assert crossings(counter, 1, [(50, 50)], [8]) == []
+    assert crossings(counter, 2, [(300, 250)], [7]) == [(0, 7, 'line_in')]
+
+
+def reference_crossings(segments, frames):
+    """Cruces de cada track con cada línea recorriendo pares de puntos uno a uno"""
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    previous, events = {}, []
+    for frame, anchors, ids in frames:
+        frame_events = []
+        for line_id, (start, end) in enumerate(segments):
+            for (x, y), tracker_id in zip(anchors, ids):
+                if tracker_id not in previous:
+                    continue
+                p, q = previous[tracker_id], (x, y)
+                side_p, side_q = cross(start, end, p), cross(start, end, q)
+                if (side_p > 0) != (side_q > 0) and cross(p, q, start) * cross(p, q, end) <= 0:
+                    frame_events.append((line_id, tracker_id, 'line_in' if side_q > 0 else 'line_out'))
+        events.extend(frame_events)
+        previous.update({tracker_id: (x, y) for (x, y), tracker_id in zip(anchors, ids)})
+    return events
+
+
+def random_walk_frames(seed, n_frames=300, n_tracks=25):
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform([0, 0], [WIDTH, HEIGHT], (n_tracks, 2))
+    frames = []
+    for frame in range(n_frames):
+        positions = np.clip(positions + rng.normal(0, 15, positions.shape), 0, [WIDTH, HEIGHT])
+        visible = np.flatnonzero(rng.uniform(size=n_tracks) < 0.8)
+        frames.append((frame, [tuple(p) for p in np.round(positions[visible])], (visible + 1).tolist()))
+    return frames
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_matches_scalar_reference(seed):
+    segments = [((100, 200), (500, 200)), ((320, 40), (320, 440)), ((50, 400), (600, 100))]
+    counter = LineCrossingCounter(np.array(segments), WIDTH, HEIGHT)
+    frames = random_walk_frames(seed)
+    events = []
+    for frame, anchors, ids in frames:
+        events.extend(crossings(counter, frame, anchors, ids))
+
+    expected = reference_crossings(segments, frames)
+    assert sorted(events) == sorted(expected)
+    assert len(events) > 0
+    for line_id in range(len(segments)):
+        assert counter.counts[line_id].tolist() == [
+            sum(1 for e in expected if e[0] == line_id and e[2] == direction)
+            for direction in ('line_in', 'line_out')
+        ]
+
+
+def test_line_rows_do_not_change_zone_sections(tmp_path, make_events):
+    zones = make_events(rows=1500, seed=8)
+    lines = zones.sample(300, random_state=0).assign(
+        zone_id=-1, line_id=0, event=np.where(np.arange(300) % 3, 'line_in', 'line_out'))
+    processor = AnalyticsProcessor()
+    sections = ["summary", "zone_analysis", "temporal_analysis", "flow_analysis", "dwell_time_analysis"]
+    only_zones = processor.process_events_file(
+        write_events(zones, str(tmp_path / "zones_events.parquet")), sections=sections, bucket_seconds=10)
+    with_lines = processor.process_events_file(
+        write_events(pd.concat([zones, lines]), str(tmp_path / "lines_events.parquet")),
+        sections=sections + ["line_analysis"], bucket_seconds=10)
+
+    for section in sections:
+        assert with_lines[section].keys() == only_zones[section].keys()
+    assert with_lines["summary"]["total_detections"] == only_zones["summary"]["total_detections"]
+    assert with_lines["flow_analysis"] == only_zones["flow_analysis"]
+    assert with_lines["line_analysis"]["total_in"] == 200
+    assert with_lines["line_analysis"]["total_out"] == 100
@@ -0,0 +1,80 @@
+import pandas as pd
+
+from Backend.app import live_analytics
+from Backend.app.live_analytics import LiveAggregates, get_live_snapshot, live_aggregates, release_live_aggregates
+
+
+def record_all(live, df):
+    for event in df.to_dict("records"):
+        live.record_event(event)
+
+
+def test_counts_match_the_event_table(make_events):
+    df = make_events(rows=3000, persons=50, zones=3, duration=3000, seed=14)
+    live = LiveAggregates(n_zones=3)
+    record_all(live, df)
+    snapshot = live.snapshot()
+
+    entries = df[df["event"] == "entry"]
+    assert snapshot["total_entries"] == len(entries)
+    assert snapshot["unique_persons"] == entries["person_tracker_id"].nunique()
+    for zone_id in range(3):
+        zone = snapshot["zones"][f"zone_{zone_id}"]
+        assert zone["entries"] == (entries["zone_id"] == zone_id).sum()
+        assert zone["exits"] == ((df["event"] == "exit") & (df["zone_id"] == zone_id)).sum()
+        assert zone["unique_persons"] == entries.loc[entries["zone_id"] == zone_id, "person_tracker_id"].nunique()
+
+    # 3000 s superan MAX_TIMELINE_BUCKETS intervalos de 1 s: la serie pasa a 5 s
+    assert snapshot["bucket_seconds"] == 5.0
+    expected = entries.groupby((entries["timestamp_seconds"] // 5) * 5).size()
+    assert snapshot["entries_timeline"] == {float(bucket): int(n) for bucket, n in expected.items()}
+    assert sum(snapshot["zone_entries_timeline"]["zone_1"].values()) == snapshot["zones"]["zone_1"]["entries"]
+
+
+def test_demographics_count_the_first_classification():
+    df = pd.DataFrame([
+        {"event": "entry", "zone_id": 0, "person_tracker_id": 1, "timestamp_seconds": 0.0,
+         "gender": "Desconocido", "age": "Desconocido"},
+        {"event": "entry", "zone_id": 1, "person_tracker_id": 1, "timestamp_seconds": 1.0,
+         "gender": "Femenino", "age": "19-35"},
+        {"event": "entry", "zone_id": 0, "person_tracker_id": 1, "timestamp_seconds": 2.0,
+         "gender": "Masculino", "age": "36-60"},
+        {"event": "entry", "zone_id": 0, "person_tracker_id": 2, "timestamp_seconds": 3.0,
+         "gender": "Masculino", "age": "19-35"},
+    ])
+    live = LiveAggregates(n_zones=2)
+    record_all(live, df)
+    demographics = live.snapshot()["demographics"]
+
+    assert demographics["classified_persons"] == 2
+    assert demographics["gender_counts"] == {"Femenino": 1, "Masculino": 1}
+    assert demographics["age_percentages"] == {"19-35": 100.0}
+
+
+def test_lines_and_occupancy():
+    live = LiveAggregates(n_zones=2, n_lines=1)
+    for event in ("line_in", "line_in", "line_out"):
+        live.record_event({"event": event, "zone_id": -1, "line_id": 0, "person_tracker_id": 1})
+    live.update_frame(10, 0.4, {0: 3, 1: 1})
+    live.update_frame(11, 0.44, {0: 1, 1: 2})
+    snapshot = live.snapshot()
+
+    assert snapshot["lines"]["line_0"] == {"in": 2, "out": 1, "net": 1}
+    assert snapshot["current_occupancy"] == 3
+    assert [snapshot["zones"][f"zone_{z}"]["peak_occupancy"] for z in range(2)] == [3, 2]
+    assert snapshot["frame"] == 11
+
+
+def test_released_task_keeps_only_its_final_snapshot(monkeypatch):
+    live = LiveAggregates(n_zones=1)
+    live_aggregates["task_live"] = live
+    live.record_event({"event": "entry", "zone_id": 0, "person_tracker_id": 1, "timestamp_seconds": 0.0})
+    assert get_live_snapshot("task_live")["status"] == "processing"
+
+    release_live_aggregates("task_live", "completed")
+    assert "task_live" not in live_aggregates
+    snapshot = get_live_snapshot("task_live")
+    assert (snapshot["status"], snapshot["total_entries"]) == ("completed", 1)
+
+    monkeypatch.setattr(live_analytics, "FINISHED_RETENTION_SECONDS", -1)
+    assert get_live_snapshot("task_live") is None
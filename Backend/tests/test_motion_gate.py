@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from Backend.app.motion_gate import MotionGate
+
+WIDTH, HEIGHT = 640, 480
+
+
+def scene(block_x=None, block_width=120, shape=(HEIGHT, WIDTH, 3)):
+    """Fondo uniforme con un bloque brillante de 120 px en la columna `block_x`"""
+    frame = np.full(shape, 60, dtype=np.uint8)
+    if block_x is not None:
+        frame[100:340, block_x:block_x + block_width] = 220
+    return frame
+
+
+def decisions(gate, frames):
+    return [gate.should_detect(frame) for frame in frames]
+
+
+def test_static_scene_is_detected_every_max_skip_frames():
+    gate = MotionGate(min_changed_fraction=0.01, max_skip_frames=3, hold_frames=0)
+
+    assert decisions(gate, [scene(100)] * 9) == [True, False, False, False, True, False, False, False, True]
+    assert gate.report() == {
+        "frames": 9, "detected_frames": 3, "skipped_frames": 6, "skipped_fraction": round(6 / 9, 4),
+        "min_changed_fraction": 0.01, "max_skip_frames": 3, "hold_frames": 0
+    }
+
+
+def test_motion_opens_the_gate_and_holds_it():
+    gate = MotionGate(min_changed_fraction=0.01, max_skip_frames=100, hold_frames=2)
+    frames = [scene(100), scene(100), scene(300)] + [scene(300)] * 4
+
+    # Tras el movimiento se detectan `hold_frames` frames más aunque la escena no cambie
+    assert decisions(gate, frames) == [True, False, True, True, True, False, False]
+
+
+def test_slow_motion_accumulates_against_the_last_detected_frame():
+    gate = MotionGate(min_changed_fraction=0.05, max_skip_frames=100, hold_frames=0)
+    # 4 px por frame: frente al frame anterior casi nada cambia, frente al último detectado sí
+    results = decisions(gate, [scene(100 + 4 * i) for i in range(30)])
+
+    assert results[0] and not results[1]
+    assert 2 <= sum(results[1:]) < 15
+
+
+def test_sensor_noise_is_not_motion():
+    rng = np.random.default_rng(0)
+    gate = MotionGate(min_changed_fraction=0.01, max_skip_frames=100, hold_frames=0)
+    noisy = [np.clip(scene(100).astype(np.int16) + rng.integers(-20, 21, (HEIGHT, WIDTH, 3)), 0, 255)
+             .astype(np.uint8) for _ in range(10)]
+
+    assert decisions(gate, noisy) == [True] + [False] * 9
+
+
+@pytest.mark.parametrize("shape", [(1080, 1920, 3), (HEIGHT, WIDTH)])
+def test_large_and_grayscale_frames(shape):
+    gate = MotionGate(min_changed_fraction=0.01, max_skip_frames=100, hold_frames=0)
+
+    expected = (round(shape[0] * MotionGate.WIDTH / shape[1]), MotionGate.WIDTH)
+    assert gate._signature(scene(shape=shape)).shape == expected
+    assert decisions(gate, [scene(100, shape=shape), scene(100, shape=shape), scene(500, shape=shape)]) == [
+        True, False, True
+    ]
+    assert MotionGate(0.01, 1, 0).report()["skipped_fraction"] == 0.0
@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from Backend.app.analysis_cache import AnalysisCache
+from Backend.app.events_io import write_events
+from Backend.app.responses import (
+    MIN_COMPRESS_BYTES, choose_encoding, dumps_json, etag_matches, json_response, not_modified_response,
+    request_scope
+)
+
+
+@pytest.fixture
+def events_file(tmp_path, make_events):
+    return write_events(make_events(rows=200, seed=12), str(tmp_path / "task_events.parquet"))
+
+
+@pytest.fixture
+def client(events_file):
+    """
+    Dos endpoints que, como analyze y compare, construyen el ETag con las
+    mismas claves de caché pero responden cuerpos distintos
+    """
+    app = FastAPI()
+    cache = AnalysisCache()
+
+    async def respond(request: Request, content):
+        etag = cache.etag({events_file: ["section:summary"]}, scope=request_scope(request))
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        return await json_response(request, content, etag=etag)
+
+    @app.get("/analyze")
+    async def analyze(request: Request, sections: str = "summary"):
+        return await respond(request, {"endpoint": "analyze", "sections": sections.split(","),
+                                       "padding": "x" * MIN_COMPRESS_BYTES})
+
+    @app.get("/compare")
+    async def compare(request: Request):
+        return await respond(request, {"endpoint": "compare"})
+
+    return TestClient(app)
+
+
+def test_etag_revalidation(client):
+    first = client.get("/analyze")
+    again = client.get("/analyze", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    assert again.status_code == 304 and again.headers["etag"] == first.headers["etag"]
+    assert client.get("/analyze", headers={"If-None-Match": 'W/"other"'}).status_code == 200
+
+
+def test_etag_and_body_are_scoped_to_endpoint_and_query(client):
+    analyze = client.get("/analyze")
+    compare = client.get("/compare")
+    flow = client.get("/analyze?sections=flow_analysis")
+
+    assert len({analyze.headers["etag"], compare.headers["etag"], flow.headers["etag"]}) == 3
+    assert (analyze.json()["endpoint"], compare.json()["endpoint"]) == ("analyze", "compare")
+    assert flow.json()["sections"] == ["flow_analysis"]
+    # El ETag de un endpoint no revalida otro
+    assert client.get("/compare", headers={"If-None-Match": analyze.headers["etag"]}).status_code == 200
+    # El orden de los parámetros no cambia el alcance
+    assert (client.get("/analyze?sections=summary&a=1").headers["etag"]
+            == client.get("/analyze?a=1&sections=summary").headers["etag"])
+
+
+def test_etag_changes_with_the_events_file(client, events_file, make_events):
+    before = client.get("/compare").headers["etag"]
+    write_events(make_events(rows=300, seed=13), events_file)
+
+    response = client.get("/compare", headers={"If-None-Match": before})
+    assert response.status_code == 200 and response.headers["etag"] != before
+
+
+def test_compression_only_for_large_bodies(client):
+    large = client.get("/analyze", headers={"Accept-Encoding": "gzip"})
+    small = client.get("/compare", headers={"Accept-Encoding": "gzip"})
+
+    assert large.headers["content-encoding"] in ("gzip", "br")
+    assert large.json()["endpoint"] == "analyze"
+    assert "content-encoding" not in small.headers
+    assert choose_encoding("deflate") is None and choose_encoding("gzip;q=1.0") == "gzip"
+
+
+def test_dumps_json_handles_numpy_scalars():
+    assert json.loads(dumps_json({"n": np.int64(3), "x": np.float32(0.5), "items": [np.int32(1)]})) == {
+        "n": 3, "x": 0.5, "items": [1]
+    }
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+import pytest
+
+from Backend.app.zone_geometry import CompiledZones, roi_bounds, roi_to_frame
+
+WIDTH, HEIGHT = 640, 480
+NO_LINES = np.empty((0, 2, 2))
+
+
+def detect_blobs(frame):
+    """Detector de prueba: cajas (x1, y1, x2, y2) de las regiones brillantes de la imagen"""
+    mask = (frame.max(axis=2) > 128).astype(np.uint8)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = [(x, y, x + w, y + h) for x, y, w, h in map(cv2.boundingRect, contours)]
+    return np.array(sorted(boxes), dtype=np.float32).reshape(-1, 4)
+
+
+def test_roi_bounds_cover_zones_and_lines_with_padding():
+    zone = np.array([[200, 150], [300, 150], [300, 250], [200, 250]])
+    line = np.array([[[100, 300], [150, 300]]])
+
+    assert roi_bounds([zone], NO_LINES, WIDTH, HEIGHT, 0.0) == (200, 150, 300, 250)
+    assert roi_bounds([zone], line, WIDTH, HEIGHT, 0.0) == (100, 150, 300, 300)
+    assert roi_bounds([zone], NO_LINES, WIDTH, HEIGHT, 0.1) == (136, 102, 364, 298)
+    # Recortado al frame; None si cubre el frame entero o no hay geometría
+    assert roi_bounds([zone + [400, 0]], NO_LINES, WIDTH, HEIGHT, 0.1) == (536, 102, 640, 298)
+    assert roi_bounds([zone], NO_LINES, WIDTH, HEIGHT, 1.0) is None
+    assert roi_bounds([], NO_LINES, WIDTH, HEIGHT, 0.1) is None
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_crop_detections_map_to_full_frame_coordinates(dtype):
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for x1, y1, x2, y2 in [(210, 160, 240, 240), (260, 200, 290, 250), (20, 20, 60, 80)]:
+        frame[y1:y2, x1:x2] = 255
+    zone = np.array([[200, 150], [300, 150], [300, 260], [200, 260]])
+    roi_box = roi_bounds([zone], NO_LINES, WIDTH, HEIGHT, 0.05)
+    x0, y0, x1, y1 = roi_box
+
+    crop_xyxy = detect_blobs(frame[y0:y1, x0:x1]).astype(dtype)
+    mapped = roi_to_frame(crop_xyxy, roi_box)
+    full_xyxy = detect_blobs(frame)
+
+    assert mapped.dtype == dtype
+    # Las personas dentro del ROI quedan en las mismas coordenadas que detectando en el frame
+    # completo; la que está fuera del ROI no se ve
+    np.testing.assert_array_equal(mapped, full_xyxy[1:])
+    zones = CompiledZones([zone], WIDTH, HEIGHT)
+    np.testing.assert_array_equal(zones.membership(mapped), zones.membership(full_xyxy[1:]))
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backend.app.analytics import AnalyticsProcessor
+from Backend.app.approximate_analytics import HLL_PRECISION, TaskSketches, rollup
+from Backend.app.events_io import write_events
+from Backend.app.sketches import HyperLogLog, QuantileSketch, stable_salt
+
+
+@pytest.mark.parametrize("distinct", [50, 5_000, 200_000])
+def test_hyperloglog_error(distinct):
+    sketch = HyperLogLog(HLL_PRECISION)
+    sketch.add(np.random.default_rng(0).permutation(distinct).repeat(2))
+
+    # 4 errores estándar: margen holgado para que la prueba sea determinista en la práctica
+    assert abs(sketch.estimate() - distinct) <= 4 * sketch.relative_error * distinct + 1
+
+
+def test_hyperloglog_merge_is_union():
+    a, b, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    a.add(np.arange(0, 30_000))
+    b.add(np.arange(20_000, 50_000))
+    union.add(np.arange(0, 50_000))
+
+    merged = HyperLogLog.from_dict(a.to_dict()).merge(b)
+    assert np.array_equal(merged.registers, union.registers)
+
+
+def test_hyperloglog_salt_separates_tasks():
+    a, b = HyperLogLog(), HyperLogLog()
+    a.add(np.arange(1, 1001), salt=stable_salt("task_a"))
+    b.add(np.arange(1, 1001), salt=stable_salt("task_b"))
+
+    assert a.merge(b).estimate() == pytest.approx(2000, rel=0.05)
+
+
+def test_hyperloglog_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
+
+
+@pytest.mark.parametrize("q", [0.0, 0.1, 0.5, 0.9, 0.99, 1.0])
+def test_quantile_sketch_relative_error(q):
+    values = np.random.default_rng(1).lognormal(3, 1.5, 20_000)
+    sketch = QuantileSketch(0.01)
+    sketch.add(values)
+
+    # Valor exacto del mismo rango que estima el sketch (sin interpolar)
+    ordered = np.sort(values)
+    rank = q * (len(values) - 1)
+    low, high = ordered[int(np.floor(rank))], ordered[int(np.ceil(rank))]
+    assert low * 0.99 <= sketch.quantile(q) <= high * 1.01
+
+
+def test_quantile_sketch_merge_matches_single_pass():
+    values = np.random.default_rng(2).exponential(40, 9_000)
+    values[::50] = 0.0
+    single = QuantileSketch(0.01)
+    single.add(values)
+
+    merged = QuantileSketch(0.01)
+    for part in np.array_split(values, 7)[::-1]:
+        sketch = QuantileSketch(0.01)
+        sketch.add(part)
+        merged.merge(QuantileSketch.from_dict(sketch.to_dict()))
+
+    assert merged.count == single.count
+    assert merged.zero_count == single.zero_count
+    assert merged.sum == pytest.approx(single.sum)
+    assert (merged.min, merged.max) == (single.min, single.max)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert merged.quantile(q) == single.quantile(q)
+
+
+def test_empty_quantile_sketch():
+    sketch = QuantileSketch.from_dict(QuantileSketch(0.01).to_dict())
+
+    assert sketch.quantile(0.5) is None
+    assert sketch.mean is None
+
+
+@pytest.fixture
+def task_files(tmp_path, make_events):
+    return {
+        task_id: write_events(make_events(rows=2500, persons=70, seed=seed), str(tmp_path / f"{task_id}_events.parquet"))
+        for seed, task_id in enumerate(["task_a", "task_b"])
+    }
+
+
+def test_task_sketches_match_exact_analysis(task_files):
+    processor = AnalyticsProcessor()
+    path = task_files["task_a"]
+    exact = processor.process_events_file(path, chunk_rows=0)
+    approximate = TaskSketches.from_events_file(path, "task_a", processor, chunk_rows=900).result()
+
+    assert approximate["summary"]["total_detections"] == exact["summary"]["total_detections"]
+    assert approximate["summary"]["unique_persons"] == pytest.approx(exact["summary"]["unique_persons"], rel=0.05)
+    assert approximate["flow_analysis"]["zone_transitions"] == exact["flow_analysis"]["zone_transitions"]
+    for zone_key, zone in exact["zone_analysis"].items():
+        assert approximate["zone_analysis"][zone_key]["total_entries"] == zone["total_entries"]
+
+    exact_dwell = exact["dwell_time_analysis"]
+    for zone_key, zone in exact_dwell["by_zone"].items():
+        approx_zone = approximate["dwell_time_analysis"]["by_zone"][zone_key]
+        assert approx_zone["total_visits"] == zone["total_visits"]
+        assert approx_zone["average_dwell_time"] == pytest.approx(zone["average_dwell_time"])
+        assert approx_zone["max_dwell_time"] == pytest.approx(zone["max_dwell_time"])
+        ordered = np.sort(zone["raw_times"])
+        rank = 0.9 * (len(ordered) - 1)
+        low, high = ordered[int(np.floor(rank))], ordered[int(np.ceil(rank))]
+        assert low * 0.99 <= approx_zone["p90_dwell_time"] <= high * 1.01
+    assert (approximate["dwell_time_analysis"]["summary"]["total_visits"]
+            == exact_dwell["summary"]["total_measured_visits"])
+
+
+def test_rollup_merges_tasks(task_files):
+    processor = AnalyticsProcessor()
+    sketches = {
+        task_id: TaskSketches.from_events_file(path, task_id, processor).to_dict()
+        for task_id, path in task_files.items()
+    }
+    result = rollup(list(sketches.values()))
+    singles = [TaskSketches.from_dict(data).result() for data in sketches.values()]
+
+    assert result["task_ids"] == list(task_files)
+    assert result["summary"]["total_detections"] == sum(s["summary"]["total_detections"] for s in singles)
+    # Los mismos IDs de tracking en tareas distintas son personas distintas
+    assert result["summary"]["unique_persons"] == pytest.approx(
+        sum(s["summary"]["unique_persons"] for s in singles), rel=0.05)
+    transitions = pd.Series(singles[0]["flow_analysis"]["zone_transitions"]).add(
+        pd.Series(singles[1]["flow_analysis"]["zone_transitions"]), fill_value=0)
+    assert result["flow_analysis"]["zone_transitions"] == transitions.astype(int).to_dict()
+    assert rollup([]) is None
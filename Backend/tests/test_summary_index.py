@@ -0,0 +1,47 @@
+import os
+import shutil
+
+from Backend.app.events_io import events_path, write_events
+from Backend.app.summary_index import SummaryIndex
+
+
+def total_detections(index):
+    return {task["task_id"]: task["summary"]["total_detections"] for task in index.query()["tasks"]}
+
+
+def test_refresh_is_incremental(tmp_path, make_events):
+    write_events(make_events(rows=500, seed=1), events_path(str(tmp_path), "task_a"))
+    index = SummaryIndex(str(tmp_path))
+
+    assert index.refresh() == {"added_or_updated": 1, "removed": 0}
+    assert index.refresh() == {"added_or_updated": 0, "removed": 0}
+    assert index.plan_refresh() is None
+    assert index.refresh(force=True) == {"added_or_updated": 1, "removed": 0}
+
+
+def test_refresh_sees_files_rewritten_in_place(tmp_path, make_events):
+    path = events_path(str(tmp_path), "task_a")
+    write_events(make_events(rows=500, seed=1), path)
+    index = SummaryIndex(str(tmp_path))
+    index.refresh()
+    assert total_detections(index) == {"task_a": 500}
+
+    # Reescritura sobre el mismo archivo (sin crear ni renombrar): el mtime del directorio no cambia
+    dir_mtime = os.stat(tmp_path).st_mtime_ns
+    other = write_events(make_events(rows=700, seed=2), str(tmp_path.parent / "other_events.parquet"))
+    shutil.copyfile(other, path)
+    os.utime(tmp_path, ns=(dir_mtime, dir_mtime))
+
+    assert index.refresh() == {"added_or_updated": 1, "removed": 0}
+    assert total_detections(index) == {"task_a": 700}
+
+
+def test_refresh_removes_deleted_tasks(tmp_path, make_events):
+    for seed, task_id in enumerate(["task_a", "task_b"]):
+        write_events(make_events(rows=300, seed=seed), events_path(str(tmp_path), task_id))
+    index = SummaryIndex(str(tmp_path))
+    index.refresh()
+    os.remove(events_path(str(tmp_path), "task_b"))
+
+    assert index.refresh() == {"added_or_updated": 0, "removed": 1}
+    assert list(total_detections(index)) == ["task_a"]
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+from Backend.app.task_events import StageTimer, StatusBroadcaster
+
+
+async def collect(broadcaster, task_id, **kwargs):
+    return [status async for status in broadcaster.subscribe(task_id, **kwargs)]
+
+
+def test_subscriber_gets_latest_state_and_stops_at_terminal():
+    broadcaster = StatusBroadcaster()
+
+    async def scenario():
+        broadcaster.publish("task", {"status": "processing", "progress": 0})
+        subscriber = asyncio.create_task(collect(broadcaster, "task", min_interval=0.05))
+        await asyncio.sleep(0.01)
+        # Publicaciones desde otro hilo (el worker) mientras el suscriptor espera el intervalo
+        worker = threading.Thread(target=lambda: [
+            broadcaster.publish("task", {"status": "processing", "progress": progress})
+            for progress in range(1, 50)
+        ])
+        worker.start()
+        worker.join()
+        broadcaster.publish("task", {"status": "completed", "progress": 50})
+        return await asyncio.wait_for(subscriber, timeout=5)
+
+    statuses = asyncio.run(scenario())
+    assert statuses[0] == {"status": "processing", "progress": 0}
+    assert statuses[-1] == {"status": "completed", "progress": 50}
+    # Los estados intermedios se fusionan: el cliente no recibe los 51
+    assert len(statuses) < 10
+    assert [s["progress"] for s in statuses] == sorted(s["progress"] for s in statuses)
+    assert broadcaster._subscribers == {}
+
+
+def test_finished_task_sends_final_state_immediately():
+    broadcaster = StatusBroadcaster()
+    broadcaster.publish("task", {"status": "failed", "error": "x"})
+
+    assert asyncio.run(collect(broadcaster, "task")) == [{"status": "failed", "error": "x"}]
+    assert broadcaster.latest("task") == (1, {"status": "failed", "error": "x"})
+
+
+def test_heartbeat_without_changes():
+    broadcaster = StatusBroadcaster()
+
+    async def scenario():
+        statuses = broadcaster.subscribe("task", heartbeat=0.01)
+        first = await statuses.__anext__()
+        await statuses.aclose()
+        return first
+
+    assert asyncio.run(scenario()) is None
+    assert broadcaster._subscribers == {}
+
+
+def test_published_state_is_a_copy():
+    broadcaster = StatusBroadcaster()
+    status = {"status": "processing"}
+    broadcaster.publish("task", status)
+    status["status"] = "changed"
+
+    assert broadcaster.latest("task")[1] == {"status": "processing"}
+
+
+def test_stage_timer_accumulates_per_stage():
+    timer = StageTimer()
+    for _ in range(3):
+        timer.mark("decode")
+    timer.mark("detect")
+    report = timer.report()
+
+    assert report["decode"]["calls"] == 3 and report["detect"]["calls"] == 1
+    assert set(report["decode"]) == {"seconds", "calls", "per_second"}
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+from Backend.app import track_log
+from Backend.app.track_log import (
+    NO_TRACK, TrackLogWriter, iter_track_frames, link_track_log, read_track_log,
+    read_track_log_metadata, track_log_path
+)
+
+pytest.importorskip("pyarrow")
+
+METADATA = {"fps": 30.0, "resolution": [640, 480], "params": {"par_interval": 10}}
+
+
+def write_frames(path, frames):
+    writer = TrackLogWriter(path, METADATA)
+    for frame, xyxy, ids, attributes in frames:
+        writer.add_frame(frame, np.asarray(xyxy, dtype=np.float32), np.full(len(ids), 0.9), np.asarray(ids),
+                         attributes)
+    return writer
+
+
+@pytest.mark.parametrize("row_group_rows", [1, 256_000])
+def test_round_trip_with_sentinel_and_attributes(tmp_path, monkeypatch, row_group_rows):
+    monkeypatch.setattr(track_log, "TRACK_LOG_ROW_GROUP_ROWS", row_group_rows)
+    path = track_log_path(str(tmp_path), "task")
+    writer = write_frames(path, [
+        (0, [[0, 0, 10, 10], [5, 5, 20, 20]], [1, 2], {2: {"gender": "Femenino", "gender_confidence": 0.8}}),
+        (1, np.empty((0, 4)), [], None),
+        (2, [[1, 1, 11, 11]], [1], {1: {"age": "19-35", "age_confidence": 0.7}}),
+    ])
+
+    assert writer.close() == path and not os.path.exists(path + ".tmp")
+    tracks, metadata = read_track_log(path)
+    assert metadata == METADATA == read_track_log_metadata(path)
+    assert tracks["frame"].tolist() == [0, 0, 1, 2]
+    assert tracks["track_id"].tolist() == [1, 2, NO_TRACK, 1]
+    assert np.isnan(tracks.loc[2, ["x1", "y1", "x2", "y2", "confidence"]].astype(float)).all()
+    np.testing.assert_allclose(tracks.loc[1, ["x1", "y1", "x2", "y2"]].astype(float), [5, 5, 20, 20])
+    assert tracks["gender"].isna().tolist() == [True, False, True, True] and tracks.loc[1, "gender"] == "Femenino"
+    assert tracks.loc[3, "age"] == "19-35" and tracks.loc[3, "age_confidence"] == pytest.approx(0.7)
+    assert [(frame, rows.stop - rows.start) for frame, rows in iter_track_frames(tracks)] == [(0, 2), (1, 1), (2, 1)]
+
+
+def test_empty_log_is_valid_and_abort_discards(tmp_path):
+    path = track_log_path(str(tmp_path), "empty")
+    TrackLogWriter(path, METADATA).close()
+    tracks, metadata = read_track_log(path)
+    assert len(tracks) == 0 and metadata == METADATA
+    assert list(iter_track_frames(tracks)) == []
+
+    aborted = track_log_path(str(tmp_path), "aborted")
+    writer = write_frames(aborted, [(0, [[0, 0, 1, 1]], [1], None)])
+    writer._flush()
+    writer.abort()
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_link_shares_the_log(tmp_path):
+    source = track_log_path(str(tmp_path), "source")
+    write_frames(source, [(0, [[0, 0, 1, 1]], [1], None)]).close()
+    target = track_log_path(str(tmp_path), "target")
+    link_track_log(source, target)
+
+    assert read_track_log(target)[0].equals(read_track_log(source)[0])
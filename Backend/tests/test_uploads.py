@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from Backend.app.uploads import ChecksumError, UploadManager, UploadOffsetError
+
+VIDEO = os.urandom(300_000)
+
+
+async def stream(data: bytes, piece: int = 64 * 1024):
+    for start in range(0, len(data), piece):
+        yield data[start:start + piece]
+
+
+def append(manager, session, offset, data, chunk_sha256=None):
+    return asyncio.run(manager.append(session, offset, stream(data), chunk_sha256))
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return UploadManager(str(tmp_path))
+
+
+def test_chunks_must_start_at_the_received_offset(manager):
+    session = manager.create("video.mp4", len(VIDEO), hashlib.sha256(VIDEO).hexdigest())
+    assert append(manager, session, 0, VIDEO[:100_000]) == 100_000
+
+    with pytest.raises(UploadOffsetError) as error:
+        append(manager, session, 50_000, VIDEO[50_000:150_000])
+    assert error.value.offset == 100_000
+    with pytest.raises(ValueError):
+        append(manager, session, 100_000, VIDEO[100_000:] + b"extra")
+    assert session.received == 100_000
+
+    append(manager, session, 100_000, VIDEO[100_000:])
+    asyncio.run(manager.complete(session))
+    assert session.status == "complete"
+    with open(session.path, "rb") as f:
+        assert f.read() == VIDEO
+
+
+def test_resume_after_restart(manager, tmp_path):
+    session = manager.create("video.ts", len(VIDEO), camera_id="cam1", options={"frame_stride": 2})
+    append(manager, session, 0, VIDEO[:120_000])
+
+    # Otra instancia (reinicio del servidor) recupera la subida desde sus metadatos
+    restored = UploadManager(str(tmp_path)).get(session.upload_id)
+    assert (restored.received, restored.camera_id, restored.options) == (120_000, "cam1", {"frame_stride": 2})
+    append(manager, restored, 120_000, VIDEO[120_000:])
+    # Sin hash incremental tras el reinicio: se recalcula del archivo al completar
+    asyncio.run(manager.complete(restored))
+    assert restored.sha256 == hashlib.sha256(VIDEO).hexdigest()
+
+
+def test_chunk_checksum_mismatch_discards_the_chunk(manager):
+    session = manager.create("video.mp4", len(VIDEO))
+    append(manager, session, 0, VIDEO[:100_000])
+
+    with pytest.raises(ChecksumError):
+        append(manager, session, 100_000, VIDEO[100_000:200_000], hashlib.sha256(b"other").hexdigest())
+    assert session.received == 100_000
+    assert os.path.getsize(session.path) == 100_000
+
+    append(manager, session, 100_000, VIDEO[100_000:], hashlib.sha256(VIDEO[100_000:]).hexdigest())
+    asyncio.run(manager.complete(session))
+    assert session.sha256 == hashlib.sha256(VIDEO).hexdigest()
+
+
+def test_file_checksum_mismatch_fails_the_upload(manager):
+    session = manager.create("video.mp4", len(VIDEO), hashlib.sha256(b"other").hexdigest())
+    append(manager, session, 0, VIDEO)
+
+    with pytest.raises(ChecksumError):
+        asyncio.run(manager.complete(session))
+    assert session.status == "failed"
+    with pytest.raises(ValueError):
+        append(manager, session, len(VIDEO), b"")
+
+
+def test_processing_is_marked_once(manager, tmp_path):
+    session = manager.create("video.mp4", len(VIDEO))
+
+    assert manager.mark_processing(session) is True
+    assert manager.mark_processing(session) is False
+    assert UploadManager(str(tmp_path)).get(session.upload_id).processing_started
@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+import pytest
+
+from Backend.app.zone_config import compile_zone_config, line_segments, normalize_zone_config
+from Backend.app.zone_geometry import CompiledZones, bottom_center_anchors
+
+WIDTH, HEIGHT = 640, 480
+
+
+def random_polygons(rng, n):
+    """Polígonos solapados, convexos y cóncavos (estrellas), algunos saliendo del frame"""
+    polygons = []
+    for _ in range(n):
+        center = rng.uniform([0, 0], [WIDTH, HEIGHT])
+        vertices = rng.integers(3, 9)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+        radii = rng.uniform(20, 200, vertices)
+        points = center + np.stack([np.cos(angles), np.sin(angles)], axis=1) * radii[:, None]
+        polygons.append(np.clip(np.round(points), 0, None).astype(np.int32))
+    return polygons
+
+
+def random_boxes(rng, n):
+    x1 = rng.uniform(-50, WIDTH, n)
+    y1 = rng.uniform(-50, HEIGHT, n)
+    return np.stack([x1, y1, x1 + rng.uniform(5, 80, n), y1 + rng.uniform(5, 200, n)], axis=1)
+
+
+def reference_distances(polygons, xyxy):
+    """Distancia con signo (detecciones x zonas) de cada punto de apoyo al borde de cada zona, punto a punto"""
+    x, y = bottom_center_anchors(xyxy, WIDTH, HEIGHT)
+    distances = np.array([[cv2.pointPolygonTest(polygon, (float(px), float(py)), True)
+                           for px, py in zip(x.tolist(), y.tolist())] for polygon in polygons])
+    return distances.T
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pairs_match_point_in_polygon(seed):
+    rng = np.random.default_rng(seed)
+    polygons = random_polygons(rng, 30)
+    xyxy = random_boxes(rng, 500)
+    zones = CompiledZones(polygons, WIDTH, HEIGHT)
+    zone_idx, det_idx = zones.pairs(xyxy)
+    inside = zones.membership(xyxy)
+    distances = reference_distances(polygons, xyxy)
+
+    # Pares ordenados por zona y luego por detección, sin duplicados
+    assert np.array_equal(np.lexsort((det_idx, zone_idx)), np.arange(len(zone_idx)))
+    assert inside.sum() == len(zone_idx)
+    # Lejos del borde (más de 1 px) la rasterización coincide con la geometría exacta
+    clear = np.abs(distances) > 1
+    assert clear.mean() > 0.95 and inside[clear].any()
+    assert np.array_equal(inside[clear], (distances > 0)[clear])
+
+
+def test_overlapping_zones_and_empty_frame():
+    square = np.array([[100, 100], [300, 100], [300, 300], [100, 300]])
+    zones = CompiledZones([square, square + 100, square], WIDTH, HEIGHT)
+    xyxy = np.array([[140, 150, 160, 250], [240, 190, 260, 290], [490, 400, 510, 450]], dtype=np.float32)
+
+    zone_idx, det_idx = zones.pairs(xyxy)
+    assert list(zip(zone_idx.tolist(), det_idx.tolist())) == [(0, 0), (0, 1), (1, 1), (2, 0), (2, 1)]
+    # Combinaciones: ninguna, {0}, {0, 1}, {0, 1, 2}, {0, 2}, {1}
+    assert zones.n_combinations == 6
+    assert zones.membership(np.empty((0, 4))).shape == (0, 3)
+
+
+def test_border_and_out_of_frame_anchors():
+    zones = CompiledZones([np.array([[0, 400], [200, 400], [200, 480], [0, 480]])], WIDTH, HEIGHT)
+    # Vértice y arista incluidos (fillPoly); una caja que sale por abajo se recorta al frame
+    xyxy = np.array([[190, 300, 210, 400], [90, 300, 110, 400], [90, 450, 110, 600], [90, 300, 110, 399]])
+
+    assert zones.membership(xyxy)[:, 0].tolist() == [True, True, True, False]
+
+
+def test_zone_config_is_scaled_to_the_video():
+    config = normalize_zone_config({
+        "zones": [{"polygon": [[0, 0], [50, 0], [50, 50], [0, 50]]}],
+        "lines": [{"start": [0, 25], "end": [100, 25]}],
+        "reference_size": [100, 100],
+    })
+    assert config["zones"][0]["name"] == "Zona 0" and config["min_frames_in"] is None
+
+    zones = compile_zone_config(config, WIDTH, HEIGHT)
+    assert zones.polygons[0].tolist() == [[0, 0], [320, 0], [320, 240], [0, 240]]
+    assert line_segments(config, WIDTH, HEIGHT).tolist() == [[[0, 120], [640, 120]]]
+    assert compile_zone_config(None, WIDTH, HEIGHT).n_zones == 4
+
+
+@pytest.mark.parametrize("raw", [
+    {},
+    {"zones": [{"polygon": [[0, 0], [1, 1]]}]},
+    {"zones": [{"polygon": [[0, 0], [1, -1], [1, 1]]}]},
+    {"lines": [{"start": [1, 1], "end": [1, 1]}]},
+    {"zones": [{"polygon": [[0, 0], [1, 0], [1, 1]]}], "reference_size": [0, 10]},
+    {"zones": [{"polygon": [[0, 0], [1, 0], [1, 1]]}], "min_frames_in": 1.5},
+])
+def test_invalid_zone_config(raw):
+    with pytest.raises(ValueError):
+        normalize_zone_config(raw)
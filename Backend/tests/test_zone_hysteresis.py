@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from Backend.app.zone_events import ZoneEventTracker
+from Backend.app.zone_geometry import CompiledZones, default_zone_polygons
+
+WIDTH, HEIGHT = 640, 480
+
+
+def boxes(anchors):
+    """Cajas de 10 x 40 con el centro inferior en cada punto (x, y)"""
+    return np.array([[x - 5, y - 40, x + 5, y] for x, y in anchors], dtype=np.float32).reshape(-1, 4)
+
+
+def jittery_frames(seed, n_frames=400, n_tracks=12):
+    """Tracks que oscilan alrededor del centro del frame (borde entre las cuatro zonas)"""
+    rng = np.random.default_rng(seed)
+    positions = rng.normal([WIDTH / 2, HEIGHT / 2], 30, (n_tracks, 2))
+    frames = []
+    for frame in range(n_frames):
+        positions = np.clip(positions + rng.normal(0, 8, positions.shape), 1, [WIDTH - 1, HEIGHT - 1])
+        visible = np.flatnonzero(rng.uniform(size=n_tracks) < 0.85)
+        if len(visible):
+            frames.append((frame, np.round(positions[visible]), visible + 1))
+    return frames
+
+
+def membership(geometry, anchors, ids):
+    zone_idx, det_idx = geometry.pairs(boxes(anchors))
+    return {(int(ids[d]), int(z)) for z, d in zip(zone_idx, det_idx)}
+
+
+def reference_events(geometry, frames, min_frames_in, min_frames_out):
+    """
+    Histéresis recorriendo cada (track, zona) por separado: entrada tras
+    min_frames_in frames seguidos dentro, salida tras min_frames_out fuera,
+    ambas con el frame en que empezó la racha
+    """
+    inside, streak_in, streak_out = set(), {}, {}
+    events = []
+    for frame, anchors, ids in frames:
+        present = membership(geometry, anchors, ids)
+        frame_events = []
+        for key in present - inside:
+            count, start = streak_in.get(key, (0, frame))
+            streak_in[key] = (count + 1, start)
+            if count + 1 >= min_frames_in:
+                frame_events.append((start, 'entry', key[1], key[0]))
+        for key in inside - present:
+            count, start = streak_out.get(key, (0, frame))
+            streak_out[key] = (count + 1, start)
+            if count + 1 >= min_frames_out:
+                frame_events.append((start, 'exit', key[1], key[0]))
+        # Las rachas solo continúan en frames consecutivos
+        streak_in = {key: streak for key, streak in streak_in.items() if key in present - inside}
+        streak_out = {key: streak for key, streak in streak_out.items() if key in inside - present}
+        for _, event, zone_id, tracker_id in frame_events:
+            key = (tracker_id, zone_id)
+            (inside.add if event == 'entry' else inside.discard)(key)
+            streak_in.pop(key, None)
+            streak_out.pop(key, None)
+        events.extend(sorted(frame_events))
+    return events
+
+
+def tracker_events(geometry, frames, min_frames_in, min_frames_out):
+    tracker = ZoneEventTracker(geometry, min_frames_in, min_frames_out)
+    events = []
+    for frame, anchors, ids in frames:
+        frame_events = tracker.update(frame, frame / 30, boxes(anchors), ids, {})
+        events.extend(sorted((e['frame'], e['event'], int(e['zone_id']), int(e['person_tracker_id']))
+                             for e in frame_events))
+    return tracker, events
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_without_hysteresis_every_membership_change_is_an_event(seed):
+    geometry = CompiledZones(default_zone_polygons(WIDTH, HEIGHT), WIDTH, HEIGHT)
+    frames = jittery_frames(seed)
+    tracker, events = tracker_events(geometry, frames, 1, 1)
+
+    previous, expected = set(), []
+    for frame, anchors, ids in frames:
+        present = membership(geometry, anchors, ids)
+        expected.extend(sorted([(frame, 'entry', z, t) for t, z in present - previous]
+                               + [(frame, 'exit', z, t) for t, z in previous - present]))
+        previous = present
+    assert events == expected
+    assert tracker.events == tracker.raw_events == len(expected)
+
+
+@pytest.mark.parametrize("min_frames_in,min_frames_out", [(3, 5), (2, 1), (1, 4)])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_hysteresis_matches_reference(seed, min_frames_in, min_frames_out):
+    geometry = CompiledZones(default_zone_polygons(WIDTH, HEIGHT), WIDTH, HEIGHT)
+    frames = jittery_frames(seed)
+    tracker, events = tracker_events(geometry, frames, min_frames_in, min_frames_out)
+
+    assert events == reference_events(geometry, frames, min_frames_in, min_frames_out)
+    _, raw = tracker_events(geometry, frames, 1, 1)
+    assert tracker.raw_events == len(raw)
+    assert tracker.events < tracker.raw_events
+
+
+def test_events_are_confirmed_late_but_carry_the_streak_start():
+    geometry = CompiledZones(default_zone_polygons(WIDTH, HEIGHT), WIDTH, HEIGHT)
+    tracker = ZoneEventTracker(geometry, min_frames_in=3, min_frames_out=2)
+    # Zona 0 (cuadrante superior izquierdo) en los frames 0-4; fuera (zona 3) desde el 5
+    path = [(100, 100)] * 5 + [(500, 400)] * 3
+    events = [
+        (frame, e['frame'], e['timestamp_seconds'], e['event'], e['zone_id'])
+        for frame, anchor in enumerate(path)
+        for e in tracker.update(frame, frame / 30, boxes([anchor]), np.array([4]), {})
+    ]
+
+    # (frame de confirmación, frame y timestamp del evento, ...): la racha empieza en el 0 y en el 5
+    assert events == [(2, 0, 0.0, 'entry', 0), (6, 5, 5 / 30, 'exit', 0), (7, 5, 5 / 30, 'entry', 3)]
+    assert tracker.total_counts.tolist() == [1, 0, 0, 1]
+    assert tracker.occupancy() == {0: 0, 1: 0, 2: 0, 3: 1}